@@ -0,0 +1,504 @@
+import os
+import sqlite3
+import threading
+from datetime import date
+
+import numpy as np
+
+import base_de_donnees
+import instantane
+
+
+# Lignes lues à la fois lors du chargement des colonnes
+TAILLE_LOT = 50000
+
+# Jour donné aux contraventions dont la date est illisible : hors de
+# toute période demandée
+JOUR_INCONNU = np.iinfo(np.int32).min
+
+EPOQUE = date(1970, 1, 1)
+
+
+def numero_jour(jour):
+    """
+    Numéro d'un jour (jours écoulés depuis le 1970-01-01).
+
+    Args:
+        jour (datetime.date): Jour.
+
+    Returns:
+        int: Numéro du jour.
+    """
+    return (jour - EPOQUE).days
+
+
+def jours_depuis_dates(dates):
+    """
+    Convertit des dates entières YYYYMMDD en numéros de jour.
+
+    Args:
+        dates (numpy.ndarray): Dates YYYYMMDD.
+
+    Returns:
+        numpy.ndarray: Numéros de jour (int32); JOUR_INCONNU pour une
+        date impossible (mois 13, 31 avril, valeur non numérique...).
+    """
+    dates = np.asarray(dates, dtype=np.int64)
+    annees, mois, jours = dates // 10000, dates // 100 % 100, dates % 100
+    debuts_mois = ((annees - 1970) * 12 + mois - 1).astype("datetime64[M]")
+    resultat = debuts_mois.astype("datetime64[D]") + (jours - 1)
+
+    # Aller-retour : une date impossible déborde sur un autre mois
+    mois_obtenus = resultat.astype("datetime64[M]")
+    valides = (
+        (mois >= 1) & (mois <= 12) & (jours >= 1)
+        & (mois_obtenus == debuts_mois)
+    )
+    return np.where(
+        valides, resultat.astype(np.int64), JOUR_INCONNU).astype(np.int32)
+
+
+def _type_codes(taille):
+    # Plus petit entier non signé qui peut coder 'taille' valeurs
+    for type_numpy in (np.uint8, np.uint16, np.uint32):
+        if taille <= np.iinfo(type_numpy).max + 1:
+            return type_numpy
+    return np.uint64
+
+
+class Colonnes:
+    """
+    Contraventions chargées en colonnes NumPy, triées par jour, pour les
+    agrégats sur une période.
+
+    Les chaînes (établissement, catégorie, statut) sont codées par
+    dictionnaire : chaque colonne contient l'indice de la valeur dans la
+    liste triée correspondante (noms_etablissements...). Une instance
+    n'est jamais modifiée : elle peut être lue par plusieurs fils.
+    """
+
+    __slots__ = (
+        "version", "jours", "mois", "etablissements", "categories",
+        "statuts", "montants", "noms_etablissements", "noms_categories",
+        "noms_statuts", "liste_etablissements"
+    )
+
+    # Colonnes NumPy et listes de chaînes enregistrées dans un instantané
+    TABLEAUX = ("jours", "mois", "etablissements", "categories", "statuts",
+                "montants")
+    CHAINES = ("noms_etablissements", "noms_categories", "noms_statuts",
+               "liste_etablissements")
+
+    def __init__(self, version, jours, mois, etablissements, categories,
+                 statuts, montants, noms_etablissements, noms_categories,
+                 noms_statuts, liste_etablissements):
+        """
+        Args:
+            version (str): Version des données chargées.
+            jours (numpy.ndarray): Numéros de jour, triés.
+            mois (numpy.ndarray): Mois (depuis 1970-01) de chaque jour.
+            etablissements, categories, statuts (numpy.ndarray): Codes,
+                dans l'ordre des jours.
+            montants (numpy.ndarray): Amendes, dans l'ordre des jours.
+            noms_etablissements, noms_categories, noms_statuts: Valeurs
+                de chaque code, triées.
+            liste_etablissements: Établissements de la table
+                'etablissements' (Database.lister_etablissements).
+        """
+        self.version = version
+        self.jours = jours
+        self.mois = mois
+        self.etablissements = etablissements
+        self.categories = categories
+        self.statuts = statuts
+        self.montants = montants
+        self.noms_etablissements = noms_etablissements
+        self.noms_categories = noms_categories
+        self.noms_statuts = noms_statuts
+        self.liste_etablissements = liste_etablissements
+
+    @classmethod
+    def depuis_instantane(cls, chemin):
+        """
+        Ouvre les colonnes enregistrées dans un instantané : les tableaux
+        sont des vues sur le fichier projeté en mémoire, partagées par
+        tous les processus qui l'ouvrent.
+
+        Args:
+            chemin (str): Fichier de l'instantané.
+
+        Returns:
+            Colonnes: Contraventions en colonnes.
+
+        Raises:
+            OSError: Si le fichier ne peut pas être lu.
+            ValueError: Si le fichier n'est pas un instantané valide.
+            KeyError: S'il manque une colonne à l'instantané.
+        """
+        fichier = instantane.Instantane(chemin)
+        return cls(
+            fichier.version,
+            *(fichier.tableau(nom) for nom in cls.TABLEAUX),
+            *(fichier.chaines(nom) for nom in cls.CHAINES)
+        )
+
+    def enregistrer(self, chemin):
+        """
+        Enregistre les colonnes dans un instantané (voir instantane.ecrire).
+
+        Args:
+            chemin (str): Fichier de l'instantané.
+
+        Raises:
+            OSError: Si le fichier ne peut pas être écrit.
+        """
+        instantane.ecrire(
+            chemin, self.version,
+            {nom: getattr(self, nom) for nom in self.TABLEAUX},
+            {nom: getattr(self, nom) for nom in self.CHAINES})
+
+    def __len__(self):
+        return len(self.jours)
+
+    def intervalle(self, du, au):
+        """
+        Tranche des contraventions d'une période (recherche dichotomique
+        dans les jours triés).
+
+        Args:
+            du (datetime.date): Premier jour, inclus.
+            au (datetime.date): Dernier jour, inclus.
+
+        Returns:
+            slice: Tranche à appliquer aux colonnes.
+        """
+        debut = np.searchsorted(self.jours, numero_jour(du), side="left")
+        fin = np.searchsorted(self.jours, numero_jour(au), side="right")
+        return slice(int(debut), int(max(debut, fin)))
+
+    def compter(self, du, au):
+        """
+        Nombre de contraventions de la période.
+        """
+        tranche = self.intervalle(du, au)
+        return tranche.stop - tranche.start
+
+    def somme_amendes(self, du, au):
+        """
+        Total des amendes de la période.
+        """
+        return int(self.montants[self.intervalle(du, au)].sum(
+            dtype=np.int64))
+
+    def par_etablissement(self, du, au, limite=None):
+        """
+        Nombre de contraventions et total des amendes par établissement,
+        du plus grand nombre au plus petit (puis par nom).
+
+        Args:
+            du (datetime.date): Premier jour, inclus.
+            au (datetime.date): Dernier jour, inclus.
+            limite (int, optional): Nombre maximal d'établissements.
+
+        Returns:
+            list: Dictionnaires {"etablissement", "nb", "montant"}.
+        """
+        tranche = self.intervalle(du, au)
+        codes = self.etablissements[tranche]
+        taille = len(self.noms_etablissements)
+        nombres = np.bincount(codes, minlength=taille)
+        montants = np.bincount(
+            codes, weights=self.montants[tranche], minlength=taille)
+
+        presents = np.flatnonzero(nombres)
+        # Tri par nombre décroissant, puis par code (ordre des noms)
+        presents = presents[np.lexsort((presents, -nombres[presents]))]
+        if limite is not None:
+            presents = presents[:limite]
+        return [
+            {"etablissement": self.noms_etablissements[code],
+             "nb": int(nombres[code]), "montant": int(montants[code])}
+            for code in presents.tolist()
+        ]
+
+    def par_mois(self, du, au):
+        """
+        Histogramme mensuel de la période (mois sans contravention
+        compris).
+
+        Returns:
+            list: Dictionnaires {"mois" (YYYY-MM), "nb", "montant"}.
+        """
+        tranche = self.intervalle(du, au)
+        mois = self.mois[tranche]
+        if not len(mois):
+            return []
+        premier = int(mois[0])
+        decalages = mois - premier
+        nombres = np.bincount(decalages)
+        montants = np.bincount(decalages, weights=self.montants[tranche])
+        return [
+            {"mois": str(np.datetime64(premier + i, "M")),
+             "nb": int(nombres[i]), "montant": int(montants[i])}
+            for i in range(len(nombres))
+        ]
+
+    def _par_code(self, du, au, colonne, noms, cle):
+        tranche = self.intervalle(du, au)
+        nombres = np.bincount(colonne[tranche], minlength=len(noms))
+        ordre = np.lexsort((np.arange(len(noms)), -nombres))
+        return [
+            {cle: noms[code], "nb": int(nombres[code])}
+            for code in ordre.tolist() if nombres[code]
+        ]
+
+    def par_categorie(self, du, au):
+        """
+        Nombre de contraventions par catégorie, du plus grand au plus petit.
+        """
+        return self._par_code(du, au, self.categories,
+                              self.noms_categories, "categorie")
+
+    def par_statut(self, du, au):
+        """
+        Nombre de contraventions par statut, du plus grand au plus petit.
+        """
+        return self._par_code(du, au, self.statuts,
+                              self.noms_statuts, "statut")
+
+    def resume(self, du, au, limite=None):
+        """
+        Agrégats d'une période, renvoyés par /statistiques/periode.
+
+        Args:
+            du (datetime.date): Premier jour, inclus.
+            au (datetime.date): Dernier jour, inclus.
+            limite (int, optional): Nombre maximal d'établissements.
+
+        Returns:
+            dict: Nombre et total des amendes, puis répartitions par
+            établissement, par mois, par catégorie et par statut.
+        """
+        return {
+            "du": du.isoformat(),
+            "au": au.isoformat(),
+            "nb": self.compter(du, au),
+            "montant_total": self.somme_amendes(du, au),
+            "etablissements": self.par_etablissement(du, au, limite),
+            "mois": self.par_mois(du, au),
+            "categories": self.par_categorie(du, au),
+            "statuts": self.par_statut(du, au),
+        }
+
+
+class _Dictionnaire:
+    # Codage par dictionnaire d'une colonne de chaînes, lot par lot
+
+    def __init__(self):
+        self.codes = {}
+        self.lots = []
+
+    def ajouter(self, valeurs):
+        codes = self.codes
+        self.lots.append(np.fromiter(
+            (codes.setdefault(valeur, len(codes)) for valeur in valeurs),
+            dtype=np.uint32, count=len(valeurs)))
+
+    def terminer(self):
+        # Recode selon l'ordre alphabétique des valeurs
+        noms = sorted(self.codes)
+        rangs = np.empty(len(noms), dtype=np.uint32)
+        rangs[[self.codes[nom] for nom in noms]] = np.arange(
+            len(noms), dtype=np.uint32)
+        colonne = (np.concatenate(self.lots) if self.lots
+                   else np.empty(0, dtype=np.uint32))
+        return rangs[colonne].astype(_type_codes(len(noms))), noms
+
+
+def charger_colonnes(db):
+    """
+    Construit les colonnes à partir des lignes (date, etablissement,
+    categorie, statut, montant) de Database.curseur_analytique.
+
+    Args:
+        db (base_de_donnees.Database): Connexion à la base.
+
+    Returns:
+        Colonnes: Contraventions en colonnes, triées par jour.
+    """
+    version = str(db.version_donnees())
+    curseur = db.curseur_analytique()
+    dates = []
+    montants = []
+    etablissements = _Dictionnaire()
+    categories = _Dictionnaire()
+    statuts = _Dictionnaire()
+
+    while True:
+        lot = curseur.fetchmany(TAILLE_LOT)
+        if not lot:
+            break
+        colonnes = list(zip(*lot))
+        dates.append(np.array(colonnes[0], dtype=np.int64))
+        etablissements.ajouter(colonnes[1])
+        categories.ajouter(colonnes[2])
+        statuts.ajouter(colonnes[3])
+        montants.append(np.array(colonnes[4], dtype=np.int32))
+
+    codes_etablissements, noms_etablissements = etablissements.terminer()
+    codes_categories, noms_categories = categories.terminer()
+    codes_statuts, noms_statuts = statuts.terminer()
+    jours = jours_depuis_dates(np.concatenate(dates) if dates else [])
+    montants = (np.concatenate(montants) if montants
+                else np.empty(0, dtype=np.int32))
+
+    ordre = np.argsort(jours, kind="stable")
+    jours = jours[ordre]
+
+    # Mois de chaque contravention, numérotés depuis 1970-01
+    connus = jours != JOUR_INCONNU
+    mois = np.zeros(len(jours), dtype=np.int32)
+    mois[connus] = jours[connus].astype(
+        "datetime64[D]").astype("datetime64[M]").astype(np.int32)
+
+    return Colonnes(
+        version, jours, mois,
+        codes_etablissements[ordre], codes_categories[ordre],
+        codes_statuts[ordre], montants[ordre],
+        noms_etablissements, noms_categories, noms_statuts,
+        db.lister_etablissements()
+    )
+
+
+def chemin_instantane():
+    """
+    Renvoie le fichier de l'instantané, à côté de la base de données.
+    """
+    return os.path.splitext(base_de_donnees.CHEMIN_BD)[0] + ".instantane"
+
+
+def ecrire_instantane(chemin=None):
+    """
+    Construit les colonnes de la version courante des données et les
+    enregistre dans l'instantané, que les processus de l'application
+    ouvrent à leur prochaine requête. Appelée par A1 après une
+    importation.
+
+    Args:
+        chemin (str, optional): Fichier de l'instantané
+            (chemin_instantane() par défaut).
+
+    Returns:
+        bool: True si l'instantané a été écrit.
+    """
+    db = None
+    try:
+        db = base_de_donnees.Database()
+        charger_colonnes(db).enregistrer(chemin or chemin_instantane())
+        return True
+    except (OSError, sqlite3.Error) as e:
+        print(f"Erreur lors de l'écriture de l'instantané : {e}")
+        return False
+    finally:
+        if db is not None:
+            db.deconnecter()
+
+
+class MoteurAnalytique:
+    """
+    Garde les colonnes de la version courante des données et les
+    remplace quand une importation (A1) change cette version.
+
+    Les colonnes sont d'abord lues dans l'instantané écrit par A1 (projeté
+    en mémoire, donc partagé entre les processus); elles ne sont
+    construites depuis la base que si l'instantané manque ou n'est pas à
+    la version courante. Les anciennes colonnes ne sont pas fermées : les
+    requêtes en cours les gardent jusqu'à leur fin.
+    """
+
+    def __init__(self, chemin=None):
+        """
+        Args:
+            chemin (str, optional): Fichier de l'instantané
+                (chemin_instantane() par défaut, lu à chaque ouverture).
+        """
+        self.chemin = chemin
+        self._colonnes = None
+        # (version, inode, date de modification, taille) du dernier
+        # instantané écarté : tant que ni la version des données ni le
+        # fichier ne changent, il n'est pas rouvert à chaque requête
+        self._ecarte = None
+        self._verrou = threading.Lock()
+
+    def _ouvrir_instantane(self, version):
+        chemin = self.chemin or chemin_instantane()
+        try:
+            etat = os.stat(chemin)
+        except FileNotFoundError:
+            return None
+        signature = (version, etat.st_ino, etat.st_mtime_ns, etat.st_size)
+        if signature == self._ecarte:
+            return None
+        try:
+            colonnes = Colonnes.depuis_instantane(chemin)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Instantané illisible : {e}")
+            self._ecarte = signature
+            return None
+        if colonnes.version != version:
+            self._ecarte = signature
+            return None
+        return colonnes
+
+    def _colonnes_version(self, version):
+        # Colonnes en mémoire ou dans l'instantané (appelée sous verrou)
+        colonnes = self._colonnes
+        if colonnes is None or colonnes.version != version:
+            colonnes = self._ouvrir_instantane(version)
+            if colonnes is not None:
+                self._colonnes = colonnes
+        return colonnes
+
+    def colonnes_disponibles(self, db):
+        """
+        Renvoie les colonnes de la version courante des données si elles
+        sont en mémoire ou dans l'instantané, sans les construire depuis
+        la base.
+
+        Args:
+            db (base_de_donnees.Database): Connexion à la base.
+
+        Returns:
+            Colonnes: Contraventions en colonnes, ou None tant que A1
+            n'a pas écrit l'instantané de cette version.
+        """
+        version = str(db.version_donnees())
+        colonnes = self._colonnes
+        if colonnes is not None and colonnes.version == version:
+            return colonnes
+        with self._verrou:
+            return self._colonnes_version(version)
+
+    def colonnes(self, db):
+        """
+        Renvoie les colonnes de la version courante des données, ouvertes
+        ou reconstruites au besoin.
+
+        Args:
+            db (base_de_donnees.Database): Connexion à la base.
+
+        Returns:
+            Colonnes: Contraventions en colonnes.
+        """
+        version = str(db.version_donnees())
+        colonnes = self._colonnes
+        if colonnes is not None and colonnes.version == version:
+            return colonnes
+        with self._verrou:
+            colonnes = self._colonnes_version(version)
+            if colonnes is None:
+                colonnes = charger_colonnes(db)
+                self._colonnes = colonnes
+        return colonnes
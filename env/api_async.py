@@ -0,0 +1,480 @@
+import base_de_donnees
+import exportations
+import argparse
+import asyncio
+import http
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+
+# Fils (et connexions en lecture seule) qui exécutent les requêtes SQL
+TRAVAILLEURS = 8
+
+# Attente maximale entre deux requêtes d'une connexion HTTP (secondes)
+DELAI_INACTIVITE = 15
+
+# Taille maximale de la ligne de requête et des entêtes (octets)
+TAILLE_MAX_ENTETES = 16 * 1024
+
+# Taille maximale d'un corps de requête lu (et ignoré) sans fermer la
+# connexion (octets)
+TAILLE_MAX_CORPS = 64 * 1024
+
+# Taille à partir de laquelle un corps est compressé (octets)
+TAILLE_MIN_GZIP = 1024
+
+
+def json_octets(donnees):
+    """
+    Sérialise en JSON comme le fait Flask (clés triées, sans espaces).
+
+    Args:
+        donnees: Valeur à sérialiser.
+
+    Returns:
+        bytes: JSON encodé en UTF-8.
+    """
+    return json.dumps(
+        donnees, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class EncodagesAcceptes(dict):
+    """
+    Valeur analysée de l'entête Accept-Encoding : encodage -> qualité,
+    lue comme werkzeug.datastructures.Accept par
+    exportations.choisir_encodage (0 pour un encodage refusé ou absent,
+    sauf si '*' l'accepte).
+    """
+
+    def __init__(self, valeur=""):
+        super().__init__()
+        for partie in valeur.split(","):
+            nom, *options = partie.split(";")
+            nom = nom.strip().lower()
+            if not nom:
+                continue
+            qualite = 1
+            for option in options:
+                cle, _, texte = option.partition("=")
+                if cle.strip().lower() == "q":
+                    try:
+                        qualite = float(texte)
+                    except ValueError:
+                        qualite = 0
+            self[nom] = qualite
+
+    def __missing__(self, encodage):
+        return self.get("*", 0)
+
+
+class Reponse:
+    """
+    Réponse HTTP (statut, type, corps en octets, entêtes).
+
+    Une réponse diffusée en continu a un 'flux' (itérateur de morceaux
+    d'octets, lu dans le groupe de fils) au lieu d'un corps, et une
+    fonction 'fermer' appelée à la fin de l'envoi, même interrompu.
+    """
+
+    __slots__ = ("statut", "type_contenu", "corps", "entetes", "flux",
+                 "fermer")
+
+    def __init__(self, statut, type_contenu, corps, entetes=None,
+                 flux=None):
+        self.statut = statut
+        self.type_contenu = type_contenu
+        self.corps = corps
+        self.entetes = entetes or {}
+        self.flux = flux
+        self.fermer = None
+
+
+def reponse_json(donnees, statut=200, entetes=None):
+    """
+    Construit une réponse JSON (terminée par un saut de ligne, comme
+    jsonify).
+
+    Args:
+        donnees: Valeur à sérialiser.
+        statut (int): Code de statut HTTP.
+        entetes (dict, optional): Entêtes supplémentaires.
+
+    Returns:
+        Reponse: Réponse application/json.
+    """
+    return Reponse(statut, "application/json",
+                   json_octets(donnees) + b"\n", entetes)
+
+
+class ServeurLecture:
+    """
+    Serveur HTTP asyncio (bibliothèque standard seulement) des routes de
+    lecture de l'API (raml/contraventions.raml), à côté de l'application
+    Flask qui garde les pages HTML, les comptes et les écritures.
+
+    Les requêtes SQL et la sérialisation sont faites dans un groupe de
+    fils, sur des connexions en lecture seule; la boucle asyncio ne fait
+    que lire et écrire les sockets. Les requêtes identiques (même route,
+    mêmes paramètres, même encodage) reçues pendant qu'une exécution est
+    en cours partagent son résultat au lieu de relancer la requête SQL.
+
+    Sans 'limite', /contrevenants et /infractions diffusent toutes les
+    contraventions en continu (Transfer-Encoding: chunked), comme Flask;
+    ces réponses ne sont pas partagées, un flux ne se lisant qu'une fois.
+    Les exports complets /contrevenants.csv et /contrevenants.xml
+    restent servis par Flask.
+    """
+
+    def __init__(self, chemin=None, travailleurs=TRAVAILLEURS):
+        self.pool = base_de_donnees.PoolConnexions(
+            taille=travailleurs, chemin=chemin, lecture_seule=True
+        )
+        self.executeur = ThreadPoolExecutor(
+            max_workers=travailleurs, thread_name_prefix="api-lecture"
+        )
+        self.routes = {
+            "/contrevenants": self.contrevenants,
+            "/etablissements": self.etablissements,
+            "/infractions": self.infractions,
+            "/pire-etablissement": self.pire_etablissement,
+            "/statistiques": self.statistiques,
+            "/statistiques/xml": self.statistiques_xml,
+            "/statistiques/csv": self.statistiques_csv,
+        }
+        # Routes diffusées en continu quand 'limite' est absent
+        self.listes = {"/contrevenants", "/infractions"}
+        self._en_cours = {}
+        self.executions = 0
+        self.partages = 0
+
+    async def servir(self, hote="127.0.0.1", port=5001):
+        """
+        Accepte les connexions jusqu'à l'arrêt de la boucle.
+
+        Args:
+            hote (str): Adresse d'écoute.
+            port (int): Port d'écoute.
+        """
+        serveur = await asyncio.start_server(
+            self.traiter_connexion, hote, port, limit=TAILLE_MAX_ENTETES
+        )
+        async with serveur:
+            await serveur.serve_forever()
+
+    async def traiter_connexion(self, lecteur, ecrivain):
+        """
+        Traite les requêtes successives d'une connexion HTTP/1.1
+        (keep-alive).
+        """
+        try:
+            while True:
+                try:
+                    entete = await asyncio.wait_for(
+                        lecteur.readuntil(b"\r\n\r\n"), DELAI_INACTIVITE)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        asyncio.LimitOverrunError, ConnectionError):
+                    return
+
+                lignes = entete.decode("latin-1").split("\r\n")
+                try:
+                    methode, cible, version = lignes[0].split(" ")
+                except ValueError:
+                    await self._envoyer(ecrivain, reponse_json(
+                        {"erreur": "Requête invalide"}, 400), False)
+                    return
+                entetes = {}
+                for ligne in lignes[1:]:
+                    nom, _, valeur = ligne.partition(":")
+                    if nom:
+                        entetes[nom.strip().lower()] = valeur.strip()
+
+                connexion = entetes.get("connection", "").lower()
+                garder = (connexion != "close" if version == "HTTP/1.1"
+                          else connexion == "keep-alive")
+
+                # Les routes n'utilisent pas de corps : il est lu et ignoré
+                # pour que la requête suivante commence au bon endroit, ou
+                # la connexion est fermée après la réponse (corps chunked,
+                # trop grand ou de longueur invalide)
+                longueur = entetes.get("content-length", "0")
+                if "transfer-encoding" in entetes or not longueur.isdigit() \
+                        or int(longueur) > TAILLE_MAX_CORPS:
+                    garder = False
+                elif int(longueur):
+                    try:
+                        await asyncio.wait_for(
+                            lecteur.readexactly(int(longueur)),
+                            DELAI_INACTIVITE)
+                    except (asyncio.TimeoutError,
+                            asyncio.IncompleteReadError, ConnectionError):
+                        return
+
+                if methode not in ("GET", "HEAD"):
+                    reponse = reponse_json(
+                        {"erreur": "Méthode non permise"}, 405,
+                        {"Allow": "GET, HEAD"})
+                else:
+                    reponse = await self.repondre(
+                        cible, entetes.get("accept-encoding", ""))
+                # Sans Transfer-Encoding: chunked (HTTP/1.0), la fin de
+                # la connexion marque la fin d'un corps diffusé
+                fragmente = version == "HTTP/1.1"
+                if reponse.flux is not None and not fragmente:
+                    garder = False
+                complete = await self._envoyer(
+                    ecrivain, reponse, garder, methode == "HEAD",
+                    fragmente)
+                if not garder or not complete:
+                    return
+        finally:
+            ecrivain.close()
+
+    async def repondre(self, cible, accept_encoding=""):
+        """
+        Produit la réponse d'une requête GET.
+
+        Args:
+            cible (str): Chemin et chaîne de requête.
+            accept_encoding (str): Valeur de l'entête Accept-Encoding.
+
+        Returns:
+            Reponse: Réponse à envoyer.
+        """
+        morceaux = urlsplit(cible)
+        route = self.routes.get(morceaux.path)
+        if route is None:
+            return reponse_json({"erreur": "Ressource introuvable"}, 404)
+
+        # Premier paramètre de chaque nom, comme request.args.get
+        parametres = {}
+        for nom, valeur in parse_qsl(morceaux.query, keep_blank_values=True):
+            parametres.setdefault(nom, valeur)
+
+        encodage = exportations.choisir_encodage(
+            EncodagesAcceptes(accept_encoding))
+        if morceaux.path in self.listes and "limite" not in parametres:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executeur, self._executer, route, parametres,
+                encodage)
+        cle = (morceaux.path, tuple(sorted(parametres.items())), encodage)
+        return await self._partager(cle, self._executer, route,
+                                    parametres, encodage)
+
+    async def _partager(self, cle, fonction, *args):
+        tache = self._en_cours.get(cle)
+        if tache is None:
+            self.executions += 1
+            tache = asyncio.get_running_loop().run_in_executor(
+                self.executeur, fonction, *args)
+            self._en_cours[cle] = tache
+            tache.add_done_callback(lambda _: self._en_cours.pop(cle, None))
+        else:
+            self.partages += 1
+        # shield : l'abandon d'un client n'annule pas l'exécution partagée
+        return await asyncio.shield(tache)
+
+    def _executer(self, route, parametres, encodage):
+        db = None
+        try:
+            db = base_de_donnees.Database(self.pool)
+            reponse = route(db, parametres)
+        except Exception as e:
+            reponse = reponse_json({"erreur": str(e)}, 500)
+
+        if reponse.flux is not None:
+            # La connexion reste prise jusqu'à la fin de la diffusion
+            flux = reponse.flux
+
+            def fermer():
+                try:
+                    flux.close()
+                finally:
+                    db.deconnecter()
+            reponse.fermer = fermer
+            if encodage:
+                reponse.flux = exportations.ENCODAGES[encodage](flux)
+                reponse.entetes["Content-Encoding"] = encodage
+            reponse.entetes["Vary"] = "Accept-Encoding"
+            return reponse
+
+        if db is not None:
+            db.deconnecter()
+        if encodage and len(reponse.corps) >= TAILLE_MIN_GZIP:
+            reponse.corps = b"".join(
+                exportations.ENCODAGES[encodage]([reponse.corps]))
+            reponse.entetes["Content-Encoding"] = encodage
+        reponse.entetes["Vary"] = "Accept-Encoding"
+        return reponse
+
+    async def _envoyer(self, ecrivain, reponse, garder, tete=False,
+                       fragmente=True):
+        """
+        Écrit une réponse sur la connexion.
+
+        Returns:
+            bool: False si l'envoi d'un corps diffusé a été interrompu
+            (la connexion doit alors être fermée).
+        """
+        lignes = [
+            f"HTTP/1.1 {reponse.statut} "
+            f"{http.HTTPStatus(reponse.statut).phrase}",
+            f"Content-Type: {reponse.type_contenu}",
+        ]
+        if reponse.flux is None:
+            lignes.append(f"Content-Length: {len(reponse.corps)}")
+        elif fragmente:
+            lignes.append("Transfer-Encoding: chunked")
+        lignes.append("Connection: " + ("keep-alive" if garder else "close"))
+        lignes.extend(f"{nom}: {valeur}"
+                      for nom, valeur in reponse.entetes.items())
+        ecrivain.write(("\r\n".join(lignes) + "\r\n\r\n").encode("latin-1"))
+        if reponse.flux is not None:
+            return await self._diffuser(ecrivain, reponse, tete, fragmente)
+        if not tete:
+            ecrivain.write(reponse.corps)
+        try:
+            await ecrivain.drain()
+        except ConnectionError:
+            pass
+        return True
+
+    async def _diffuser(self, ecrivain, reponse, tete, fragmente):
+        # Les morceaux sont lus dans le groupe de fils (requête SQL), la
+        # boucle n'attend que le réseau
+        boucle = asyncio.get_running_loop()
+        try:
+            if not tete:
+                while True:
+                    morceau = await boucle.run_in_executor(
+                        self.executeur, next, reponse.flux, None)
+                    if morceau is None:
+                        break
+                    if not morceau:
+                        continue
+                    if fragmente:
+                        morceau = b"%x\r\n%s\r\n" % (len(morceau), morceau)
+                    ecrivain.write(morceau)
+                    await ecrivain.drain()
+                if fragmente:
+                    ecrivain.write(b"0\r\n\r\n")
+                await ecrivain.drain()
+            return True
+        except ConnectionError:
+            return False
+        except Exception as e:
+            # Le statut est déjà envoyé : la réponse reste incomplète
+            print("Erreur lors de la diffusion de la réponse:", e)
+            return False
+        finally:
+            await boucle.run_in_executor(self.executeur, reponse.fermer)
+
+    # Routes : exécutées dans un fil du groupe, avec une connexion
+    # en lecture seule
+
+    def contrevenants(self, db, parametres):
+        date_debut = parametres.get("du", "").replace("-", "")
+        date_fin = parametres.get("au", "").replace("-", "")
+        if not date_debut or not date_fin:
+            return reponse_json({
+                "erreur": "Les paramètres 'du' et 'au' sont obligatoires"
+            }, 400)
+        return self._contraventions(
+            parametres,
+            lambda limite, apres: db.curseur_contraventions_par_dates(
+                date_debut, date_fin, limite, apres)
+        )
+
+    def infractions(self, db, parametres):
+        nom = parametres.get("etablissement", "").strip()
+        if not nom:
+            return reponse_json(
+                {"erreur": "Paramètre 'etablissement' manquant"}, 400)
+        return self._contraventions(
+            parametres,
+            lambda limite, apres: db.curseur_contraventions(
+                etablissement=nom, limite=limite, apres=apres)
+        )
+
+    def _contraventions(self, parametres, obtenir_curseur):
+        try:
+            limite, apres = exportations.lire_pagination(
+                parametres.get("limite"), parametres.get("curseur"))
+        except ValueError as e:
+            return reponse_json({"erreur": str(e)}, 400)
+
+        # Mêmes corps que Flask (reponse_contraventions) : sans 'limite',
+        # toutes les lignes, diffusées en continu
+        if limite is None:
+            return Reponse(200, "application/json", None, flux=(
+                exportations.flux_json(obtenir_curseur(None, apres))))
+
+        curseur = obtenir_curseur(limite + 1, apres)
+        encoder = exportations.encodeur_json(
+            [colonne[0] for colonne in curseur.description])
+        lignes = curseur.fetchall()
+        entetes = {}
+        if len(lignes) > limite:
+            entetes["X-Curseur-Suivant"] = exportations.encoder_curseur(
+                lignes[limite - 1])
+        corps = "[" + ",".join(map(encoder, lignes[:limite])) + "]\n"
+        return Reponse(200, "application/json", corps.encode("utf-8"),
+                       entetes)
+
+    def etablissements(self, db, parametres):
+        return reponse_json(db.lister_etablissements())
+
+    def pire_etablissement(self, db, parametres):
+        ligne = db.pire_etablissement()
+        if not ligne:
+            return reponse_json({"erreur": "Aucune donnée disponible"}, 404)
+        return reponse_json(
+            {"etablissement": ligne["etablissement"], "nb": ligne["nb"]})
+
+    def statistiques(self, db, parametres):
+        return reponse_json([
+            {"etablissement": ligne["etablissement"], "nb": ligne["nb"]}
+            for ligne in db.statistiques_infractions()
+        ])
+
+    def statistiques_xml(self, db, parametres):
+        elements = (
+            ("etablissement", {"nb": ligne["nb"]}, ligne["etablissement"])
+            for ligne in db.statistiques_infractions()
+        )
+        return Reponse(
+            200, "application/xml; charset=utf-8",
+            b"".join(exportations.flux_xml("statistiques", elements))
+        )
+
+    def statistiques_csv(self, db, parametres):
+        corps = b"".join(exportations.flux_csv(
+            ["etablissement", "nombre d'infractions connues"],
+            ([ligne["etablissement"], ligne["nb"]]
+             for ligne in db.statistiques_infractions())
+        ))
+        return Reponse(
+            200, "text/csv; charset=utf-8", corps,
+            {"Content-Disposition": "attachment; filename=statistiques.csv"}
+        )
+
+
+if __name__ == "__main__":
+    """
+    Démarre le serveur de lecture asynchrone, par exemple :
+    python api_async.py --port 5001
+    """
+    arguments = argparse.ArgumentParser(
+        description="API de lecture asynchrone des contraventions")
+    arguments.add_argument("--hote", default="127.0.0.1")
+    arguments.add_argument("--port", type=int, default=5001)
+    arguments.add_argument("--travailleurs", type=int, default=TRAVAILLEURS)
+    options = arguments.parse_args()
+
+    serveur = ServeurLecture(travailleurs=options.travailleurs)
+    print(f"API de lecture sur http://{options.hote}:{options.port}")
+    try:
+        asyncio.run(serveur.servir(options.hote, options.port))
+    except KeyboardInterrupt:
+        pass
@@ -1,5 +1,14 @@
 import fonctionnalites
 import base_de_donnees
+import analytique
+import autocompletion
+import cache_reponses
+import exportations
+import magasin_sessions
+import photos
+import mots_de_passe
+import metriques
+import ecrivain
 
 from flask import (
     Flask, render_template,
@@ -7,24 +16,21 @@ from flask import (
     make_response, jsonify,
     session, redirect,
     url_for, flash,
-    send_file
+    send_file, stream_with_context
 )
 
 import sqlite3
-import csv
-import io
 import json
-import xml.etree.ElementTree
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 import hashlib
 import uuid
 import re
 from functools import wraps
 import os
+import time
 from dotenv import load_dotenv
 
 
-from apscheduler.schedulers.background import BackgroundScheduler
 from jsonschema import validate, ValidationError
 
 
@@ -36,74 +42,102 @@ if not SECRET:
     raise RuntimeError("La variable SECRET_KEY n'est pas définie !")
 app.secret_key = SECRET
 
+# Connexions SQLite partagées par les requêtes de ce processus
+pool = base_de_donnees.PoolConnexions()
+
+# Fil unique par lequel passent les écritures des requêtes
+ecrivain_bd = ecrivain.Ecrivain()
+
 
 def get_db():
     """
-    Ouvre une connexion SQLite et la stocke dans 'g', si nécessaire.
+    Emprunte une connexion SQLite au pool et la stocke dans 'g',
+    si nécessaire.
 
     Returns:
         base_de_donnees.Database: objet de connexion à la base SQLite.
     """
     db = getattr(g, '_database', None)
     if db is None:
-        g._database = base_de_donnees.Database()
+        g._database = base_de_donnees.Database(pool, ecrivain_bd)
     return g._database
 
 
-@app.teardown_appcontext
-def close_connection(exception):
+@app.before_request
+def debut_mesure():
     """
-    Ferme la connexion à la base de données en fin de requête.
+    Note le début du traitement de la requête (voir fin_mesure).
     """
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.deconnecter()
+    g._debut_requete = time.perf_counter()
 
 
-# A3
-def mise_a_jour_db():
-    """
-    Met à jour la base de données en appelant la fonction A1.
-    Utilisé pour la planification des mises à jour quotidiennes.
-    """
-    try:
-        fonctionnalites.A1()
-        print("Mise à jour de la base de données réussie.")
-    except Exception as e:
-        print(f"Erreur lors de la mise à jour de la base de données : {e}")
-
-
-# A3
-scheduler = BackgroundScheduler()
+# (route, statut) -> (histogramme de la route, clé de son compteur)
+mesures_routes = {}
 
 
-def maj_minuit():
+@app.after_request
+def fin_mesure(reponse):
     """
-    Démarre un planificateur pour exécuter la mise à jour
-    de la base de données à minuit chaque jour.
+    Ajoute la durée de la vue (jusqu'au début de la réponse, pour une
+    réponse diffusée) à l'histogramme http_duree_secondes de sa route.
     """
-    try:
-        scheduler.add_job(mise_a_jour_db, "cron", hour=0, minute=0)
-        scheduler.start()
-        print("Scheduler démarré. Prochaine exécution à 00h00.")
-        print("Mise à jour testée avec succès.")
-    except Exception as e:
-        print(f"Erreur : {e}")
+    if metriques.ACTIVES and "_debut_requete" in g:
+        duree = time.perf_counter() - g._debut_requete
+        route = request.url_rule.rule if request.url_rule else "aucune"
+        cle = (route, reponse.status_code)
+        mesures = mesures_routes.get(cle)
+        if mesures is None:
+            mesures = mesures_routes.setdefault(cle, (
+                metriques.registre.histogramme(
+                    "http_duree_secondes", route=route),
+                metriques.registre.cle(
+                    "http_requetes_total", route=route,
+                    statut=reponse.status_code)))
+        mesures[0].observer(duree)
+        metriques.registre.ajouter(mesures[1])
+    return reponse
 
 
-# A3
 @app.teardown_appcontext
-def teardown_appcontext(exception=None):
+def close_connection(exception):
     """
-    Ferme la connexion à la base de données et arrête le scheduler
-    à la fin de la requête.
+    Rend la connexion à la base de données au pool en fin de requête.
     """
-    db = get_db()
+    db = g.pop('_database', None)
     if db is not None:
         db.deconnecter()
 
-    if scheduler.running:
-        scheduler.shutdown()
+
+# Hachage des mots de passe (groupe de fils borné) et limites d'essais
+# de connexion et d'inscription
+service_mdp = mots_de_passe.ServiceMotsDePasse()
+limite_ip = mots_de_passe.LimiteurDebit(capacite=20, periode=3)
+limite_utilisateur = mots_de_passe.LimiteurDebit(capacite=20, periode=30)
+
+
+def trop_d_essais(nom_utilisateur=None):
+    """
+    Indique si la requête dépasse la limite d'essais de son adresse IP
+    ou, s'il est donné, du nom d'utilisateur visé, toutes adresses
+    confondues : un essai réparti sur plusieurs adresses reste limité.
+    La limite par compte est plus large que celle d'une adresse pour
+    qu'un tiers ne bloque pas facilement le titulaire.
+
+    Args:
+        nom_utilisateur (str, optional): Compte visé par l'essai.
+
+    Returns:
+        bool: True si la requête doit être refusée.
+    """
+    adresse = request.remote_addr or ""
+    if not limite_ip.autoriser(adresse):
+        return True
+    return (nom_utilisateur is not None
+            and not limite_utilisateur.autoriser(nom_utilisateur))
+
+
+# Sessions de connexion (mémoire + table 'sessions')
+sessions = magasin_sessions.MagasinSessions(pool, ecrivain_bd)
 
 
 # Connexion requise
@@ -112,10 +146,134 @@ def connexion_requise(f):
     def wrapper(*args, **kwargs):
         if "utilisateur" not in session:
             return redirect(url_for("connexion"))
+        if not sessions.valider(session.get("id_session"),
+                                session["utilisateur"]):
+            session.clear()
+            return redirect(url_for("connexion"))
         return f(*args, **kwargs)
     return wrapper
 
 
+# Cache des réponses des routes en lecture seule
+cache = cache_reponses.CacheReponses()
+
+
+def mise_en_cache(f):
+    """
+    Met en cache la réponse d'une route en lecture seule et l'associe à
+    un ETag fort dérivé de la version des données. Le cache et l'ETag
+    changent dès qu'une importation A1 modifie les contraventions;
+    un If-None-Match correspondant reçoit une réponse 304. L'encodage
+    de contenu négocié fait partie de la clé; une réponse diffusée en
+    continu est copiée au passage et mise en cache si elle est petite.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        version = get_db().version_donnees()
+        cle = (
+            request.path,
+            tuple(sorted(request.args.items(multi=True))),
+            exportations.choisir_encodage(request.accept_encodings)
+        )
+        etag = hashlib.sha1(f"{version}:{cle}".encode()).hexdigest()
+
+        if request.if_none_match.contains(etag):
+            reponse = make_response("", 304)
+        else:
+            entree = cache.obtenir(cle, version)
+            if entree is not None:
+                corps, entetes = entree
+                reponse = make_response(corps, 200, entetes)
+            else:
+                reponse = make_response(f(*args, **kwargs))
+                if reponse.status_code != 200:
+                    return reponse
+                entetes = [
+                    (nom, valeur) for nom, valeur in reponse.headers
+                    if nom != "Content-Length"
+                ]
+                if reponse.is_streamed:
+                    reponse.response = cache.copier_flux(
+                        reponse.iter_encoded(), cle, version, entetes)
+                else:
+                    cache.stocker(cle, version, reponse.get_data(), entetes)
+
+        reponse.set_etag(etag)
+        reponse.headers["Cache-Control"] = "no-cache"
+        return reponse
+    return wrapper
+
+
+def reponse_contraventions(obtenir_curseur):
+    """
+    Construit la réponse JSON d'une liste de contraventions.
+
+    Sans paramètre 'limite', toutes les lignes sont diffusées en continu.
+    Avec 'limite' (et 'curseur' pour les pages suivantes), une page est
+    renvoyée et l'entête X-Curseur-Suivant donne le curseur de la page
+    suivante, s'il y en a une.
+
+    Args:
+        obtenir_curseur (callable): Fonction (limite, apres) renvoyant le
+            curseur SQLite des contraventions.
+
+    Returns:
+        Response: Réponse JSON, ou erreur 400 si la pagination est invalide.
+    """
+    try:
+        limite, apres = exportations.lire_pagination(
+            request.args.get("limite"), request.args.get("curseur"))
+    except ValueError as e:
+        return jsonify({"erreur": str(e)}), 400
+
+    if limite is None:
+        return app.response_class(
+            stream_with_context(
+                exportations.flux_json(obtenir_curseur(None, apres))),
+            mimetype="application/json"
+        )
+
+    curseur = obtenir_curseur(limite + 1, apres)
+    encoder = exportations.encodeur_json(
+        [colonne[0] for colonne in curseur.description])
+    lignes = curseur.fetchall()
+    reponse = app.response_class(
+        "[" + ",".join(map(encoder, lignes[:limite])) + "]\n",
+        mimetype="application/json")
+    if len(lignes) > limite:
+        reponse.headers["X-Curseur-Suivant"] = exportations.encoder_curseur(
+            lignes[limite - 1])
+    return reponse
+
+
+def reponse_flux(flux, mimetype, nom_fichier=None):
+    """
+    Construit une réponse diffusée en continu à partir d'un flux d'octets,
+    compressée si le client accepte un encodage de contenu (gzip).
+
+    Args:
+        flux (iterable): Morceaux d'octets du document.
+        mimetype (str): Type du contenu (avec le jeu de caractères).
+        nom_fichier (str, optional): Nom du fichier proposé au client.
+
+    Returns:
+        Response: Réponse HTTP diffusée en continu.
+    """
+    encodage = exportations.choisir_encodage(request.accept_encodings)
+    if encodage:
+        flux = exportations.ENCODAGES[encodage](flux)
+
+    reponse = app.response_class(
+        stream_with_context(flux), content_type=mimetype)
+    reponse.vary.add("Accept-Encoding")
+    if encodage:
+        reponse.headers["Content-Encoding"] = encodage
+    if nom_fichier:
+        reponse.headers["Content-Disposition"] = (
+            f"attachment; filename={nom_fichier}")
+    return reponse
+
+
 @app.route("/")
 def accueil():
     """
@@ -161,10 +319,12 @@ def resultats_recherche():
 
 # A4
 @app.route("/contrevenants", methods=["GET"])
+@mise_en_cache
 def api_contraventions_par_dates():
     """
     Service REST GET /contrevenants?du=YYYY-MM-JJ&au=YYYY-MM-JJ.
-    Retourne un JSON listant toutes les contraventions entre les deux dates.
+    Retourne un JSON listant toutes les contraventions entre les deux dates,
+    diffusé en continu, ou une page si 'limite' (et 'curseur') est fourni.
 
     - bash 'curl -i http://127.0.0.1:5000/contrevenants?du=YYYY-MM-JJ&au='
     'YYYY-MM-JJ'
@@ -182,11 +342,10 @@ def api_contraventions_par_dates():
 
     try:
         db = get_db()
-        contraventions = db.rechercher_contraventions_par_dates(
-            date_debut, date_fin)
-        # Conversion de chaque Row en dictionnaire
-        resultats_json = [dict(c) for c in contraventions]
-        return jsonify(resultats_json), 200
+        return reponse_contraventions(
+            lambda limite, apres: db.curseur_contraventions_par_dates(
+                date_debut, date_fin, limite, apres)
+        )
     except Exception as e:
         return jsonify({
             "erreur": f"Impossible de récupérer les données : {e}"
@@ -206,6 +365,7 @@ def documentation():
 
 # A6
 @app.route("/etablissements", methods=["GET"])
+@mise_en_cache
 def api_lister_etablissements():
     """
     Route API pour lister tous les établissements.
@@ -216,8 +376,12 @@ def api_lister_etablissements():
         Response: Réponse JSON contenant les noms des établissements.
     """
     db = get_db()
-    noms = db.lister_etablissements()
-    return jsonify(noms), 200
+    colonnes = moteur_analytique.colonnes_disponibles(db)
+    if colonnes is None:
+        # Pas encore d'instantané à la version courante : la requête SQL
+        # évite de construire toutes les colonnes pendant la requête
+        return jsonify(db.lister_etablissements()), 200
+    return jsonify(list(colonnes.liste_etablissements)), 200
 
 
 # A6
@@ -227,7 +391,8 @@ def api_infractions_par_etablissement():
     Récupère les contraventions d'un établissement donné.
 
     Le paramètre 'etablissement' doit être fourni dans la requête.
-    Retourne une liste de contraventions ou une erreur en cas de problème.
+    Retourne une liste de contraventions ou une erreur en cas de problème;
+    'limite' et 'curseur' permettent de la parcourir page par page.
 
     - bash 'curl -i http://127.0.0.1:5000/infractions?etablissement=...'
 
@@ -240,15 +405,18 @@ def api_infractions_par_etablissement():
 
     try:
         db = get_db()
-        # on réutilise la méthode existante
-        contraventions = db.rechercher_contraventions(etablissement=nom)
-        return jsonify([dict(c) for c in contraventions]), 200
+        # on réutilise la recherche existante, lue progressivement
+        return reponse_contraventions(
+            lambda limite, apres: db.curseur_contraventions(
+                etablissement=nom, limite=limite, apres=apres)
+        )
     except Exception as e:
         return jsonify({"erreur": str(e)}), 500
 
 
 # C1 (un plus)
 @app.route("/pire-etablissement", methods=["GET"])
+@mise_en_cache
 def obtenir_pire_etablissement():
     """
     Récupère l'établissement avec le plus grand nombre de contraventions.
@@ -279,6 +447,7 @@ def obtenir_pire_etablissement():
 
 # C1
 @app.route("/statistiques", methods=["GET"])
+@mise_en_cache
 def obtenir_statistiques():
     """
     Récupère les statistiques des contraventions par établissement.
@@ -305,6 +474,7 @@ def obtenir_statistiques():
 
 # C2
 @app.route("/statistiques/xml", methods=["GET"])
+@mise_en_cache
 def obtenir_statistiques_xml():
     """
     Récupère les statistiques des contraventions et les renvoie au format XML.
@@ -321,25 +491,21 @@ def obtenir_statistiques_xml():
         db = get_db()
         lignes = db.statistiques_infractions()
 
-        racine_xml = xml.etree.ElementTree.Element("statistiques")
-        for ligne in lignes:
-            noeaud = xml.etree.ElementTree.SubElement(
-                racine_xml, "etablissement", nb=str(ligne["nb"])
-            )
-            noeaud.text = ligne["etablissement"]
-
-        xml_bytes = xml.etree.ElementTree.tostring(
-            racine_xml, encoding="utf-8", xml_declaration=True
+        elements = (
+            ("etablissement", {"nb": ligne["nb"]}, ligne["etablissement"])
+            for ligne in lignes
+        )
+        return reponse_flux(
+            exportations.flux_xml("statistiques", elements),
+            "application/xml; charset=utf-8"
         )
-        reponse = make_response(xml_bytes)
-        reponse.headers["Content-Type"] = "application/xml; charset=utf-8"
-        return reponse
     except Exception as e:
         return jsonify({"erreur": str(e)}), 500
 
 
 # C3
 @app.route("/statistiques/csv", methods=["GET"])
+@mise_en_cache
 def obtenir_statistiques_csv():
     """
     Récupère les statistiques des contraventions et les renvoie au format CSV.
@@ -357,21 +523,144 @@ def obtenir_statistiques_csv():
         db = get_db()
         lignes = db.statistiques_infractions()
 
-        tampon = io.StringIO()
-        writer = csv.writer(tampon, delimiter=";")
-        writer.writerow(["etablissement",
-                         "nombre d'infractions connues"])
-        for ligne in lignes:
-            writer.writerow([ligne["etablissement"], ligne["nb"]])
+        return reponse_flux(
+            exportations.flux_csv(
+                ["etablissement", "nombre d'infractions connues"],
+                ([ligne["etablissement"], ligne["nb"]] for ligne in lignes)
+            ),
+            "text/csv; charset=utf-8",
+            "statistiques.csv"
+        )
+    except Exception as e:
+        return jsonify({"erreur": str(e)}), 500
 
-        contenu_csv = tampon.getvalue().encode("utf-8")
-        reponse = make_response(contenu_csv)
-        reponse.headers["Content-Type"] = "text/csv; charset=utf-8"
-        reponse.headers["Content-Disposition"] = (
-            "attachment; filename=statistiques.csv")
 
-        return reponse
+# Index des noms d'établissements, pour l'autocomplétion (E2)
+moteur_autocompletion = autocompletion.MoteurAutocompletion()
+
+# Colonnes NumPy des contraventions, pour les agrégats par période et la
+# liste des établissements (lues dans l'instantané écrit par A1)
+moteur_analytique = analytique.MoteurAnalytique()
+
+
+# A5
+@app.route("/statistiques/periode", methods=["GET"])
+@mise_en_cache
+def obtenir_statistiques_periode():
+    """
+    Service REST GET /statistiques/periode?du=YYYY-MM-JJ&au=YYYY-MM-JJ.
+    Retourne les agrégats des contraventions de la période : nombre et
+    total des amendes, puis répartitions par établissement (du plus
+    grand nombre au plus petit), par mois, par catégorie et par statut.
+    Le paramètre facultatif 'limite' garde les N premiers établissements.
+
+    - bash 'curl -i http://127.0.0.1:5000/statistiques/periode?du='
+    'YYYY-MM-JJ&au=YYYY-MM-JJ'
+
+    Returns:
+        Response: JSON avec les agrégats ou un message d'erreur.
+    """
+    du = request.args.get("du", "")
+    au = request.args.get("au", "")
+    if not du or not au:
+        return jsonify({
+            "erreur": "Les paramètres 'du' et 'au' sont obligatoires"
+        }), 400
+    try:
+        du, au = date.fromisoformat(du), date.fromisoformat(au)
+    except ValueError:
+        return jsonify({"erreur": "Dates invalides (YYYY-MM-JJ)"}), 400
+
+    limite = request.args.get("limite")
+    if limite is not None and not limite.isdigit():
+        return jsonify({"erreur": "Paramètre 'limite' invalide"}), 400
+
+    try:
+        colonnes = moteur_analytique.colonnes(get_db())
+        return jsonify(colonnes.resume(
+            du, au, int(limite) if limite is not None else None)), 200
+    except Exception as e:
+        return jsonify({"erreur": str(e)}), 500
+
+
+def curseur_export_contraventions(db):
+    """
+    Renvoie le curseur des contraventions à exporter : toutes, ou celles
+    entre les dates 'du' et 'au' si elles sont fournies.
+    """
+    date_debut = request.args.get("du", "").replace("-", "")
+    date_fin = request.args.get("au", "").replace("-", "")
+    if date_debut and date_fin:
+        return db.curseur_contraventions_par_dates(date_debut, date_fin)
+    return db.curseur_contraventions()
+
+
+# C3
+@app.route("/contrevenants.csv", methods=["GET"])
+@mise_en_cache
+def exporter_contraventions_csv():
+    """
+    Exporte les contraventions au format CSV, diffusé en continu.
+
+    Les paramètres facultatifs 'du' et 'au' limitent l'export à une
+    période.
+
+    - bash 'curl -i --compressed http://127.0.0.1:5000/contrevenants.csv'
+
+    Returns:
+        Response: Réponse CSV ou un message d'erreur.
+    """
+    try:
+        curseur = curseur_export_contraventions(get_db())
+        entetes = [colonne[0] for colonne in curseur.description]
+
+        return reponse_flux(
+            exportations.flux_csv(
+                entetes,
+                (tuple(ligne) for ligne in exportations.lignes_curseur(
+                    curseur))
+            ),
+            "text/csv; charset=utf-8",
+            "contrevenants.csv"
+        )
+    except Exception as e:
+        return jsonify({"erreur": str(e)}), 500
+
 
+# C2
+@app.route("/contrevenants.xml", methods=["GET"])
+@mise_en_cache
+def exporter_contraventions_xml():
+    """
+    Exporte les contraventions au format XML, diffusé en continu.
+
+    Les paramètres facultatifs 'du' et 'au' limitent l'export à une
+    période.
+
+    - bash 'curl -i --compressed http://127.0.0.1:5000/contrevenants.xml'
+
+    Returns:
+        Response: Réponse XML ou un message d'erreur.
+    """
+    try:
+        curseur = curseur_export_contraventions(get_db())
+        colonnes = [
+            colonne[0] for colonne in curseur.description
+            if colonne[0] != "id_poursuite"
+        ]
+
+        elements = (
+            (
+                "contravention",
+                {"id_poursuite": ligne["id_poursuite"]},
+                [(colonne, ligne[colonne]) for colonne in colonnes]
+            )
+            for ligne in exportations.lignes_curseur(curseur)
+        )
+        return reponse_flux(
+            exportations.flux_xml("contraventions", elements),
+            "application/xml; charset=utf-8"
+        )
     except Exception as e:
         return jsonify({"erreur": str(e)}), 500
 
@@ -383,6 +672,13 @@ chemin_fichier = os.path.join(
 with open(chemin_fichier, encoding="utf-8") as f:
     utilisateur_schema = json.load(f)
 
+# E2
+chemin_fichier = os.path.join(
+    os.path.dirname(__file__), "schemas", "surveillances_schema.json"
+)
+with open(chemin_fichier, encoding="utf-8") as f:
+    surveillances_schema = json.load(f)
+
 
 # E1
 @app.route("/api/utilisateurs", methods=["POST"])
@@ -402,14 +698,14 @@ def creer_utilisateur_api():
     Returns:
         Response: Un message de succès ou d'erreur en fonction du résultat.
     """
+    if trop_d_essais():
+        return jsonify({"message": "Trop de requêtes"}), 429
+
     try:
         donnees = request.get_json()
         validate(donnees, utilisateur_schema)
 
-        salt = uuid.uuid4().hex
-        password_hash = hashlib.sha512(
-            str(donnees["password"] + salt).encode("utf-8")
-        ).hexdigest()
+        password_hash, salt = service_mdp.hacher(donnees["password"])
 
         db = get_db()
         utilisateur_id = db.creer_utilisateur(
@@ -430,6 +726,8 @@ def creer_utilisateur_api():
 
     except ValidationError as e:
         return jsonify({"message": str(e)}), 400
+    except mots_de_passe.ServiceSature as e:
+        return jsonify({"message": str(e)}), 503
     except Exception as e:
         return jsonify({"message": str(e)}), 500
 
@@ -491,10 +789,19 @@ def inscription():
                 couleur="red"
             )
 
+        # Limite avant de consulter la base : les essais répétés ne
+        # permettent pas d'énumérer les noms d'utilisateur pris
+        if trop_d_essais():
+            return render_template(
+                "inscription.html",
+                message="Trop de tentatives, réessayez plus tard.",
+                couleur="red"
+            ), 429
+
         db = get_db()
 
         # Vérifie si le nom d'utilisateur est déjà dans la base
-        if db.obtenir_utilisateur(nom_utilisateur):
+        if db.obtenir_utilisateur(nom_utilisateur, ("username",)):
             return render_template(
                 "inscription.html",
                 message="Ce nom d'utilisateur est déjà pris.",
@@ -502,10 +809,14 @@ def inscription():
             )
 
         # Hachage du mot de passe avec un salt
-        salt = uuid.uuid4().hex
-        mot_de_passe_hache = hashlib.sha512(
-            (salt + mot_de_passe).encode()
-        ).hexdigest()
+        try:
+            mot_de_passe_hache, salt = service_mdp.hacher(mot_de_passe)
+        except mots_de_passe.ServiceSature:
+            return render_template(
+                "inscription.html",
+                message="Service occupé, réessayez dans un instant.",
+                couleur="red"
+            ), 503
 
         # Création de l'utilisateur
         utilisateur_id = db.creer_utilisateur(
@@ -532,6 +843,13 @@ def inscription():
     return render_template("inscription.html")
 
 
+# Colonnes de l'utilisateur affichées sur la page de profil
+COLONNES_PROFIL = ("username", "nom", "prenom", "photo")
+
+# Durée de mise en cache d'une photo désignée par son empreinte (s)
+DUREE_CACHE_PHOTO = 365 * 24 * 3600
+
+
 # E2
 @app.route("/connexion", methods=["GET", "POST"])
 def connexion():
@@ -551,8 +869,16 @@ def connexion():
         nom_utilisateur = request.form.get("nom_utilisateur")
         mot_de_passe = request.form.get("mot_de_passe")
 
+        if trop_d_essais(nom_utilisateur):
+            return render_template(
+                "connexion.html",
+                message="Trop de tentatives, réessayez plus tard.",
+                couleur="red"
+            ), 429
+
         db = get_db()
-        utilisateur = db.obtenir_utilisateur(nom_utilisateur)
+        utilisateur = db.obtenir_utilisateur(
+            nom_utilisateur, ("username", "password_hash", "salt"))
 
         if not utilisateur:
             message = "Nom d'utilisateur ou mot de passe incorrect."
@@ -562,16 +888,37 @@ def connexion():
                 couleur="red"
             )
 
-        mot_de_passe_hash = hashlib.sha512(
-            (utilisateur["salt"] + mot_de_passe).encode()
-        ).hexdigest()
-
-        if mot_de_passe_hash == utilisateur["password_hash"]:
+        try:
+            valide, a_rehacher = service_mdp.verifier(
+                mot_de_passe or "", utilisateur["password_hash"],
+                utilisateur["salt"]
+            )
+        except mots_de_passe.ServiceSature:
+            return render_template(
+                "connexion.html",
+                message="Service occupé, réessayez dans un instant.",
+                couleur="red"
+            ), 503
+
+        if valide and a_rehacher:
+            # Mise à niveau opportuniste : remise à une prochaine
+            # connexion si le service est saturé
+            try:
+                db.changer_mot_de_passe(
+                    utilisateur["username"], *service_mdp.hacher(mot_de_passe))
+            except mots_de_passe.ServiceSature:
+                pass
+
+        if valide:
             session_id = str(uuid.uuid4())
+            if not sessions.creer(session_id, utilisateur["username"]):
+                return render_template(
+                    "connexion.html",
+                    message="Une erreur est survenue lors de la connexion.",
+                    couleur="red"
+                )
             session["utilisateur"] = utilisateur["username"]
             session["id_session"] = session_id
-
-            db.ajouter_session(session_id, utilisateur["username"])
             return redirect(url_for("accueil"))
         else:
             message = "Nom d'utilisateur ou mot de passe incorrect."
@@ -597,11 +944,9 @@ def deconnexion():
         Response: Redirection vers la page d'accueil
         avec un message flash de déconnexion.
     """
-    db = get_db()
-
     identifiant_session = session.get("id_session")
     if identifiant_session:
-        db.supprimer_session(identifiant_session)
+        sessions.supprimer(identifiant_session)
 
     session.clear()
     flash("Vous avez été déconnecté.")
@@ -624,7 +969,8 @@ def profil():
         ou une redirection vers la page de connexion.
     """
     db = get_db()
-    utilisateur = db.obtenir_utilisateur(session["utilisateur"])
+    utilisateur = db.obtenir_utilisateur(session["utilisateur"],
+                                         COLONNES_PROFIL)
 
     if not utilisateur:
         return redirect(url_for("connexion"))
@@ -639,28 +985,49 @@ def photo_profil(nom_utilisateur):
     """
     Affiche la photo de profil de l'utilisateur.
 
-    Cette fonction récupère l'image de profil de l'utilisateur spécifié
-    par le nom d'utilisateur
-    et la renvoie en tant qu'image JPEG. Si l'utilisateur
-    n'a pas de photo de profil, une erreur 404 est renvoyée.
+    Le fichier est servi depuis le magasin de photos (photos.py), avec
+    un ETag tiré de son empreinte. Le paramètre 'taille' choisit une
+    miniature (MINIATURES), si elle existe; le paramètre 'v' (empreinte)
+    rend l'URL propre à cette photo, qui est alors mise en cache pour
+    un an par le navigateur. Si l'utilisateur n'a pas de photo de
+    profil, une erreur 404 est renvoyée.
 
     Args:
         nom_utilisateur (str): Le nom d'utilisateur de l'utilisateur
         dont la photo doit être affichée.
 
     Returns:
-        Response: L'image de profil au format JPEG
-        ou une erreur 404 si aucune photo n'est trouvée.
+        Response: L'image de profil ou une erreur 404 si aucune photo
+        n'est trouvée.
     """
     db = get_db()
-    utilisateur = db.obtenir_utilisateur(nom_utilisateur)
+    utilisateur = db.obtenir_utilisateur(nom_utilisateur, ("photo",))
 
-    if utilisateur and utilisateur["photo_profil"]:
-        image = io.BytesIO(utilisateur["photo_profil"])
-        return send_file(image, mimetype="image/jpeg")
-    else:
+    if not utilisateur or not utilisateur["photo"]:
         return "", 404
 
+    empreinte = utilisateur["photo"]
+    chemin = photos.chemin_photo(empreinte)
+    taille = request.args.get("taille", type=int)
+    if taille in photos.MINIATURES:
+        miniature = photos.chemin_photo(empreinte, taille)
+        if os.path.exists(miniature):
+            chemin = miniature
+    if not os.path.exists(chemin):
+        return "", 404
+
+    mimetype = ("image/jpeg" if chemin.endswith(".jpg")
+                else photos.type_photo(chemin))
+    immuable = request.args.get("v") == empreinte
+    reponse = send_file(
+        chemin, mimetype=mimetype, conditional=True,
+        etag=os.path.basename(chemin),
+        max_age=DUREE_CACHE_PHOTO if immuable else 0
+    )
+    if immuable:
+        reponse.cache_control.immutable = True
+    return reponse
+
 
 # E2
 @app.route("/televerser-photo", methods=["POST"])
@@ -671,37 +1038,40 @@ def televerser_photo():
 
     Cette fonction vérifie que le fichier téléversé
     est une image valide (.png, .jpg, .jpeg).
-    Elle enregistre la photo dans la base de données
+    Elle copie la photo, par morceaux, dans le magasin de photos
     et redirige l'utilisateur vers la page de profil
     avec un message de succès.
 
     Returns:
-        Response: Redirection vers la page de profil
-        avec un message de succès ou d'erreur.
+        Response: La page de profil avec un message de succès ou
+        d'erreur.
     """
     photo = request.files.get("photo")
+    db = get_db()
+
+    def page_profil(message, couleur):
+        return render_template(
+            "profil.html",
+            message=message,
+            couleur=couleur,
+            utilisateur=db.obtenir_utilisateur(session["utilisateur"],
+                                               COLONNES_PROFIL)
+        )
 
     if not photo:
-        return redirect(url_for("profil"),
-                        message="Aucun fichier téléversé",
-                        couleur="red")
+        return page_profil("Aucun fichier téléversé", "red")
 
     if not photo.filename.lower().endswith((".png", ".jpg", ".jpeg")):
-        return redirect(url_for("profil"),
-                        message="Fichier non autorisé",
-                        couleur="red")
+        return page_profil("Fichier non autorisé", "red")
 
-    contenu = photo.read()
+    try:
+        empreinte = photos.enregistrer(photo.stream)
+    except ValueError as e:
+        return page_profil(str(e), "red")
 
-    db = get_db()
-    db.ajout_photo_profil(session["utilisateur"], contenu)
+    db.ajout_photo_profil(session["utilisateur"], empreinte)
 
-    return render_template(
-        "profil.html",
-        message="Photo de profil téléversée",
-        couleur="green",
-        utilisateur=db.obtenir_utilisateur(session["utilisateur"])
-    )
+    return page_profil("Photo de profil téléversée", "green")
 
 
 # E2
@@ -711,27 +1081,32 @@ def rechercher_etablissements():
     """
     Recherche les établissements en fonction d'une entrée utilisateur.
 
-    Cette fonction récupère un terme de recherche et renvoie les établissements
-    correspondants, en limitant les résultats à 10. Les résultats sont renvoyés
-    sous forme de JSON.
+    Les propositions viennent d'un index en mémoire (autocompletion.py),
+    sans requête SQL : les noms qui commencent par la saisie, puis ceux
+    dont les mots commencent par les mots saisis, puis ceux qui la
+    contiennent, chaque groupe classé par nombre de contraventions. Le
+    paramètre facultatif 'limite' (10 par défaut, 50 au plus) fixe le
+    nombre de propositions.
+
+    - bash 'curl -i http://127.0.0.1:5000/rechercher-etablissements?'
+    'entree=...&limite=10'
 
     Returns:
         Response: JSON avec les établissements
         correspondants ou une liste vide.
     """
-    entree = request.args.get("entree", "").lower()
-    db = get_db()
-    curseur = db.connexion.cursor()
-    curseur.execute("""
-        SELECT DISTINCT id_poursuite, etablissement
-        FROM contraventions
-        WHERE LOWER(etablissement) LIKE ?
-        LIMIT 10
-    """, (f"%{entree}%",))
+    entree = request.args.get("entree", "")
+    limite = request.args.get("limite", str(autocompletion.LIMITE))
+    maximum = autocompletion.LIMITE_MAX
+    if not limite.isdigit() or not 1 <= int(limite) <= maximum:
+        return jsonify({
+            "erreur": f"Le paramètre 'limite' doit être entre 1 et {maximum}"
+        }), 400
 
+    index = moteur_autocompletion.index(get_db())
     resultats = [
-        {"id": i["id_poursuite"], "nom": i["etablissement"]}
-        for i in curseur.fetchall()]
+        {"id": business_id, "nom": nom}
+        for business_id, nom in index.rechercher(entree, int(limite))]
 
     return jsonify(resultats)
 
@@ -752,7 +1127,8 @@ def etablissements_surveilles():
         avec un message de mise à jour ou un message d'erreur.
     """
     db = get_db()
-    utilisateur = db.obtenir_utilisateur(session["utilisateur"])
+    utilisateur = db.obtenir_utilisateur(session["utilisateur"],
+                                         ("username",))
 
     message = None
 
@@ -760,36 +1136,172 @@ def etablissements_surveilles():
         donnees = request.form.get("etablissements", "")
         db.ajout_etablissements_surveilles(session["utilisateur"], donnees)
         message = "Liste mise à jour."
-        utilisateur = db.obtenir_utilisateur(session["utilisateur"])
-
-    ids_etablissements = []
-    noms = []
 
-    if utilisateur and utilisateur["etablissements_surveilles"]:
-        ids_etablissements = (
-            utilisateur["etablissements_surveilles"].split(","))
-        resultats = db.etablissements_par_ids(ids_etablissements)
-        noms = [
-            f"{i['id_poursuite']} - {i['etablissement']}"
-            for i in resultats]
+    resultats = db.etablissements_surveilles(session["utilisateur"])
+    noms = [
+        f"{i['business_id']} - {i['nom']}"
+        for i in resultats]
 
     return render_template(
         "etablissements_surveilles.html",
         utilisateur=utilisateur,
         etablissements_affiches=noms,
-        etablissements_surveilles=(
-            utilisateur["etablissements_surveilles"] or ""
-        ),
+        etablissements_surveilles=",".join(
+            str(i["business_id"]) for i in resultats),
         message=message,
         couleur="green"
     )
 
 
+# E2
+@app.route("/api/surveillances", methods=["POST", "DELETE"])
+@connexion_requise
+def api_surveillances():
+    """
+    Ajoute (POST) ou retire (DELETE) des établissements de la liste de
+    surveillance de l'utilisateur connecté, sans toucher aux autres.
+
+    - bash 'curl -X POST http://127.0.0.1:5000/api/surveillances \
+        -H "Content-Type: application/json" \
+        -d '{"business_ids": [1234, 5678]}''
+
+    Returns:
+        Response: JSON avec les business_id surveillés après la mise à
+        jour, ou un message d'erreur.
+    """
+    donnees = request.get_json(silent=True)
+    try:
+        validate(donnees, surveillances_schema)
+    except ValidationError as e:
+        return jsonify({"message": e.message}), 400
+
+    db = get_db()
+    if request.method == "POST":
+        reussi = db.ajouter_surveillances(
+            session["utilisateur"], donnees["business_ids"])
+    else:
+        reussi = db.retirer_surveillances(
+            session["utilisateur"], donnees["business_ids"])
+    if not reussi:
+        return jsonify({
+            "message": "Erreur lors de la mise à jour de la liste"
+        }), 500
+
+    resultats = db.etablissements_surveilles(session["utilisateur"])
+    return jsonify({
+        "business_ids": [ligne["business_id"] for ligne in resultats]
+    }), 200
+
+
+# Âge maximal de la dernière importation réussie (heures)
+AGE_MAX_INGESTION = 26
+
+
+# A3
+@app.route("/sante", methods=["GET"])
+def sante():
+    """
+    État du service : accès à la base et fraîcheur des données selon
+    l'historique du travailleur d'ingestion.
+
+    'ingestion' vaut 'ok', 'en_retard' (dernière réussite plus vieille
+    que AGE_MAX_INGESTION heures) ou 'jamais'. La réponse est 503 si la
+    base est inaccessible.
+
+    - bash 'curl -i http://127.0.0.1:5000/sante'
+
+    Returns:
+        Response: JSON avec l'état et les dernières exécutions.
+    """
+    try:
+        db = get_db()
+        executions = [dict(ligne) for ligne in db.historique_ingestions(5)]
+    except sqlite3.Error as e:
+        return jsonify({"statut": "erreur", "erreur": str(e)}), 503
+
+    reussies = [execution["debut"] for execution in executions
+                if execution["statut"] in ("succes", "inchange")]
+    if not reussies:
+        ingestion = "jamais"
+    else:
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(reussies[0])
+        ingestion = ("ok" if age <= timedelta(hours=AGE_MAX_INGESTION)
+                     else "en_retard")
+
+    return jsonify({
+        "statut": "ok",
+        "ingestion": ingestion,
+        "executions": executions
+    }), 200
+
+
+# A3
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Mesures au format texte de Prometheus : durées des vues et des
+    méthodes de Database, lignes renvoyées, état du pool et du cache,
+    et dernière exécution du travailleur d'ingestion.
+
+    - bash 'curl http://127.0.0.1:5000/metrics'
+
+    Returns:
+        Response: Texte text/plain (format d'exposition 0.0.4).
+    """
+    jauges = [
+        ("pool_connexions_ouvertes", {}, pool.ouvertes),
+        ("cache_reponses_entrees", {}, len(cache)),
+        ("cache_reponses_octets", {}, cache.taille_octets),
+    ]
+    executions = get_db().historique_ingestions(1)
+    if executions:
+        derniere = executions[0]
+        jauges.append(("ingestion_derniere_debut_secondes", {},
+                       datetime.fromisoformat(derniere["debut"]).timestamp()))
+        jauges.append(("ingestion_derniere_duree_secondes", {},
+                       derniere["duree"]))
+        jauges.append(("ingestion_derniere_octets", {}, derniere["octets"]))
+        for colonne in ("inseres", "mis_a_jour", "rejetes", "notifications"):
+            jauges.append(("ingestion_derniere_lignes", {"type": colonne},
+                           derniere[colonne]))
+        jauges.append(("ingestion_derniere_succes", {},
+                       int(derniere["statut"] != "echec")))
+
+    return app.response_class(
+        metriques.registre.exporter(jauges),
+        mimetype="text/plain; version=0.0.4"
+    )
+
+
+# E2
+@app.route("/notifications", methods=["GET"])
+@connexion_requise
+def notifications():
+    """
+    Flux JSON des notifications de l'utilisateur connecté : nouvelles
+    contraventions ou changements de statut des établissements surveillés.
+
+    Le paramètre facultatif 'depuis' (dernier id_notification reçu) ne
+    renvoie que les notifications plus récentes.
+
+    - bash 'curl -i http://127.0.0.1:5000/notifications?depuis=0'
+
+    Returns:
+        Response: JSON avec les notifications ou un message d'erreur.
+    """
+    depuis = request.args.get("depuis", "0")
+    if not depuis.isdigit():
+        return jsonify({"erreur": "Paramètre 'depuis' invalide"}), 400
+
+    db = get_db()
+    lignes = db.notifications_utilisateur(session["utilisateur"], int(depuis))
+    return jsonify([dict(ligne) for ligne in lignes]), 200
+
+
 # E3
 if __name__ == '__main__':
     """
-    Démarre l'application Flask et configure
-    la mise à jour quotidienne de la base de données.
+    Démarre l'application Flask. Les mises à jour quotidiennes sont
+    faites par travailleur_ingestion.py, lancé à part.
     """
-    maj_minuit()
     app.run(debug=True)
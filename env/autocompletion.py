@@ -0,0 +1,256 @@
+import bisect
+import heapq
+import threading
+import unicodedata
+from array import array
+
+
+# Nombre de propositions par défaut, et maximal (paramètre 'limite')
+LIMITE = 10
+LIMITE_MAX = 50
+
+# Longueur maximale des préfixes dont les propositions sont préparées
+LONGUEUR_PREFIXE = 4
+
+# Longueur des n-grammes de l'index des sous-chaînes
+TAILLE_NGRAMME = 3
+
+# Borne supérieure des mots commençant par un préfixe donné
+FIN_PREFIXE = "\U0010ffff"
+
+
+def replier(texte):
+    """
+    Met un texte sous la forme comparée par l'autocomplétion : sans
+    accents ni majuscules, la ponctuation remplacée par des espaces.
+
+    Args:
+        texte (str): Texte saisi ou nom d'établissement.
+
+    Returns:
+        str: Mots séparés par une seule espace.
+    """
+    decompose = unicodedata.normalize("NFKD", texte.casefold())
+    lettres = "".join(
+        caractere if caractere.isalnum() else " "
+        for caractere in decompose if not unicodedata.combining(caractere)
+    )
+    return " ".join(lettres.split())
+
+
+def _ngrammes(texte):
+    return {
+        texte[i:i + TAILLE_NGRAMME]
+        for i in range(len(texte) - TAILLE_NGRAMME + 1)
+    }
+
+
+def _ajouter(listes, prefixes, rang):
+    # Ajoute un rang aux listes des préfixes, chacune limitée à LIMITE_MAX
+    for prefixe in prefixes:
+        rangs = listes.get(prefixe)
+        if rangs is None:
+            listes[prefixe] = array("I", (rang,))
+        elif len(rangs) < LIMITE_MAX:
+            rangs.append(rang)
+
+
+class IndexEtablissements:
+    """
+    Index en mémoire des noms d'établissements pour l'autocomplétion.
+
+    Les établissements sont numérotés par rang : du plus grand nombre de
+    contraventions au plus petit, puis par nom et par business_id. Les
+    listes de rangs ci-dessous sont croissantes, donc déjà classées :
+    - pour chaque préfixe de mot d'au plus LONGUEUR_PREFIXE caractères,
+      les LIMITE_MAX premiers noms dont le premier mot commence par ce
+      préfixe, puis les LIMITE_MAX premiers dont seul un mot suivant
+      commence par lui : les saisies courtes, qui correspondent au plus
+      grand nombre de noms, sont de simples lectures de dictionnaire;
+    - les n-grammes des noms, chacun associé aux rangs qui le
+      contiennent, pour les saisies au milieu d'un mot.
+    S'y ajoutent les noms triés et les mots des noms triés, où une
+    recherche dichotomique (bisect) trouve ceux qui commencent par la
+    saisie ou par l'un des mots saisis.
+
+    Une instance n'est jamais modifiée : elle peut être lue par plusieurs
+    fils.
+    """
+
+    def __init__(self, version, etablissements):
+        """
+        Args:
+            version (str): Version des données indexées.
+            etablissements (iterable): Lignes (business_id, nom,
+                nb_contraventions); un business_id en double garde la
+                ligne qui a le plus de contraventions. Un nom sans
+                lettre ni chiffre (« & », « - ») n'est pas indexé.
+        """
+        uniques = {}
+        for business_id, nom, nb in etablissements:
+            replie = replier(nom or "")
+            if replie and (business_id not in uniques
+                           or (nb or 0) > uniques[business_id][3]):
+                uniques[business_id] = (replie, business_id, nom, nb or 0)
+
+        lignes = sorted(
+            uniques.values(),
+            key=lambda ligne: (-ligne[3], ligne[0], ligne[2], ligne[1])
+        )
+        self.version = version
+        self.replies = [ligne[0] for ligne in lignes]
+        self.business_ids = [ligne[1] for ligne in lignes]
+        self.noms = [ligne[2] for ligne in lignes]
+
+        noms = sorted(
+            (replie, rang) for rang, replie in enumerate(self.replies))
+        self.noms_tries = [replie for replie, _ in noms]
+        self.rangs_noms = array("I", (rang for _, rang in noms))
+
+        mots = sorted(
+            (mot, rang)
+            for rang, replie in enumerate(self.replies)
+            for mot in set(replie.split())
+        )
+        self.mots = [mot for mot, _ in mots]
+        self.rangs_mots = array("I", (rang for _, rang in mots))
+
+        self.premiers = {}
+        self.suivants = {}
+        self.ngrammes = {}
+        for rang, replie in enumerate(self.replies):
+            premier, *autres = replie.split()
+            prefixes = {
+                premier[:i]
+                for i in range(1, min(len(premier), LONGUEUR_PREFIXE) + 1)
+            }
+            _ajouter(self.premiers, prefixes, rang)
+            _ajouter(self.suivants, {
+                mot[:i] for mot in autres
+                for i in range(1, min(len(mot), LONGUEUR_PREFIXE) + 1)
+            } - prefixes, rang)
+            for ngramme in _ngrammes(replie):
+                self.ngrammes.setdefault(ngramme, array("I")).append(rang)
+
+    def __len__(self):
+        return len(self.noms)
+
+    @staticmethod
+    def _intervalle(cles, prefixe):
+        # Indices des clés triées qui commencent par 'prefixe'
+        debut = bisect.bisect_left(cles, prefixe)
+        return debut, bisect.bisect_left(cles, prefixe + FIN_PREFIXE, debut)
+
+    def _commencant_par(self, mots):
+        # Rangs croissants des noms dont un mot commence par l'un des mots
+        # saisis : celui qui en donne le moins
+        debut, fin = min(
+            (self._intervalle(self.mots, mot) for mot in mots),
+            key=lambda intervalle: intervalle[1] - intervalle[0])
+        return sorted(set(self.rangs_mots[debut:fin]))
+
+    def _contenant(self, texte):
+        # Rangs des noms qui contiennent le n-gramme le plus rare de
+        # 'texte' : ceux qui contiennent 'texte' en font partie
+        listes = []
+        for ngramme in _ngrammes(texte):
+            rangs = self.ngrammes.get(ngramme)
+            if rangs is None:
+                return ()
+            listes.append(rangs)
+        return min(listes, key=len)
+
+    def rechercher(self, entree, limite=LIMITE):
+        """
+        Propose les établissements correspondant à une saisie, du plus
+        pertinent au moins pertinent :
+        1. le nom commence par la saisie;
+        2. chaque mot saisi commence un mot du nom;
+        3. le nom contient la saisie (au moins TAILLE_NGRAMME
+           caractères).
+        À pertinence égale, l'ordre est celui des rangs : le résultat
+        est stable pour une même version des données.
+
+        Args:
+            entree (str): Saisie de l'utilisateur (limite <= LIMITE_MAX).
+            limite (int): Nombre maximal de propositions.
+
+        Returns:
+            list: Tuples (business_id, nom).
+        """
+        requete = replier(entree)
+        if not requete or limite <= 0:
+            return []
+        mots = requete.split()
+
+        if len(mots) == 1 and len(requete) <= LONGUEUR_PREFIXE:
+            # Pertinences 1 et 2 : listes préparées, déjà classées
+            rangs = list(self.premiers.get(requete, ())[:limite])
+            if len(rangs) < limite:
+                rangs.extend(self.suivants.get(requete, ())[
+                    :limite - len(rangs)])
+        else:
+            # Pertinence 1 : noms qui commencent par la saisie
+            debut, fin = self._intervalle(self.noms_tries, requete)
+            rangs = heapq.nsmallest(limite, self.rangs_noms[debut:fin])
+
+            # Pertinence 2, par rang croissant; un mot du nom commence
+            # par un mot saisi s'il suit une espace
+            if len(rangs) < limite:
+                trouves = set(rangs)
+                debuts = [" " + mot for mot in mots]
+                for rang in self._commencant_par(mots):
+                    replie = " " + self.replies[rang]
+                    for debut in debuts:
+                        if debut not in replie:
+                            break
+                    else:
+                        if rang not in trouves:
+                            rangs.append(rang)
+                            if len(rangs) == limite:
+                                break
+
+        # Pertinence 3, par rang croissant, s'il manque des propositions
+        if len(rangs) < limite and len(requete) >= TAILLE_NGRAMME:
+            trouves = set(rangs)
+            for rang in self._contenant(requete):
+                if rang not in trouves and requete in self.replies[rang]:
+                    rangs.append(rang)
+                    if len(rangs) == limite:
+                        break
+
+        return [(self.business_ids[rang], self.noms[rang]) for rang in rangs]
+
+
+class MoteurAutocompletion:
+    """
+    Garde l'index des établissements de la version courante des données
+    et le reconstruit quand une importation (A1) change cette version.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._verrou = threading.Lock()
+
+    def index(self, db):
+        """
+        Renvoie l'index de la version courante des données, reconstruit
+        au besoin.
+
+        Args:
+            db (base_de_donnees.Database): Connexion à la base.
+
+        Returns:
+            IndexEtablissements: Index des noms d'établissements.
+        """
+        version = str(db.version_donnees())
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+        with self._verrou:
+            index = self._index
+            if index is None or index.version != version:
+                index = IndexEtablissements(
+                    version, db.lister_etablissements_classes())
+                self._index = index
+        return index
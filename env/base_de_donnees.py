@@ -1,5 +1,16 @@
+import metriques
+import photos
 import sqlite3
 import os
+import io
+import pathlib
+import re
+import json
+import operator
+import queue
+import threading
+import time
+from contextlib import contextmanager
 
 CHEMMIN_SQL = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "db", "db.sql"
@@ -8,41 +19,811 @@ CHEMIN_BD = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "db", "base_de_donnees.db"
 )
 
+# Nombre maximal de connexions ouvertes par le pool d'un processus
+TAILLE_POOL = 8
 
+# Délai d'attente d'une connexion libre du pool (secondes)
+DELAI_POOL = 10
+
+# Attente maximale du verrou d'écriture par migrer_schema, pendant qu'un
+# autre processus applique les migrations (secondes)
+DELAI_MIGRATION = 300
+
+# Pause entre deux tentatives d'obtenir ce verrou (secondes)
+PAUSE_MIGRATION = 0.05
+
+# Colonnes de la table utilisateurs lisibles par obtenir_utilisateur
+# (la photo est une empreinte du magasin photos.py)
+COLONNES_UTILISATEUR = (
+    "username", "password_hash", "salt", "nom", "prenom", "photo"
+)
+
+# Colonnes de la table contraventions, dans l'ordre de SELECT *
+CHAMPS_CONTRAVENTION = (
+    "id_poursuite", "business_id", "date", "description", "adresse",
+    "date_jugement", "etablissement", "montant", "proprietaire", "ville",
+    "statut", "date_statut", "categorie"
+)
+
+# Réglages appliqués à chaque connexion ouverte
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Agrégats par établissement, recalculés pour les établissements
+# touchés par une importation (ou pour tous, sans filtre)
+REQUETE_STATISTIQUES = """
+    INSERT INTO stats_etablissements (
+        etablissement, nb, montant_total,
+        premiere_date, derniere_date, categories
+    )
+    SELECT etablissement, SUM(nb), SUM(montant),
+           MIN(premiere_date), MAX(derniere_date),
+           json_group_object(categorie, nb)
+      FROM (
+            SELECT etablissement, COALESCE(categorie, '') AS categorie,
+                   COUNT(*) AS nb, SUM(montant) AS montant,
+                   MIN(date) AS premiere_date, MAX(date) AS derniere_date
+              FROM contraventions
+             {filtre}
+             GROUP BY etablissement, categorie
+           )
+     GROUP BY etablissement
+"""
+
+# Établissements dont une contravention figure dans temp.delta
+FILTRE_DELTA = """
+    WHERE etablissement IN (
+        SELECT contraventions.etablissement
+          FROM temp.delta
+          JOIN contraventions USING (id_poursuite)
+    )
+"""
+
+
+def identifiants_valides(valeurs):
+    """
+    Garde les identifiants (business_id) formés de chiffres seulement,
+    entiers ou chaînes; les autres valeurs sont ignorées.
+
+    Args:
+        valeurs (iterable): Identifiants saisis.
+
+    Returns:
+        list: Identifiants convertis en entiers.
+    """
+    return [int(i) for i in map(str, valeurs) if i.strip().isdigit()]
+
+
+def executer_script(connexion, script):
+    """
+    Exécute un script SQL instruction par instruction, dans la
+    transaction en cours (contrairement à executescript, qui la valide
+    d'abord).
+
+    Args:
+        connexion (sqlite3.Connection): Connexion à la base.
+        script (str): Instructions séparées par des points-virgules.
+    """
+    instruction = ""
+    for ligne in script.splitlines(keepends=True):
+        instruction += ligne
+        # Les ';' des corps de déclencheurs ne terminent pas l'instruction
+        if sqlite3.complete_statement(instruction):
+            connexion.execute(instruction)
+            instruction = ""
+    if instruction.strip():
+        connexion.execute(instruction)
+
+
+@contextmanager
+def declencheurs_suspendus(connexion, table):
+    """
+    Supprime les déclencheurs de 'table' (ceux du schéma et ceux,
+    temporaires, de la connexion) le temps d'un chargement en masse,
+    puis les recrée, sans valider la transaction : les autres connexions
+    ne voient jamais la table sans ses déclencheurs. Si le chargement
+    échoue, l'annulation de la transaction les rétablit.
+
+    Ce que tenaient à jour les déclencheurs (index plein texte, table
+    'delta') est à reconstruire par l'appelant.
+
+    Args:
+        connexion (sqlite3.Connection): Connexion à la base.
+        table (str): Table chargée.
+    """
+    declencheurs = connexion.execute("""
+        SELECT 'main', name, sql FROM main.sqlite_master
+         WHERE type = 'trigger' AND tbl_name = :table
+        UNION ALL
+        SELECT 'temp', name, sql FROM temp.sqlite_master
+         WHERE type = 'trigger' AND tbl_name = :table
+    """, {"table": table}).fetchall()
+    # sqlite3 n'ouvre pas de transaction avant un DROP : sans elle, la
+    # suppression serait validée aussitôt
+    if not connexion.in_transaction:
+        connexion.execute("BEGIN IMMEDIATE")
+    for schema, nom, _ in declencheurs:
+        connexion.execute(f'DROP TRIGGER {schema}."{nom}"')
+    yield
+    for schema, _, sql in declencheurs:
+        if schema == "temp":
+            # sqlite_master garde « CREATE TRIGGER », sans TEMP
+            sql = re.sub(r"^CREATE\s+TRIGGER", "CREATE TEMP TRIGGER", sql,
+                         flags=re.IGNORECASE)
+        connexion.execute(sql)
+
+
+def reconstruire_statistiques(connexion, delta=False):
+    """
+    Recalcule la table stats_etablissements (sans valider la transaction).
+
+    Args:
+        connexion (sqlite3.Connection): Connexion à la base.
+        delta (bool): Si vrai, seuls les établissements dont une
+            contravention figure dans la table temporaire 'delta'
+            (voir fonctionnalites.suivre_changements) sont recalculés.
+    """
+    filtre = FILTRE_DELTA if delta else ""
+    connexion.execute(f"DELETE FROM stats_etablissements {filtre}")
+    connexion.execute(REQUETE_STATISTIQUES.format(filtre=filtre))
+
+
+def _migration_statistiques(connexion):
+    executer_script(connexion, """
+        CREATE TABLE IF NOT EXISTS stats_etablissements (
+            etablissement VARCHAR(255) PRIMARY KEY,
+            nb INTEGER NOT NULL,
+            montant_total INTEGER,
+            premiere_date DATE,
+            derniere_date DATE,
+            categories TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_stats_etablissements_nb
+            ON stats_etablissements (nb DESC);
+    """)
+    reconstruire_statistiques(connexion)
+
+
+# Fiche de chaque établissement (business_id) : nom, propriétaire et
+# adresse de sa contravention la plus récente, et compteurs
+REQUETE_ETABLISSEMENTS = """
+    INSERT INTO etablissements (
+        business_id, nom, proprietaire, adresse, ville,
+        nb_contraventions, montant_total, derniere_date
+    )
+    SELECT business_id, etablissement, proprietaire, adresse, ville,
+           COUNT(*), SUM(montant), MAX(date)
+      FROM contraventions
+     WHERE {filtre}
+     GROUP BY business_id
+        ON CONFLICT(business_id) DO UPDATE
+       SET nom = excluded.nom,
+           proprietaire = excluded.proprietaire,
+           adresse = excluded.adresse,
+           ville = excluded.ville,
+           nb_contraventions = excluded.nb_contraventions,
+           montant_total = excluded.montant_total,
+           derniere_date = excluded.derniere_date
+"""
+
+
+def reconstruire_etablissements(connexion, delta=False):
+    """
+    Met à jour la table etablissements (sans valider la transaction).
+
+    Les colonnes descriptives proviennent de la contravention la plus
+    récente de chaque établissement (MAX(date) d'SQLite fixe la ligne
+    dont sont tirées les autres colonnes).
+
+    Args:
+        connexion (sqlite3.Connection): Connexion à la base.
+        delta (bool): Si vrai, seuls les établissements dont une
+            contravention figure dans la table temporaire 'delta'
+            sont mis à jour.
+    """
+    if delta:
+        filtre = """business_id IN (
+            SELECT contraventions.business_id
+              FROM temp.delta
+              JOIN contraventions USING (id_poursuite)
+        )"""
+    else:
+        filtre = "1"
+    connexion.execute(REQUETE_ETABLISSEMENTS.format(filtre=filtre))
+
+
+def _migration_etablissements(connexion):
+    executer_script(connexion, """
+        CREATE TABLE IF NOT EXISTS etablissements (
+            business_id INTEGER PRIMARY KEY,
+            nom VARCHAR(255) NOT NULL,
+            proprietaire VARCHAR(255),
+            adresse VARCHAR(255),
+            ville VARCHAR(255),
+            nb_contraventions INTEGER NOT NULL DEFAULT 0,
+            montant_total INTEGER,
+            derniere_date DATE
+        );
+        CREATE INDEX IF NOT EXISTS idx_etablissements_nom
+            ON etablissements (nom);
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS etablissements_fts USING fts5(
+            nom,
+            content='etablissements', content_rowid='business_id',
+            tokenize='unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS etablissements_fts_ai
+        AFTER INSERT ON etablissements BEGIN
+            INSERT INTO etablissements_fts (rowid, nom)
+            VALUES (new.business_id, new.nom);
+        END;
+        CREATE TRIGGER IF NOT EXISTS etablissements_fts_ad
+        AFTER DELETE ON etablissements BEGIN
+            INSERT INTO etablissements_fts (etablissements_fts, rowid, nom)
+            VALUES ('delete', old.business_id, old.nom);
+        END;
+        CREATE TRIGGER IF NOT EXISTS etablissements_fts_au
+        AFTER UPDATE OF nom ON etablissements BEGIN
+            INSERT INTO etablissements_fts (etablissements_fts, rowid, nom)
+            VALUES ('delete', old.business_id, old.nom);
+            INSERT INTO etablissements_fts (rowid, nom)
+            VALUES (new.business_id, new.nom);
+        END;
+    """)
+    reconstruire_etablissements(connexion)
+
+    # Les listes de surveillance contenaient des id_poursuite : elles
+    # désignent désormais des business_id.
+    colonnes = [
+        colonne[1] for colonne in
+        connexion.execute("PRAGMA table_info(utilisateurs)").fetchall()
+    ]
+    if "etablissements_surveilles" not in colonnes:
+        return
+
+    utilisateurs = connexion.execute("""
+        SELECT username, etablissements_surveilles
+          FROM utilisateurs
+         WHERE etablissements_surveilles <> ''
+    """).fetchall()
+    for username, liste in utilisateurs:
+        ids = [int(i) for i in liste.split(",") if i.strip().isdigit()]
+        business_ids = connexion.execute("""
+            SELECT DISTINCT business_id
+              FROM contraventions
+             WHERE id_poursuite IN (SELECT value FROM json_each(?))
+        """, (json.dumps(ids),)).fetchall()
+        connexion.execute("""
+            UPDATE utilisateurs
+               SET etablissements_surveilles = ?
+             WHERE username = ?
+        """, (",".join(str(b[0]) for b in business_ids), username))
+
+
+def _migration_surveillances(connexion):
+    executer_script(connexion, """
+        CREATE TABLE IF NOT EXISTS surveillances (
+            username TEXT NOT NULL,
+            business_id INTEGER NOT NULL,
+            PRIMARY KEY (username, business_id),
+            FOREIGN KEY(username) REFERENCES utilisateurs(username)
+                ON DELETE CASCADE
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_surveillances_business_id
+            ON surveillances (business_id, username);
+    """)
+
+    # Reprise des listes enregistrées sous forme de texte "id1,id2,..."
+    colonnes = [
+        colonne[1] for colonne in
+        connexion.execute("PRAGMA table_info(utilisateurs)").fetchall()
+    ]
+    if "etablissements_surveilles" not in colonnes:
+        return
+
+    utilisateurs = connexion.execute("""
+        SELECT username, etablissements_surveilles
+          FROM utilisateurs
+         WHERE etablissements_surveilles <> ''
+    """).fetchall()
+    connexion.executemany(
+        "INSERT OR IGNORE INTO surveillances (username, business_id) "
+        "VALUES (?, ?)",
+        [
+            (username, int(i))
+            for username, liste in utilisateurs
+            for i in liste.split(",") if i.strip().isdigit()
+        ]
+    )
+
+
+def _migration_sessions(connexion):
+    colonnes = {
+        ligne[1] for ligne in connexion.execute("PRAGMA table_info(sessions)")
+    }
+    for colonne in ("cree_le", "vu_le"):
+        if colonne not in colonnes:
+            connexion.execute(
+                f"ALTER TABLE sessions ADD COLUMN {colonne} "
+                "INTEGER NOT NULL DEFAULT 0"
+            )
+    executer_script(connexion, """
+        UPDATE sessions
+           SET cree_le = CAST(strftime('%s', 'now') AS INTEGER),
+               vu_le = CAST(strftime('%s', 'now') AS INTEGER)
+         WHERE vu_le = 0;
+        CREATE INDEX IF NOT EXISTS idx_sessions_vu_le ON sessions (vu_le);
+    """)
+
+
+def _migration_photos(connexion):
+    colonnes = {
+        ligne[1]
+        for ligne in connexion.execute("PRAGMA table_info(utilisateurs)")
+    }
+    if "photo" not in colonnes:
+        connexion.execute("ALTER TABLE utilisateurs ADD COLUMN photo TEXT")
+
+    # Une photo à la fois, pour ne pas charger toutes les images
+    utilisateurs = connexion.execute(
+        "SELECT username FROM utilisateurs WHERE photo_profil IS NOT NULL"
+    ).fetchall()
+    for (username,) in utilisateurs:
+        contenu = connexion.execute(
+            "SELECT photo_profil FROM utilisateurs WHERE username = ?",
+            (username,)
+        ).fetchone()[0]
+        empreinte = photos.enregistrer(
+            io.BytesIO(contenu), taille_max=None, verifier=False)
+        connexion.execute("""
+            UPDATE utilisateurs SET photo = ?, photo_profil = NULL
+             WHERE username = ?
+        """, (empreinte, username))
+
+
+# Migrations appliquées, dans l'ordre, après le schéma de base db/db.sql.
+# PRAGMA user_version retient le nombre de migrations déjà appliquées.
+MIGRATIONS = [
+    # 1 - Métadonnées de l'importation A1 (validateurs HTTP, empreinte)
+    """
+    CREATE TABLE IF NOT EXISTS metadonnees (
+        cle TEXT PRIMARY KEY,
+        valeur TEXT
+    );
+    """,
+    # 2 - Index secondaires des contraventions (dates, établissements)
+    """
+    CREATE INDEX IF NOT EXISTS idx_contraventions_date
+        ON contraventions (date);
+    CREATE INDEX IF NOT EXISTS idx_contraventions_etablissement_date
+        ON contraventions (etablissement, date);
+    CREATE INDEX IF NOT EXISTS idx_contraventions_business_id
+        ON contraventions (business_id);
+    ANALYZE contraventions;
+    """,
+    # 3 - Index plein texte (FTS5) des noms, propriétaires et adresses,
+    #     synchronisé par déclencheurs lors des importations A1
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS contraventions_fts USING fts5(
+        etablissement, proprietaire, adresse,
+        content='contraventions', content_rowid='id_poursuite',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS contraventions_fts_ai
+    AFTER INSERT ON contraventions BEGIN
+        INSERT INTO contraventions_fts (
+            rowid, etablissement, proprietaire, adresse
+        ) VALUES (
+            new.id_poursuite, new.etablissement, new.proprietaire, new.adresse
+        );
+    END;
+    CREATE TRIGGER IF NOT EXISTS contraventions_fts_ad
+    AFTER DELETE ON contraventions BEGIN
+        INSERT INTO contraventions_fts (
+            contraventions_fts, rowid, etablissement, proprietaire, adresse
+        ) VALUES (
+            'delete', old.id_poursuite,
+            old.etablissement, old.proprietaire, old.adresse
+        );
+    END;
+    CREATE TRIGGER IF NOT EXISTS contraventions_fts_au
+    AFTER UPDATE OF etablissement, proprietaire, adresse
+    ON contraventions BEGIN
+        INSERT INTO contraventions_fts (
+            contraventions_fts, rowid, etablissement, proprietaire, adresse
+        ) VALUES (
+            'delete', old.id_poursuite,
+            old.etablissement, old.proprietaire, old.adresse
+        );
+        INSERT INTO contraventions_fts (
+            rowid, etablissement, proprietaire, adresse
+        ) VALUES (
+            new.id_poursuite, new.etablissement, new.proprietaire, new.adresse
+        );
+    END;
+    INSERT INTO contraventions_fts (contraventions_fts) VALUES ('rebuild');
+    """,
+    # 4 - Statistiques précalculées par établissement (C1, C2, C3)
+    _migration_statistiques,
+    # 5 - Table des établissements (business_id) et son index plein texte
+    _migration_etablissements,
+    # 6 - Établissements surveillés : table de liaison utilisateur/business_id
+    _migration_surveillances,
+    # 7 - Notifications des nouvelles contraventions aux surveillants
+    """
+    CREATE TABLE IF NOT EXISTS notifications (
+        id_notification INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        business_id INTEGER NOT NULL,
+        id_poursuite INTEGER NOT NULL,
+        nature TEXT NOT NULL,
+        cree_le TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(username) REFERENCES utilisateurs(username)
+            ON DELETE CASCADE
+    );
+    CREATE INDEX IF NOT EXISTS idx_notifications_username
+        ON notifications (username, id_notification);
+    """,
+    # 8 - Horodatage des sessions (création, dernière activité) pour
+    #     leur expiration
+    _migration_sessions,
+    # 9 - Photos de profil déplacées dans le magasin de fichiers
+    _migration_photos,
+    # 10 - Historique des importations du travailleur d'ingestion
+    """
+    CREATE TABLE IF NOT EXISTS executions_ingestion (
+        id_execution INTEGER PRIMARY KEY,
+        debut TEXT NOT NULL,
+        duree REAL NOT NULL,
+        statut TEXT NOT NULL,
+        tentatives INTEGER NOT NULL,
+        octets INTEGER NOT NULL DEFAULT 0,
+        inseres INTEGER NOT NULL DEFAULT 0,
+        mis_a_jour INTEGER NOT NULL DEFAULT 0,
+        rejetes INTEGER NOT NULL DEFAULT 0,
+        notifications INTEGER NOT NULL DEFAULT 0,
+        erreur TEXT
+    );
+    """,
+    # 11 - L'autocomplétion E2 passe par un index en mémoire
+    #      (autocompletion.py) : l'index plein texte des établissements
+    #      et ses déclencheurs ne servent plus
+    """
+    DROP TRIGGER IF EXISTS etablissements_fts_ai;
+    DROP TRIGGER IF EXISTS etablissements_fts_ad;
+    DROP TRIGGER IF EXISTS etablissements_fts_au;
+    DROP TABLE IF EXISTS etablissements_fts;
+    """,
+]
+
+
+def _verrouiller(connexion):
+    # BEGIN IMMEDIATE, en attendant qu'un autre processus ait terminé
+    # ses migrations (une migration peut dépasser busy_timeout)
+    echeance = time.monotonic() + DELAI_MIGRATION
+    while True:
+        try:
+            connexion.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError:
+            if time.monotonic() > echeance:
+                raise
+            time.sleep(PAUSE_MIGRATION)
+
+
+def migrer_schema(connexion):
+    """
+    Crée le schéma de base s'il est absent puis applique les migrations
+    qui ne l'ont pas encore été.
+
+    Plusieurs processus (pool, fil d'écriture, A1, travailleur
+    d'ingestion) peuvent migrer la même base au même moment : chaque
+    migration est appliquée sous le verrou d'écriture (BEGIN IMMEDIATE),
+    après avoir relu user_version, et validée dans la même transaction
+    que la hausse de user_version.
+
+    Args:
+        connexion (sqlite3.Connection): Connexion à la base à migrer.
+    """
+    while True:
+        version = connexion.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(MIGRATIONS):
+            return
+
+        _verrouiller(connexion)
+        try:
+            version = connexion.execute(
+                "PRAGMA user_version").fetchone()[0]
+            if version >= len(MIGRATIONS):
+                connexion.rollback()
+                return
+
+            if version == 0 and not connexion.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' "
+                "AND name='contraventions'"
+            ).fetchone():
+                with open(CHEMMIN_SQL, "r", encoding="utf-8") as f:
+                    executer_script(connexion, f.read())
+
+            migration = MIGRATIONS[version]
+            if callable(migration):
+                migration(connexion)
+            else:
+                executer_script(connexion, migration)
+            connexion.execute(f"PRAGMA user_version = {version + 1}")
+            connexion.commit()
+        except BaseException:
+            connexion.rollback()
+            raise
+
+
+def expression_fts(colonne, texte):
+    """
+    Construit une expression FTS5 où chaque mot du texte est un préfixe
+    recherché dans la colonne donnée.
+
+    Seuls les caractères de mots sont conservés, ce qui neutralise la
+    syntaxe de requête FTS5 (guillemets, opérateurs, parenthèses).
+
+    Args:
+        colonne (str): Colonne de contraventions_fts.
+        texte (str): Saisie de l'utilisateur.
+
+    Returns:
+        str: Expression FTS5, vide si le texte ne contient aucun mot.
+    """
+    return " AND ".join(
+        f'{colonne} : "{mot}"*' for mot in re.findall(r"\w+", texte)
+    )
+
+
+class Contravention(tuple):
+    """
+    Contravention lue dans la table 'contraventions'.
+
+    C'est un tuple, sans dictionnaire par instance (__slots__ vide) : les
+    champs se lisent par attribut (c.date), par nom (c["date"], comme
+    avec sqlite3.Row) ou par position. keys() permet dict(c).
+    """
+
+    __slots__ = ()
+
+    champs = CHAMPS_CONTRAVENTION
+    _positions = {nom: i for i, nom in enumerate(CHAMPS_CONTRAVENTION)}
+
+    def __getitem__(self, cle):
+        if isinstance(cle, str):
+            try:
+                cle = self._positions[cle]
+            except KeyError:
+                raise IndexError(f"Champ inconnu : {cle}") from None
+        return tuple.__getitem__(self, cle)
+
+    def keys(self):
+        return list(self.champs)
+
+    def __repr__(self):
+        return f"Contravention({self.id_poursuite}, {self.date!r})"
+
+
+for _position, _champ in enumerate(CHAMPS_CONTRAVENTION):
+    setattr(Contravention, _champ,
+            property(operator.itemgetter(_position)))
+del _position, _champ
+
+
+def fabrique_contravention(curseur, ligne):
+    """
+    Fabrique de lignes (row_factory) qui renvoie des Contravention.
+    """
+    return tuple.__new__(Contravention, ligne)
+
+
+def ouvrir_connexion(chemin=None, lecture_seule=False):
+    """
+    Ouvre une connexion SQLite configurée (WAL, cache, mmap...).
+
+    La connexion peut changer de fil d'exécution, ce qui permet au pool
+    de la confier successivement à plusieurs requêtes.
+
+    Args:
+        chemin (str, optional): Fichier de la base (CHEMIN_BD par défaut).
+        lecture_seule (bool): Si vrai, la base est ouverte en lecture
+            seule (mode=ro) : toute écriture échoue.
+
+    Returns:
+        sqlite3.Connection: Connexion dont les lignes sont des sqlite3.Row.
+    """
+    chemin = chemin or CHEMIN_BD
+    if lecture_seule:
+        connexion = sqlite3.connect(
+            f"{pathlib.Path(os.path.abspath(chemin)).as_uri()}?mode=ro",
+            uri=True, check_same_thread=False
+        )
+    else:
+        connexion = sqlite3.connect(chemin, check_same_thread=False)
+    connexion.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        connexion.execute(pragma)
+    if metriques.SEUIL_LENT:
+        connexion.set_trace_callback(metriques.tracer)
+    return connexion
+
+
+class PoolConnexions:
+    """
+    Pool borné de connexions SQLite réutilisées d'une requête à l'autre.
+
+    Les connexions sont ouvertes à la demande, jusqu'à 'taille', puis
+    conservées; au-delà, acquerir attend qu'une connexion soit libérée.
+    Le schéma est migré à l'ouverture de la première connexion, sauf
+    pour un pool en lecture seule.
+    """
+
+    def __init__(self, taille=TAILLE_POOL, chemin=None, lecture_seule=False):
+        self.taille = taille
+        self.chemin = chemin
+        self.lecture_seule = lecture_seule
+        self._libres = queue.LifoQueue()
+        self._ouvertes = 0
+        self._verrou = threading.Lock()
+        self._migre = False
+        self._verrou_migration = threading.Lock()
+
+    def acquerir(self, delai=DELAI_POOL):
+        """
+        Renvoie une connexion libre, ouverte au besoin.
+
+        Args:
+            delai (float): Attente maximale d'une connexion (secondes).
+
+        Returns:
+            sqlite3.Connection: Connexion configurée.
+
+        Raises:
+            sqlite3.OperationalError: Si aucune connexion ne se libère.
+        """
+        try:
+            return self._libres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._verrou:
+            ouvrir = self._ouvertes < self.taille
+            if ouvrir:
+                self._ouvertes += 1
+        if ouvrir:
+            try:
+                connexion = ouvrir_connexion(self.chemin, self.lecture_seule)
+                if not self.lecture_seule:
+                    self._migrer(connexion)
+                return connexion
+            except sqlite3.Error:
+                with self._verrou:
+                    self._ouvertes -= 1
+                raise
+
+        try:
+            return self._libres.get(timeout=delai)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                "Aucune connexion libre dans le pool")
+
+    @property
+    def ouvertes(self):
+        """
+        Nombre de connexions actuellement ouvertes par le pool.
+        """
+        return self._ouvertes
+
+    def _migrer(self, connexion):
+        # Une seule migration par pool, même si plusieurs connexions
+        # sont ouvertes en même temps
+        if self._migre:
+            return
+        with self._verrou_migration:
+            if not self._migre:
+                migrer_schema(connexion)
+                self._migre = True
+
+    def liberer(self, connexion):
+        """
+        Rend une connexion au pool, en annulant toute transaction laissée
+        ouverte par la requête.
+
+        Args:
+            connexion (sqlite3.Connection): Connexion obtenue par acquerir.
+        """
+        if connexion.in_transaction:
+            connexion.rollback()
+        self._libres.put(connexion)
+
+    def fermer(self):
+        """
+        Ferme les connexions libres du pool.
+        """
+        while True:
+            try:
+                connexion = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            connexion.close()
+            with self._verrou:
+                self._ouvertes -= 1
+
+
+@metriques.instrumenter
 class Database:
-    def __init__(self):
-        self.connexion = sqlite3.connect(CHEMIN_BD)
-        self.connexion.row_factory = sqlite3.Row
+    def __init__(self, pool=None, ecrivain=None):
+        self.pool = pool
+        self.ecrivain = ecrivain
+        if pool is not None:
+            self.connexion = pool.acquerir()
+        else:
+            self.connexion = ouvrir_connexion()
 
     def get_connexion(self):
         return self.connexion
 
     def deconnecter(self):
         if self.connexion:
-            self.connexion.close()
+            if self.pool is not None:
+                self.pool.liberer(self.connexion)
+            else:
+                self.connexion.close()
+            self.connexion = None
+
+    def _ecrire(self, fonction, *args):
+        """
+        Exécute une écriture par le fil d'écriture (ecrivain.Ecrivain),
+        s'il y en a un, ou sinon dans une transaction sur la connexion.
+
+        Args:
+            fonction (callable): Appelée avec (connexion, *args), sans
+                valider la transaction.
+            *args: Arguments de la fonction.
+
+        Returns:
+            Valeur renvoyée par la fonction.
+
+        Raises:
+            sqlite3.Error: Si l'écriture échoue ou n'a pas pu être faite
+                à temps.
+        """
+        if self.ecrivain is not None:
+            return self.ecrivain.executer(fonction, *args)
+        with self.connexion:
+            return fonction(self.connexion, *args)
 
     # A1
     def creer_bd(self):
         """
-        Crée les tables de la base de données si elles n'existent pas.
+        Crée les tables de la base de données si elles n'existent pas
+        et applique les migrations en attente.
         """
         connexion = sqlite3.connect(CHEMIN_BD)
-        curseur = connexion.cursor()
-        curseur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' "
-            "AND name='contraventions';"
-        )
-        table_existe = curseur.fetchone()
+        migrer_schema(connexion)
+        connexion.close()
 
-        if table_existe:
-            print("La table 'contraventions' existe déjà.")
-        else:
-            with open(CHEMMIN_SQL, "r", encoding="utf-8") as f:
-                script_bd = f.read()
-            curseur.execute(script_bd)
-            connexion.commit()
+    def version_donnees(self):
+        """
+        Renvoie la version des données, incrémentée par A1 à chaque
+        importation qui modifie les contraventions.
 
-        connexion.close()
+        Returns:
+            str: Version courante ("0" si aucune importation).
+        """
+        curseur = self.connexion.cursor()
+        curseur.execute(
+            "SELECT valeur FROM metadonnees WHERE cle = 'version_donnees'")
+        ligne = curseur.fetchone()
+        return ligne["valeur"] if ligne else "0"
 
     # A6
     def lister_etablissements(self):
@@ -55,14 +836,97 @@ class Database:
         connexion = self.get_connexion()
         curseur = connexion.cursor()
         curseur.execute("""
-            SELECT DISTINCT etablissement
-            FROM contraventions
-            ORDER BY etablissement
+            SELECT DISTINCT nom
+            FROM etablissements
+            ORDER BY nom
         """)
-        lignes = [row['etablissement'] for row in curseur.fetchall()]
-        connexion.close()
+        lignes = [row['nom'] for row in curseur.fetchall()]
         return lignes
 
+    def _page_contraventions(self, requete, params, limite, apres):
+        """
+        Complète une requête sur les contraventions avec le tri
+        (date, id_poursuite) décroissant et, au besoin, la pagination
+        par clé : seules les lignes situées après 'apres' sont lues.
+
+        Args:
+            requete (str): Requête SELECT comportant déjà une clause WHERE.
+            params (list): Paramètres de la requête.
+            limite (int, optional): Nombre maximal de lignes.
+            apres (tuple, optional): (date, id_poursuite) de la dernière
+                ligne de la page précédente.
+
+        Returns:
+            sqlite3.Cursor: Curseur positionné sur les résultats, qui
+            renvoie des Contravention.
+        """
+        params = list(params)
+        if apres is not None:
+            requete += (
+                " AND (contraventions.date, contraventions.id_poursuite)"
+                " < (?, ?)"
+            )
+            params.extend(apres)
+        requete += (
+            " ORDER BY contraventions.date DESC,"
+            " contraventions.id_poursuite DESC"
+        )
+        if limite is not None:
+            requete += " LIMIT ?"
+            params.append(limite)
+
+        curseur = self.connexion.execute(requete, params)
+        # Lignes compactes si la requête lit toutes les colonnes attendues
+        colonnes = tuple(colonne[0] for colonne in curseur.description)
+        if colonnes == Contravention.champs:
+            curseur.row_factory = fabrique_contravention
+        return curseur
+
+    # A2
+    def curseur_contraventions(
+        self, etablissement=None, proprietaire=None, rue=None,
+        limite=None, apres=None
+    ):
+        """
+        Recherche des contraventions avec des critères optionnels et
+        renvoie le curseur, pour une lecture progressive des résultats.
+
+        La recherche passe par l'index plein texte : chaque mot saisi est
+        cherché comme préfixe, sans tenir compte des accents ni de la casse.
+
+        Args:
+            etablissement (str, optional): Nom partiel de l'établissement.
+            proprietaire (str, optional): Nom partiel du propriétaire.
+            rue (str, optional): Nom partiel de la rue.
+            limite (int, optional): Nombre maximal de lignes.
+            apres (tuple, optional): Clé (date, id_poursuite) de reprise.
+
+        Returns:
+            sqlite3.Cursor: Contraventions, de la plus récente à la plus
+            ancienne.
+        """
+        criteres = [
+            expression_fts("etablissement", etablissement or ""),
+            expression_fts("proprietaire", proprietaire or ""),
+            expression_fts("adresse", rue or "")
+        ]
+        expression = " AND ".join(c for c in criteres if c)
+
+        if expression:
+            requete = """
+                SELECT contraventions.*
+                  FROM contraventions_fts
+                  JOIN contraventions
+                    ON contraventions.id_poursuite = contraventions_fts.rowid
+                 WHERE contraventions_fts MATCH ?
+            """
+            params = [expression]
+        else:
+            requete = "SELECT * FROM contraventions WHERE 1=1"
+            params = []
+
+        return self._page_contraventions(requete, params, limite, apres)
+
     # A2
     def rechercher_contraventions(
         self, etablissement=None, proprietaire=None, rue=None
@@ -78,31 +942,33 @@ class Database:
         Returns:
             list: Liste des contraventions correspondant aux critères.
         """
-        connexion = self.get_connexion()
-        curseur = connexion.cursor()
-
-        requete = "SELECT * FROM contraventions WHERE 1=1"
-        params = []
+        return self.curseur_contraventions(
+            etablissement, proprietaire, rue).fetchall()
 
-        if etablissement:
-            requete += " AND etablissement LIKE ?"
-            params.append(f"%{etablissement}%")
-        if proprietaire:
-            requete += " AND proprietaire LIKE ?"
-            params.append(f"%{proprietaire}%")
-        if rue:
-            nom_rue = rue.split()
-            for mot in nom_rue:
-                requete += " AND adresse LIKE ?"
-                params.append(f"%{mot}%")
-
-        requete += " ORDER BY date DESC"
+    # A4
+    def curseur_contraventions_par_dates(
+        self, date_debut, date_fin, limite=None, apres=None
+    ):
+        """
+        Recherche des contraventions entre deux dates et renvoie le
+        curseur, pour une lecture progressive des résultats.
 
-        curseur.execute(requete, params)
-        contraventions = curseur.fetchall()
+        Args:
+            date_debut (str): Date de début au format YYYYMMDD.
+            date_fin (str): Date de fin au format YYYYMMDD.
+            limite (int, optional): Nombre maximal de lignes.
+            apres (tuple, optional): Clé (date, id_poursuite) de reprise.
 
-        connexion.close()
-        return contraventions
+        Returns:
+            sqlite3.Cursor: Contraventions, de la plus récente à la plus
+            ancienne.
+        """
+        requete = """
+            SELECT * FROM contraventions
+            WHERE date BETWEEN ? AND ?
+        """
+        return self._page_contraventions(
+            requete, [date_debut, date_fin], limite, apres)
 
     # A4
     def rechercher_contraventions_par_dates(self, date_debut, date_fin):
@@ -110,47 +976,78 @@ class Database:
         Recherche des contraventions entre deux dates.
 
         Args:
-            date_debut (str): Date de début au format YYYY-MM-DD.
-            date_fin (str): Date de fin au format YYYY-MM-DD.
+            date_debut (str): Date de début au format YYYYMMDD.
+            date_fin (str): Date de fin au format YYYYMMDD.
 
         Returns:
             list: Liste des contraventions entre les deux dates.
         """
-        connexion = self.get_connexion()
-        curseur = connexion.cursor()
+        return self.curseur_contraventions_par_dates(
+            date_debut, date_fin).fetchall()
 
-        requete = """
-            SELECT * FROM contraventions
-            WHERE date BETWEEN ? AND ?
-            ORDER BY date DESC
+    # E2
+    def lister_etablissements_classes(self):
         """
-        curseur.execute(requete, (date_debut, date_fin))
-        contraventions = curseur.fetchall()
+        Renvoie les établissements et leur nombre de contraventions, pour
+        l'index d'autocomplétion (autocompletion.py).
 
-        connexion.close()
-        return contraventions
+        Returns:
+            list: Tuples (business_id, nom, nb_contraventions).
+        """
+        curseur = self.connexion.cursor()
+        curseur.row_factory = None
+        curseur.execute("""
+            SELECT business_id, nom, nb_contraventions
+              FROM etablissements
+        """)
+        return curseur.fetchall()
 
     # C1
     def statistiques_infractions(self):
         """
         Renvoie les statistiques des contraventions par établissement.
 
+        Les agrégats sont lus dans stats_etablissements, recalculée après
+        chaque importation, plutôt que regroupés à chaque appel.
+
         Returns:
-            list: Liste des établissements et le nombre de contraventions.
+            list: Établissements avec le nombre de contraventions (nb),
+            le total des amendes, les dates de la première et de la
+            dernière contravention et le nombre par catégorie (JSON).
         """
         connexion = self.get_connexion()
         curseur = connexion.cursor()
         curseur.execute("""
-            SELECT etablissement,
-                   COUNT(*) AS nb
-              FROM contraventions
-             GROUP BY etablissement
+            SELECT etablissement, nb, montant_total,
+                   premiere_date, derniere_date, categories
+              FROM stats_etablissements
              ORDER BY nb DESC
         """)
         resultats = curseur.fetchall()
-        connexion.close()
         return resultats
 
+    # C1
+    def curseur_analytique(self):
+        """
+        Lit les colonnes des contraventions utilisées par les agrégats
+        par période (analytique.py), en tuples plutôt qu'en sqlite3.Row.
+
+        Returns:
+            sqlite3.Cursor: Lignes (date, etablissement, categorie,
+            statut, montant); la date est l'entier YYYYMMDD (0 si elle
+            n'est pas numérique).
+        """
+        curseur = self.connexion.cursor()
+        curseur.row_factory = None
+        return curseur.execute("""
+            SELECT CAST(date AS INTEGER),
+                   COALESCE(etablissement, ''),
+                   COALESCE(categorie, ''),
+                   COALESCE(statut, ''),
+                   COALESCE(CAST(montant AS INTEGER), 0)
+              FROM contraventions
+        """)
+
     # C1 (un plus)
     def pire_etablissement(self):
         """
@@ -162,16 +1059,39 @@ class Database:
         connexion = self.get_connexion()
         curseur = connexion.cursor()
         curseur.execute("""
-            SELECT etablissement, COUNT(*) AS nb
-              FROM contraventions
-             GROUP BY etablissement
+            SELECT etablissement, nb
+              FROM stats_etablissements
              ORDER BY nb DESC
              LIMIT 1
         """)
         resultat = curseur.fetchone()
-        connexion.close()
         return resultat
 
+    # A3
+    def historique_ingestions(self, limite=10):
+        """
+        Récupère les dernières exécutions du travailleur d'ingestion.
+
+        Args:
+            limite (int): Nombre maximal d'exécutions.
+
+        Returns:
+            list: Exécutions, de la plus récente à la plus ancienne.
+        """
+        try:
+            curseur = self.connexion.cursor()
+            curseur.execute("""
+                SELECT debut, duree, statut, tentatives, octets, inseres,
+                       mis_a_jour, rejetes, notifications, erreur
+                  FROM executions_ingestion
+                 ORDER BY id_execution DESC
+                 LIMIT ?
+            """, (limite,))
+            return curseur.fetchall()
+        except sqlite3.Error as e:
+            print("Erreur lors de la lecture de l'historique:", e)
+            return []
+
     # E1
     def creer_utilisateur(
         self, username, password_hash, salt, nom, prenom, photo_profil=None
@@ -182,55 +1102,121 @@ class Database:
         Returns:
             int: L'ID de l'utilisateur créé, ou None en cas d'erreur.
         """
-        try:
-            curseur = self.connexion.cursor()
-            curseur.execute("""
+        def ecrire(connexion):
+            curseur = connexion.execute("""
                 INSERT INTO utilisateurs (username, password_hash,
                              salt, nom, prenom, photo_profil)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (username, password_hash, salt, nom, prenom, photo_profil))
-
-            self.connexion.commit()
             return curseur.lastrowid
+
+        try:
+            return self._ecrire(ecrire)
         except sqlite3.Error as e:
             print("Erreur lors de la création de l'utilisateur:", e)
             return None
 
     # E2
-    def obtenir_utilisateur(self, nom_utilisateur):
+    def obtenir_utilisateur(self, nom_utilisateur,
+                            colonnes=COLONNES_UTILISATEUR):
         """
         Récupère les informations d'un utilisateur par son nom d'utilisateur.
 
+        Args:
+            nom_utilisateur (str): Le nom d'utilisateur.
+            colonnes (tuple): Colonnes voulues, parmi COLONNES_UTILISATEUR.
+
         Returns:
             dict: Informations de l'utilisateur ou None si non trouvé.
+
+        Raises:
+            ValueError: Si une colonne demandée n'est pas permise.
         """
+        if not set(colonnes) <= set(COLONNES_UTILISATEUR):
+            raise ValueError(f"Colonnes non permises : {colonnes}")
         try:
             curseur = self.connexion.cursor()
-            curseur.execute("SELECT * FROM utilisateurs WHERE username=?",
-                            (nom_utilisateur,))
+            curseur.execute(
+                f"SELECT {', '.join(colonnes)} FROM utilisateurs "
+                "WHERE username=?", (nom_utilisateur,)
+            )
             return curseur.fetchone()
         except sqlite3.Error as erreur:
             print("Erreur lors de la récupération de l'utilisateur:", erreur)
             return None
 
     # E2
-    def ajouter_session(self, identifiant_session, nom_utilisateur):
+    def changer_mot_de_passe(self, nom_utilisateur, password_hash, salt):
+        """
+        Remplace le hachage du mot de passe d'un utilisateur (nouveau
+        coût ou ancien format SHA-512).
+
+        Args:
+            nom_utilisateur (str): Le nom d'utilisateur.
+            password_hash (str): Nouveau hachage.
+            salt (str): Salt utilisé pour ce hachage.
+        """
+        def ecrire(connexion):
+            connexion.execute("""
+                UPDATE utilisateurs SET password_hash = ?, salt = ?
+                 WHERE username = ?
+            """, (password_hash, salt, nom_utilisateur))
+
+        try:
+            self._ecrire(ecrire)
+        except sqlite3.Error as e:
+            print("Erreur lors du changement du mot de passe:", e)
+
+    # E2
+    def ajouter_session(self, identifiant_session, nom_utilisateur,
+                        maintenant):
         """
         Ajoute une session pour un utilisateur.
 
         Args:
             identifiant_session (str): L'ID de la session.
             nom_utilisateur (str): Le nom d'utilisateur.
+            maintenant (int): Horodatage de création (secondes Unix).
+
+        Returns:
+            bool: True si la session a été enregistrée.
+        """
+        def ecrire(connexion):
+            connexion.execute("""
+                INSERT INTO sessions (id_session, username, cree_le, vu_le)
+                VALUES (?, ?, ?, ?)
+            """, (identifiant_session, nom_utilisateur, maintenant,
+                  maintenant))
+
+        try:
+            self._ecrire(ecrire)
+            return True
+        except sqlite3.Error as e:
+            print("Erreur lors de l'ajout de la session:", e)
+            return False
+
+    # E2
+    def obtenir_session(self, identifiant_session):
+        """
+        Récupère une session par son ID.
+
+        Args:
+            identifiant_session (str): L'ID de la session.
+
+        Returns:
+            sqlite3.Row: (username, cree_le, vu_le) ou None si absente.
         """
         try:
             curseur = self.connexion.cursor()
             curseur.execute("""
-                INSERT INTO sessions (id_session, username)
-                VALUES (?, ?)
-            """, (identifiant_session, nom_utilisateur))
-            self.connexion.commit()
+                SELECT username, cree_le, vu_le
+                  FROM sessions
+                 WHERE id_session = ?
+            """, (identifiant_session,))
+            return curseur.fetchone()
         except sqlite3.Error as e:
-            print("Erreur lors de l'ajout de la session:", e)
+            print("Erreur lors de la récupération de la session:", e)
+            return None
 
     # E2
     def supprimer_session(self, identifiant_session):
@@ -240,31 +1226,87 @@ class Database:
         Args:
             identifiant_session (str): L'ID de la session à supprimer.
         """
+        def ecrire(connexion):
+            connexion.execute("DELETE FROM sessions WHERE id_session=?",
+                              (identifiant_session,))
+
         try:
-            curseur = self.connexion.cursor()
-            curseur.execute("DELETE FROM sessions WHERE id_session=?",
-                            (identifiant_session,))
-            self.connexion.commit()
+            self._ecrire(ecrire)
         except sqlite3.Error as e:
             print("Erreur lors de la suppression de la session:", e)
 
     # E2
-    def ajout_photo_profil(self, nom_utilisateur, photo_profil):
+    def toucher_sessions(self, activites):
+        """
+        Enregistre en une transaction la dernière activité de plusieurs
+        sessions.
+
+        Args:
+            activites (list): Tuples (vu_le, id_session).
+        """
+        def ecrire(connexion):
+            connexion.executemany("""
+                UPDATE sessions SET vu_le = ?1
+                 WHERE id_session = ?2 AND vu_le < ?1
+            """, activites)
+
+        try:
+            self._ecrire(ecrire)
+        except sqlite3.Error as e:
+            print("Erreur lors de la mise à jour des sessions:", e)
+
+    # E2
+    def purger_sessions(self, vu_avant, taille_lot):
+        """
+        Supprime les sessions inactives, par lots : chaque lot est validé
+        séparément pour ne jamais garder longtemps le verrou d'écriture.
+
+        Args:
+            vu_avant (int): Sessions sans activité depuis cet horodatage.
+            taille_lot (int): Nombre maximal de sessions par lot.
+
+        Returns:
+            int: Nombre de sessions supprimées.
+        """
+        def ecrire(connexion):
+            return connexion.execute("""
+                DELETE FROM sessions WHERE rowid IN (
+                    SELECT rowid FROM sessions
+                     WHERE vu_le < ?
+                     LIMIT ?
+                )
+            """, (vu_avant, taille_lot)).rowcount
+
+        total = 0
+        try:
+            while True:
+                supprimees = self._ecrire(ecrire)
+                total += supprimees
+                if supprimees < taille_lot:
+                    return total
+        except sqlite3.Error as e:
+            print("Erreur lors de la purge des sessions:", e)
+            return total
+
+    # E2
+    def ajout_photo_profil(self, nom_utilisateur, empreinte):
         """
         Ajoute ou met à jour la photo de profil de l'utilisateur.
 
         Args:
             nom_utilisateur (str): Le nom d'utilisateur de la personne.
-            photo_profil (bytes): Les données de l'image de profil.
+            empreinte (str): Empreinte de la photo dans le magasin
+                (voir photos.enregistrer).
         """
-        try:
-            curseur = self.connexion.cursor()
-            curseur.execute("""
+        def ecrire(connexion):
+            connexion.execute("""
                 UPDATE utilisateurs
-                SET photo_profil = ?
+                SET photo = ?, photo_profil = NULL
                 WHERE username = ?
-            """, (photo_profil, nom_utilisateur))
-            self.connexion.commit()
+            """, (empreinte, nom_utilisateur))
+
+        try:
+            self._ecrire(ecrire)
         except sqlite3.Error as e:
             print("Erreur lors de l'ajout de la photo de profil:", e)
 
@@ -273,41 +1315,190 @@ class Database:
         """
         Récupère les établissements correspondant aux IDs donnés.
 
+        Args:
+            liste_ids (list): Identifiants (business_id) des établissements.
+
         Returns:
-            list: Liste des établissements correspondant aux IDs.
+            list: Lignes (business_id, nom) des établissements trouvés.
         """
         try:
             curseur = self.connexion.cursor()
-            curseur.execute(
-                f"""SELECT id_poursuite, etablissement
-                FROM contraventions
-                WHERE id_poursuite IN (
-                    {','.join(['?'] * len(liste_ids))}
-                )""",
-                liste_ids
-            )
+            curseur.execute("""
+                SELECT business_id, nom
+                  FROM etablissements
+                 WHERE business_id IN (SELECT value FROM json_each(?))
+            """, (json.dumps([int(i) for i in liste_ids]),))
+            return curseur.fetchall()
+        except (sqlite3.Error, ValueError) as e:
+            print("Erreur lors de la récupération des établissements:", e)
+            return []
+
+    # E2
+    def etablissements_surveilles(self, nom_utilisateur):
+        """
+        Récupère les établissements surveillés par un utilisateur.
+
+        Args:
+            nom_utilisateur (str): Le nom de l'utilisateur.
+
+        Returns:
+            list: Lignes (business_id, nom), triées par nom.
+        """
+        try:
+            curseur = self.connexion.cursor()
+            curseur.execute("""
+                SELECT etablissements.business_id, etablissements.nom
+                  FROM surveillances
+                  JOIN etablissements USING (business_id)
+                 WHERE surveillances.username = ?
+                 ORDER BY etablissements.nom
+            """, (nom_utilisateur,))
             return curseur.fetchall()
         except sqlite3.Error as e:
             print("Erreur lors de la récupération des établissements:", e)
             return []
 
     # E2
-    def ajout_etablissements_surveilles(self, nom_utilisateur, liste_ids):
+    def ajouter_surveillances(self, nom_utilisateur, business_ids):
+        """
+        Ajoute des établissements à la liste de surveillance d'un
+        utilisateur (ceux déjà présents sont ignorés).
+
+        Args:
+            nom_utilisateur (str): Le nom de l'utilisateur.
+            business_ids (iterable): Identifiants des établissements; ceux
+                qui ne sont pas formés de chiffres sont ignorés.
+
+        Returns:
+            bool: True si l'écriture a réussi.
+        """
+        def ecrire(connexion, lignes):
+            connexion.executemany("""
+                INSERT OR IGNORE INTO surveillances (username, business_id)
+                VALUES (?, ?)
+            """, lignes)
+
+        try:
+            self._ecrire(ecrire, [(nom_utilisateur, i)
+                                  for i in identifiants_valides(business_ids)])
+            return True
+        except sqlite3.Error as e:
+            print("Erreur lors de l'ajout des établissements surveillés:", e)
+            return False
+
+    # E2
+    def retirer_surveillances(self, nom_utilisateur, business_ids):
         """
-        Ajoute des établissements à la liste
-        des établissements surveillés d'un utilisateur.
+        Retire des établissements de la liste de surveillance d'un
+        utilisateur.
 
         Args:
             nom_utilisateur (str): Le nom de l'utilisateur.
-            liste_ids (str): Liste des IDs des établissements surveillés.
+            business_ids (iterable): Identifiants des établissements; ceux
+                qui ne sont pas formés de chiffres sont ignorés.
+
+        Returns:
+            bool: True si l'écriture a réussi.
+        """
+        def ecrire(connexion, lignes):
+            connexion.executemany("""
+                DELETE FROM surveillances
+                 WHERE username = ? AND business_id = ?
+            """, lignes)
+
+        try:
+            self._ecrire(ecrire, [(nom_utilisateur, i)
+                                  for i in identifiants_valides(business_ids)])
+            return True
+        except sqlite3.Error as e:
+            print("Erreur lors du retrait des établissements surveillés:", e)
+            return False
+
+    # E2
+    def surveillants(self, business_ids):
+        """
+        Récupère les utilisateurs qui surveillent les établissements donnés
+        (recherche dans l'index inverse de surveillances).
+
+        Args:
+            business_ids (iterable): Identifiants des établissements.
+
+        Returns:
+            list: Lignes (business_id, username).
         """
         try:
             curseur = self.connexion.cursor()
             curseur.execute("""
-                UPDATE utilisateurs
-                SET etablissements_surveilles = ?
-                WHERE username = ?
-            """, (liste_ids, nom_utilisateur))
-            self.connexion.commit()
+                SELECT business_id, username
+                  FROM surveillances
+                 WHERE business_id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(identifiants_valides(business_ids)),))
+            return curseur.fetchall()
+        except sqlite3.Error as e:
+            print("Erreur lors de la récupération des surveillants:", e)
+            return []
+
+    # E2
+    def notifications_utilisateur(self, nom_utilisateur, depuis=0,
+                                  limite=50):
+        """
+        Récupère les notifications d'un utilisateur, des plus récentes
+        aux plus anciennes.
+
+        Args:
+            nom_utilisateur (str): Le nom de l'utilisateur.
+            depuis (int): Seules les notifications d'identifiant supérieur
+                sont renvoyées (dernier identifiant déjà reçu).
+            limite (int): Nombre maximal de notifications.
+
+        Returns:
+            list: Notifications avec la contravention associée.
+        """
+        try:
+            curseur = self.connexion.cursor()
+            curseur.execute("""
+                SELECT notifications.id_notification,
+                       notifications.nature, notifications.cree_le,
+                       contraventions.id_poursuite,
+                       contraventions.business_id,
+                       contraventions.etablissement,
+                       contraventions.date, contraventions.description,
+                       contraventions.montant, contraventions.statut
+                  FROM notifications
+                  JOIN contraventions USING (id_poursuite)
+                 WHERE notifications.username = ?
+                   AND notifications.id_notification > ?
+                 ORDER BY notifications.id_notification DESC
+                 LIMIT ?
+            """, (nom_utilisateur, depuis, limite))
+            return curseur.fetchall()
+        except sqlite3.Error as e:
+            print("Erreur lors de la récupération des notifications:", e)
+            return []
+
+    # E2
+    def ajout_etablissements_surveilles(self, nom_utilisateur, liste_ids):
+        """
+        Remplace la liste des établissements surveillés d'un utilisateur.
+
+        Args:
+            nom_utilisateur (str): Le nom de l'utilisateur.
+            liste_ids (str): IDs (business_id) séparés par des virgules.
+        """
+        ids = identifiants_valides(liste_ids.split(","))
+
+        def ecrire(connexion):
+            connexion.execute("""
+                DELETE FROM surveillances
+                 WHERE username = ?
+                   AND business_id NOT IN (SELECT value FROM json_each(?))
+            """, (nom_utilisateur, json.dumps(ids)))
+            connexion.executemany("""
+                INSERT OR IGNORE INTO surveillances (username, business_id)
+                VALUES (?, ?)
+            """, [(nom_utilisateur, i) for i in ids])
+
+        try:
+            self._ecrire(ecrire)
         except sqlite3.Error as e:
             print("Erreur lors de l'ajout des établissements surveillés:", e)
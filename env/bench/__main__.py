@@ -0,0 +1,138 @@
+import sqlite3
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from bench import generateur, suites
+
+
+# Banc d'essai des chemins critiques, par exemple (depuis env/) :
+#   python -m bench --tailles 10000 100000 1000000
+#   python -m bench --suites requetes routes --repetitions 50
+#   python -m bench.comparer bench/resultats/a.json bench/resultats/b.json
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+TAILLES = (10000,)
+REPETITIONS = 30
+
+
+def commit_courant():
+    """
+    Renvoie le commit git courant (suffixé de '+' si l'arbre est
+    modifié), ou 'inconnu' hors d'un dépôt.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=DOSSIER,
+            capture_output=True, text=True, check=True).stdout.strip()
+        modifie = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=DOSSIER, capture_output=True, text=True).stdout.strip()
+        return commit + ("+" if modifie else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+
+def executer(nom, contexte):
+    """
+    Exécute une suite dans un processus neuf, pour que chaque suite ait
+    son propre pic de mémoire et n'hérite d'aucun cache.
+    """
+    with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn")) as executeur:
+        return executeur.submit(suites.executer_suite, nom, contexte).result()
+
+
+def afficher(titre, resultat):
+    """
+    Affiche les mesures d'une suite : centiles en millisecondes et
+    débit en lignes par seconde.
+    """
+    print(f"\n== {titre} ({resultat['duree_s']} s, "
+          f"RSS max {resultat['rss_max_mo']} Mo)")
+    print(f"{'':44}{'n':>5}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}"
+          f"{'lignes/s':>12}")
+    for nom, mesure in resultat["mesures"].items():
+        if isinstance(mesure, dict) and "p50_ms" in mesure:
+            print(f"{nom[:43]:44}{mesure['n']:>5}{mesure['p50_ms']:>11.3f}"
+                  f"{mesure['p95_ms']:>11.3f}{mesure['p99_ms']:>11.3f}"
+                  f"{mesure.get('lignes_s') or '':>12}")
+        else:
+            print(f"{nom[:43]:44}{mesure}")
+
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(
+        prog="python -m bench",
+        description="Banc d'essai : importation, requêtes et routes")
+    arguments.add_argument(
+        "--tailles", type=int, nargs="+", default=TAILLES,
+        help="nombres de contraventions générées (10000 100000 1000000)")
+    arguments.add_argument(
+        "--suites", nargs="+", choices=list(suites.SUITES),
+        help="suites à exécuter (toutes par défaut); la suite ingestion, "
+             "qui construit la base, est toujours exécutée")
+    arguments.add_argument("--repetitions", type=int, default=REPETITIONS)
+    arguments.add_argument("--graine", type=int, default=generateur.GRAINE)
+    arguments.add_argument(
+        "--donnees", default=os.path.join(DOSSIER, "donnees"),
+        help="dossier des CSV (réutilisés) et des bases générés")
+    arguments.add_argument("--sortie", help="fichier JSON des résultats")
+    options = arguments.parse_args()
+
+    choisies = ["ingestion"] + [
+        nom for nom in (options.suites or suites.SUITES)
+        if nom != "ingestion"
+    ]
+    commit = commit_courant()
+    resultats = {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plateforme": platform.platform(),
+        "processeurs": os.cpu_count(),
+        "graine": options.graine,
+        "repetitions": options.repetitions,
+        "tailles": {},
+        "communes": {},
+    }
+
+    for lignes in options.tailles:
+        print(f"\n### {lignes} contraventions")
+        csv_initial, csv_suivant = generateur.preparer_csv(
+            options.donnees, lignes, options.graine)
+        contexte = {
+            "lignes": lignes,
+            "graine": options.graine,
+            "repetitions": options.repetitions,
+            "dossier": options.donnees,
+            "csv": csv_initial,
+            "csv_suivant": csv_suivant,
+            "bd": os.path.join(options.donnees, f"banc-{lignes}.db"),
+        }
+        resultats["tailles"][str(lignes)] = {}
+        for nom in choisies:
+            if nom in suites.SUITES_COMMUNES:
+                if nom in resultats["communes"]:
+                    continue
+                destination = resultats["communes"]
+            else:
+                destination = resultats["tailles"][str(lignes)]
+            destination[nom] = executer(nom, contexte)
+            afficher(nom, destination[nom])
+
+    sortie = options.sortie or os.path.join(
+        DOSSIER, "resultats",
+        f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(sortie)), exist_ok=True)
+    with open(sortie, "w", encoding="utf-8") as fichier:
+        json.dump(resultats, fichier, indent=2, ensure_ascii=False)
+    print(f"\nRésultats : {sortie}")
@@ -0,0 +1,82 @@
+import argparse
+import json
+import sys
+
+
+# Écart de p50 (en %) au-delà duquel une mesure est signalée
+SEUIL = 10.0
+
+
+def mesures(resultats, prefixe=()):
+    """
+    Parcourt un fichier de résultats et produit chaque mesure de durée.
+
+    Args:
+        resultats (dict): Contenu d'un JSON produit par python -m bench.
+        prefixe (tuple): Chemin des clés déjà parcourues.
+
+    Yields:
+        tuple: (chemin, mesure), chemin étant par exemple
+        'tailles/10000/requetes/pire_etablissement'.
+    """
+    for cle, valeur in resultats.items():
+        if not isinstance(valeur, dict):
+            continue
+        chemin = prefixe + (cle,)
+        if "p50_ms" in valeur:
+            yield "/".join(chemin).replace("/mesures/", "/"), valeur
+        else:
+            yield from mesures(valeur, chemin)
+
+
+def comparer(ancien, nouveau, seuil=SEUIL):
+    """
+    Compare les p50 de deux exécutions du banc d'essai.
+
+    Args:
+        ancien (dict): Résultats de référence.
+        nouveau (dict): Résultats à comparer.
+        seuil (float): Écart signalé (%).
+
+    Returns:
+        list: Tuples (chemin, p50 ancien, p50 nouveau, écart en %,
+        régression) des mesures présentes dans les deux fichiers.
+    """
+    references = dict(mesures(ancien))
+    ecarts = []
+    for chemin, mesure in mesures(nouveau):
+        if chemin not in references:
+            continue
+        avant = references[chemin]["p50_ms"]
+        apres = mesure["p50_ms"]
+        ecart = 100 * (apres / avant - 1) if avant else 0.0
+        ecarts.append((chemin, avant, apres, ecart, ecart > seuil))
+    return ecarts
+
+
+if __name__ == "__main__":
+    """
+    Affiche les écarts entre deux fichiers de résultats; le code de
+    sortie est 1 si une mesure a ralenti de plus du seuil.
+    """
+    arguments = argparse.ArgumentParser(
+        prog="python -m bench.comparer",
+        description="Compare deux exécutions du banc d'essai")
+    arguments.add_argument("ancien")
+    arguments.add_argument("nouveau")
+    arguments.add_argument("--seuil", type=float, default=SEUIL)
+    options = arguments.parse_args()
+
+    with open(options.ancien, encoding="utf-8") as fichier:
+        ancien = json.load(fichier)
+    with open(options.nouveau, encoding="utf-8") as fichier:
+        nouveau = json.load(fichier)
+
+    print(f"{ancien['commit']} -> {nouveau['commit']} "
+          f"(p50, seuil {options.seuil:g} %)")
+    ecarts = comparer(ancien, nouveau, options.seuil)
+    for chemin, avant, apres, ecart, regression in ecarts:
+        signe = "  <-- plus lent" if regression else ""
+        print(f"{chemin[:70]:72}{avant:>10.3f}{apres:>10.3f}"
+              f"{ecart:>+8.1f} %{signe}")
+    sys.exit(1 if any(ecart[4] for ecart in ecarts) else 0)
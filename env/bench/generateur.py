@@ -0,0 +1,364 @@
+import base_de_donnees
+import fonctionnalites
+import argparse
+import csv
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+from itertools import accumulate
+
+
+# Générateur de données synthétiques semblables au CSV des contraventions
+# de la Ville de Montréal (mêmes colonnes que db/db.sql), reproductibles
+# à partir d'une graine.
+
+GRAINE = 2024
+
+# Nombre moyen de contraventions par établissement
+CONTRAVENTIONS_PAR_ETABLISSEMENT = 8
+
+# Exposant de la loi de Zipf des contraventions par établissement : une
+# poignée d'établissements en cumule beaucoup, la plupart en ont une ou
+# deux
+EXPOSANT_ZIPF = 0.8
+
+# Période couverte par les contraventions
+PREMIERE_DATE = date(2006, 1, 1)
+DERNIERE_DATE = date(2025, 12, 31)
+
+# Lignes écrites par appel à writerows
+TAILLE_LOT = 10000
+
+PRENOMS = (
+    "Marie", "Jean", "Sophie", "Luc", "Nathalie", "Pierre", "Isabelle",
+    "François", "Julie", "Michel", "Geneviève", "André", "Chantal",
+    "Stéphane", "Mélanie", "Réjean", "Josée", "Benoît", "Émilie", "Gaétan",
+    "Thi", "Mohamed", "Fatima", "Wei", "Giuseppe", "Ana", "Karim",
+)
+NOMS = (
+    "Tremblay", "Gagnon", "Roy", "Côté", "Bouchard", "Gauthier", "Morin",
+    "Lavoie", "Fortin", "Gagné", "Ouellet", "Pelletier", "Bélanger",
+    "Lévesque", "Bergeron", "Leblanc", "Paquette", "Girard", "Simard",
+    "Nguyen", "Benali", "Rossi", "Chen", "Haddad", "Da Silva", "Ferreira",
+)
+ENSEIGNES = (
+    "Café", "Restaurant", "Boulangerie", "Pâtisserie", "Épicerie",
+    "Dépanneur", "Boucherie", "Poissonnerie", "Fromagerie", "Traiteur",
+    "Brasserie", "Bistro", "Pizzeria", "Casse-croûte", "Marché",
+    "Charcuterie", "Sushi", "Comptoir", "Cantine", "Chez",
+)
+QUALIFICATIFS = (
+    "du Plateau", "de la Petite-Patrie", "Saint-Viateur", "Mont-Royal",
+    "Le Délice", "L'Étoile", "Les Saveurs", "Belle Province", "La Fournée",
+    "du Marché", "Le Gourmet", "du Vieux-Port", "Rosemont", "Verdun",
+    "Hochelaga", "Villeray", "La Belle Époque", "Le Coin", "Saint-Henri",
+    "Beaubien", "Masson", "Jean-Talon", "Côte-des-Neiges", "Notre-Dame",
+)
+RUES = (
+    "rue Saint-Denis", "boulevard Saint-Laurent", "rue Sainte-Catherine",
+    "avenue du Mont-Royal", "rue Ontario", "rue Sherbrooke",
+    "avenue Laurier", "rue Beaubien", "rue Jean-Talon",
+    "boulevard René-Lévesque", "rue Notre-Dame", "rue Wellington",
+    "avenue Van Horne", "chemin de la Côte-des-Neiges", "rue Masson",
+    "boulevard Décarie", "rue Fleury", "avenue Papineau", "rue De Castelnau",
+    "boulevard Pie-IX", "rue Saint-Hubert", "avenue du Parc",
+)
+VILLES = (
+    ("Montréal", 70), ("Montréal-Nord", 5), ("Verdun", 4), ("LaSalle", 4),
+    ("Lachine", 3), ("Saint-Laurent", 6), ("Anjou", 3), ("Outremont", 2),
+    ("Saint-Léonard", 3),
+)
+CATEGORIES = (
+    ("Restaurant", 45), ("Restaurant service rapide", 15),
+    ("Épicerie", 12), ("Boulangerie", 5), ("Pâtisserie", 3),
+    ("Boucherie", 4), ("Traiteur", 3), ("Bar laitier", 2),
+    ("Charcuterie/fromage", 3), ("Distributrice automatique", 1),
+    ("Poissonnerie", 2), ("Casse-croûte", 5),
+)
+STATUTS = (
+    ("Fermé", 70), ("Ouvert", 20), ("Fermé changement d'exploitant", 7),
+    ("Sous inspection fédérale", 3),
+)
+DESCRIPTIONS = (
+    ("Le produit altérable à la chaleur à une température interne "
+     "supérieure à 4°C ou inférieure à 60°C n'est pas conservé."),
+    ("Les lieux ou les véhicules ne sont pas exempts de contaminants, "
+     "de polluants, de toute espèce d'animaux y compris les insectes "
+     "et les rongeurs ou de leurs excréments."),
+    ("L'exploitant n'a pas maintenu en bon état de propreté l'intérieur "
+     "des pièces et les surfaces de l'équipement."),
+    ("Tout produit destiné à la consommation humaine doit être propre à "
+     "la consommation, y compris son emballage."),
+    ("Le lavage des mains n'est pas effectué selon les exigences; "
+     "l'évier n'est pas pourvu de savon liquide, d'essuie-mains à usage "
+     "unique ou d'un séchoir."),
+    ("Le manipulateur d'aliments ne porte pas de vêtement propre, "
+     "de couvre-chef ou de couvre-barbe."),
+    ("L'exploitant ne détient pas un permis valide pour l'exploitation "
+     "de son établissement."),
+    ("Les aliments ne sont pas protégés contre la contamination "
+     "(« entreposage au sol »)."),
+)
+
+
+def _repartition(choix):
+    valeurs, poids = zip(*choix)
+    return valeurs, list(accumulate(poids))
+
+
+def generer_etablissements(nombre, alea):
+    """
+    Produit des établissements fictifs : nom, propriétaire, adresse,
+    ville et catégorie. Environ un quart des noms sont partagés par
+    plusieurs établissements (chaînes), comme dans les données réelles.
+
+    Args:
+        nombre (int): Nombre d'établissements.
+        alea (random.Random): Générateur pseudo-aléatoire.
+
+    Returns:
+        list: Dictionnaires indexés par business_id - 1.
+    """
+    villes, poids_villes = _repartition(VILLES)
+    categories, poids_categories = _repartition(CATEGORIES)
+    chaines = [
+        f"{alea.choice(ENSEIGNES)} {alea.choice(QUALIFICATIFS)}"
+        for _ in range(max(1, nombre // 40))
+    ]
+
+    etablissements = []
+    for business_id in range(1, nombre + 1):
+        if alea.random() < 0.25:
+            nom = alea.choice(chaines)
+        else:
+            nom = (f"{alea.choice(ENSEIGNES)} "
+                   f"{alea.choice(QUALIFICATIFS + PRENOMS)} {business_id}")
+        if alea.random() < 0.6:
+            proprietaire = (f"{alea.randint(9000, 9499)}-"
+                            f"{alea.randint(1000, 9999)} Québec inc.")
+        else:
+            proprietaire = f"{alea.choice(PRENOMS)} {alea.choice(NOMS)}"
+        ville = alea.choices(villes, cum_weights=poids_villes)[0]
+        etablissements.append({
+            "business_id": business_id,
+            "etablissement": nom,
+            "proprietaire": proprietaire,
+            "adresse": (f"{alea.randint(10, 9999)}, {alea.choice(RUES)}, "
+                        f"{ville}, Québec"),
+            "ville": ville,
+            "categorie": alea.choices(
+                categories, cum_weights=poids_categories)[0],
+        })
+    return etablissements
+
+
+def _jour(jour):
+    return jour.strftime("%Y%m%d")
+
+
+def generer_lignes(lignes, graine=GRAINE, supplementaires=0):
+    """
+    Produit les lignes du CSV des contraventions.
+
+    Les établissements sont tirés selon une loi de Zipf (EXPOSANT_ZIPF);
+    les dates avancent avec l'id_poursuite, comme dans le fichier de la
+    Ville. Les 'lignes' premières lignes ne dépendent que de 'lignes' et
+    de 'graine'.
+
+    Args:
+        lignes (int): Nombre de contraventions.
+        graine (int): Graine du générateur pseudo-aléatoire.
+        supplementaires (int): Contraventions ajoutées à la suite, aux
+            dates les plus récentes.
+
+    Yields:
+        dict: Ligne, avec les colonnes de COLONNES_CONTRAVENTIONS.
+    """
+    alea = random.Random(graine)
+    etablissements = generer_etablissements(
+        max(1, lignes // CONTRAVENTIONS_PAR_ETABLISSEMENT), alea)
+    rangs = list(range(len(etablissements)))
+    alea.shuffle(rangs)
+    cumul = list(accumulate(
+        1 / rang ** EXPOSANT_ZIPF for rang in range(1, len(rangs) + 1)))
+    statuts, poids_statuts = _repartition(STATUTS)
+    etendue = (DERNIERE_DATE - PREMIERE_DATE).days
+
+    for id_poursuite in range(1, lignes + supplementaires + 1):
+        etablissement = etablissements[
+            rangs[alea.choices(range(len(rangs)), cum_weights=cumul)[0]]]
+        progression = min(1, id_poursuite / lignes)
+        jour = PREMIERE_DATE + timedelta(days=min(
+            etendue, int(progression * etendue) + alea.randint(0, 20)))
+        jugement = jour + timedelta(days=alea.randint(30, 400))
+        yield {
+            **etablissement,
+            "id_poursuite": id_poursuite,
+            "date": _jour(jour),
+            "description": alea.choice(DESCRIPTIONS),
+            "date_jugement": _jour(jugement),
+            "montant": alea.choice((250, 500, 750, 1000, 1500, 2000, 3000)),
+            "statut": alea.choices(statuts, cum_weights=poids_statuts)[0],
+            "date_statut": _jour(jugement + timedelta(
+                days=alea.randint(0, 60))),
+        }
+
+
+def generer_csv(chemin, lignes, graine=GRAINE, changements=0.0,
+                nouvelles=0):
+    """
+    Écrit un CSV de contraventions synthétiques.
+
+    Avec les mêmes 'lignes' et 'graine', 'changements' et 'nouvelles'
+    produisent la publication suivante du même fichier : une fraction
+    des contraventions change de statut et de nouvelles s'ajoutent à la
+    fin, ce qu'une importation incrémentale de A1 doit traiter.
+
+    Args:
+        chemin (str): Fichier à écrire.
+        lignes (int): Nombre de contraventions de la publication initiale.
+        graine (int): Graine du générateur pseudo-aléatoire.
+        changements (float): Fraction des lignes dont le statut change.
+        nouvelles (int): Contraventions ajoutées après les 'lignes'.
+
+    Returns:
+        int: Nombre de lignes écrites.
+    """
+    alea = random.Random(graine + 1)
+    ecrites = 0
+    with open(chemin, "w", newline="", encoding="utf-8") as fichier:
+        writer = csv.DictWriter(
+            fichier, fieldnames=fonctionnalites.COLONNES_CONTRAVENTIONS)
+        writer.writeheader()
+        lot = []
+        for ligne in generer_lignes(lignes, graine, nouvelles):
+            if ligne["id_poursuite"] <= lignes \
+                    and changements and alea.random() < changements:
+                ligne["statut"] = "Fermé changement d'exploitant"
+                ligne["date_statut"] = _jour(DERNIERE_DATE)
+            lot.append(ligne)
+            if len(lot) >= TAILLE_LOT:
+                writer.writerows(lot)
+                ecrites += len(lot)
+                lot.clear()
+        writer.writerows(lot)
+        ecrites += len(lot)
+    return ecrites
+
+
+def ajouter_utilisateurs(chemin_bd, nombre, surveillances=5,
+                         graine=GRAINE):
+    """
+    Ajoute des utilisateurs fictifs et leurs établissements surveillés,
+    choisis parmi ceux qui ont le plus de contraventions.
+
+    Les mots de passe ne sont pas hachés (les utilisateurs ne peuvent pas
+    se connecter) : ils servent aux notifications et aux surveillances.
+
+    Args:
+        chemin_bd (str): Base déjà importée.
+        nombre (int): Nombre d'utilisateurs.
+        surveillances (int): Établissements surveillés par utilisateur.
+        graine (int): Graine du générateur pseudo-aléatoire.
+    """
+    alea = random.Random(graine + 2)
+    connexion = base_de_donnees.ouvrir_connexion(chemin_bd)
+    try:
+        base_de_donnees.migrer_schema(connexion)
+        populaires = [ligne[0] for ligne in connexion.execute("""
+            SELECT business_id FROM etablissements
+             ORDER BY nb_contraventions DESC LIMIT 1000
+        """)]
+        with connexion:
+            connexion.executemany("""
+                INSERT OR IGNORE INTO utilisateurs
+                    (username, password_hash, salt, nom, prenom)
+                VALUES (?, '-', '-', ?, ?)
+            """, [
+                (f"utilisateur{i}", alea.choice(NOMS), alea.choice(PRENOMS))
+                for i in range(nombre)
+            ])
+            connexion.executemany("""
+                INSERT OR IGNORE INTO surveillances (username, business_id)
+                VALUES (?, ?)
+            """, [
+                (f"utilisateur{i}", business_id)
+                for i in range(nombre)
+                for business_id in alea.sample(
+                    populaires, min(surveillances, len(populaires)))
+            ])
+    except sqlite3.Error as e:
+        print("Erreur lors de l'ajout des utilisateurs:", e)
+    finally:
+        connexion.close()
+
+
+def preparer_csv(dossier, lignes, graine=GRAINE):
+    """
+    Écrit, s'ils n'existent pas déjà, le CSV initial et sa publication
+    suivante (1 % de changements de statut, 1 % de nouvelles lignes).
+
+    Args:
+        dossier (str): Dossier des données générées.
+        lignes (int): Nombre de contraventions.
+        graine (int): Graine du générateur pseudo-aléatoire.
+
+    Returns:
+        tuple: Chemins (csv_initial, csv_suivant).
+    """
+    os.makedirs(dossier, exist_ok=True)
+    initial = os.path.join(dossier, f"contraventions-{lignes}-{graine}.csv")
+    suivant = os.path.join(
+        dossier, f"contraventions-{lignes}-{graine}-suivant.csv")
+    for chemin, changements, nouvelles in (
+            (initial, 0.0, 0), (suivant, 0.01, max(1, lignes // 100))):
+        if not os.path.exists(chemin):
+            generer_csv(chemin + ".tmp", lignes, graine, changements,
+                        nouvelles)
+            os.replace(chemin + ".tmp", chemin)
+    return initial, suivant
+
+
+def importer(chemin_bd, source):
+    """
+    Importe un CSV avec A1 dans la base 'chemin_bd' (créée au besoin
+    par la migration du schéma).
+
+    Args:
+        chemin_bd (str): Fichier de la base.
+        source (str): CSV à importer.
+
+    Returns:
+        dict: Rapport de A1.
+    """
+    precedent = base_de_donnees.CHEMIN_BD
+    base_de_donnees.CHEMIN_BD = chemin_bd
+    try:
+        return fonctionnalites.A1(source)
+    finally:
+        base_de_donnees.CHEMIN_BD = precedent
+
+
+if __name__ == "__main__":
+    """
+    Produit un CSV et, au besoin, une base SQLite peuplée, par exemple :
+    python -m bench.generateur 100000 --bd /tmp/contraventions.db
+    """
+    arguments = argparse.ArgumentParser(
+        description="Données synthétiques de contraventions")
+    arguments.add_argument("lignes", type=int)
+    arguments.add_argument("--graine", type=int, default=GRAINE)
+    arguments.add_argument("--dossier", default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "donnees"))
+    arguments.add_argument("--bd", help="base SQLite à peupler avec A1")
+    arguments.add_argument("--utilisateurs", type=int, default=1000)
+    options = arguments.parse_args()
+
+    initial, suivant = preparer_csv(
+        options.dossier, options.lignes, options.graine)
+    print("CSV :", initial, suivant)
+    if options.bd:
+        print(importer(options.bd, initial))
+        ajouter_utilisateurs(options.bd, options.utilisateurs,
+                             graine=options.graine)
@@ -0,0 +1,114 @@
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+
+def resume(durees, lignes=None):
+    """
+    Résume une série de durées : centiles, moyenne et débit.
+
+    Args:
+        durees (list): Durées mesurées (secondes).
+        lignes (int, optional): Lignes traitées par exécution, pour le
+            débit en lignes par seconde.
+
+    Returns:
+        dict: Nombre d'exécutions et durées en millisecondes (p50, p95,
+        p99, min, max, moyenne), plus 'lignes' et 'lignes_s' si fourni.
+    """
+    durees = sorted(durees)
+    if len(durees) > 1:
+        centiles = statistics.quantiles(durees, n=100, method="inclusive")
+        p50, p95, p99 = centiles[49], centiles[94], centiles[98]
+    else:
+        p50 = p95 = p99 = durees[0]
+    moyenne = statistics.fmean(durees)
+    mesure = {
+        "n": len(durees),
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "min_ms": round(durees[0] * 1000, 3),
+        "max_ms": round(durees[-1] * 1000, 3),
+        "moyenne_ms": round(moyenne * 1000, 3),
+    }
+    if lignes is not None:
+        mesure["lignes"] = lignes
+        mesure["lignes_s"] = round(lignes / moyenne) if moyenne else None
+    return mesure
+
+
+def chronometrer(fonction, repetitions, echauffement=1, lignes=None):
+    """
+    Exécute une fonction plusieurs fois et résume ses durées.
+
+    Args:
+        fonction (callable): Appelée sans argument. Si 'lignes' vaut
+            True, elle doit renvoyer le nombre de lignes traitées.
+        repetitions (int): Exécutions mesurées.
+        echauffement (int): Exécutions préalables, non mesurées (caches
+            de SQLite et du système de fichiers).
+        lignes (int | bool, optional): Lignes traitées par exécution, ou
+            True pour prendre la valeur renvoyée par la fonction.
+
+    Returns:
+        dict: Résumé (voir resume).
+    """
+    for _ in range(echauffement):
+        fonction()
+    durees = []
+    traitees = 0
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - debut)
+        if lignes is True:
+            traitees = resultat
+    return resume(durees, traitees if lignes is True else lignes)
+
+
+def rss_max_mo():
+    """
+    Pic de mémoire résidente du processus courant.
+
+    Returns:
+        float: Mégaoctets.
+    """
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilooctets sous Linux
+    diviseur = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(pic / diviseur, 1)
+
+
+def allocations(fonction):
+    """
+    Compte, avec tracemalloc, la mémoire allouée par un appel.
+
+    Args:
+        fonction (callable): Appelée sans argument; son résultat est
+            gardé jusqu'à la fin de la mesure.
+
+    Returns:
+        dict: Blocs et kilooctets encore alloués après l'appel (retenus,
+        dont le résultat) et pic de mémoire pendant l'appel.
+    """
+    exclus = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    try:
+        avant = tracemalloc.take_snapshot().filter_traces(exclus)
+        depart = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        resultat = fonction()
+        actuel, pic = tracemalloc.get_traced_memory()
+        apres = tracemalloc.take_snapshot().filter_traces(exclus)
+    finally:
+        tracemalloc.stop()
+    del resultat
+    return {
+        "blocs_retenus": sum(
+            stat.count_diff for stat in apres.compare_to(avant, "filename")),
+        "retenus_ko": round((actuel - depart) / 1024, 1),
+        "pic_ko": round((pic - depart) / 1024, 1),
+    }
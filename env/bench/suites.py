@@ -0,0 +1,875 @@
+import base_de_donnees
+import exportations
+import fonctionnalites
+import photos
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from datetime import date
+from urllib.parse import quote
+
+from bench import generateur
+from bench.mesures import allocations, chronometrer, resume, rss_max_mo
+
+
+# Chaque suite reçoit le contexte d'une taille de données (chemins de la
+# base et des CSV, nombre de lignes, répétitions) et renvoie ses mesures :
+# des résumés de durées (voir mesures.resume) ou des valeurs simples.
+# Elles sont exécutées chacune dans un processus neuf (voir __main__.py).
+
+# Utilisateurs fictifs qui surveillent des établissements (notifications)
+UTILISATEURS = 1000
+
+# Durée d'une transaction d'écriture concurrente, plus longue que le
+# busy_timeout des connexions (5 s), pour la suite ecrivain
+DUREE_VERROU = 6
+
+# Écritures simultanées de la suite ecrivain
+ECRITURES = 200
+
+# Fils et opérations par fil de la suite pool
+FILS_POOL = 8
+OPERATIONS_POOL = 200
+
+# Connexions simultanées et requêtes de la suite api_async
+CLIENTS_ASYNC = 32
+REQUETES_ASYNC = 4000
+
+# Coûts de scrypt (N) comparés par la suite mots_de_passe
+COUTS_SCRYPT = (2 ** 13, 2 ** 14, 2 ** 15)
+
+# Routes dont les réponses sont mises en cache (app.mise_en_cache)
+ROUTES_EN_CACHE = {
+    "/contrevenants", "/etablissements", "/pire-etablissement",
+    "/statistiques", "/statistiques/xml", "/statistiques/csv",
+    "/contrevenants.csv", "/contrevenants.xml", "/statistiques/periode",
+}
+
+# Suites dont les mesures ne dépendent pas de la taille des données
+SUITES_COMMUNES = ("mots_de_passe",)
+
+
+def preparer_processus(contexte):
+    """
+    Dirige les modules de l'application vers la base et le magasin de
+    photos du banc d'essai.
+    """
+    base_de_donnees.CHEMIN_BD = contexte["bd"]
+    photos.DOSSIER_PHOTOS = os.path.join(contexte["dossier"], "photos")
+
+
+@contextlib.contextmanager
+def silencieux():
+    """
+    Masque les messages affichés par l'application (erreurs attendues
+    des suites de charge).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def parametres_requetes(db):
+    """
+    Choisit, dans la base générée, des valeurs de recherche
+    représentatives : établissements très et peu fréquents, mots de
+    recherche, plages de dates et identifiants.
+
+    Args:
+        db (base_de_donnees.Database): Base importée.
+
+    Returns:
+        dict: Paramètres des suites requetes, recherche et routes.
+    """
+    connexion = db.get_connexion()
+    frequent = connexion.execute("""
+        SELECT etablissement FROM stats_etablissements
+         ORDER BY nb DESC LIMIT 1
+    """).fetchone()[0]
+    rare = connexion.execute("""
+        SELECT etablissement FROM stats_etablissements
+         ORDER BY nb, etablissement LIMIT 1
+    """).fetchone()[0]
+    populaires = [ligne[0] for ligne in connexion.execute("""
+        SELECT business_id FROM etablissements
+         ORDER BY nb_contraventions DESC LIMIT 10
+    """)]
+    annee = (generateur.PREMIERE_DATE.year
+             + generateur.DERNIERE_DATE.year) // 2
+    return {
+        "etablissement_frequent": frequent,
+        "etablissement_rare": rare,
+        "mot_etablissement": frequent.split()[0],
+        "proprietaire": "Tremblay",
+        "rue": "Saint-Denis",
+        "mois": (f"{annee}0601", f"{annee}0630"),
+        "annee": (f"{annee}0101", f"{annee}1231"),
+        "business_ids": populaires,
+        "utilisateur": "utilisateur0",
+    }
+
+
+def inserer_ligne_par_ligne(connexion, lignes):
+    """
+    Insertion d'avant les lots (référence) : un SELECT COUNT(*) puis un
+    INSERT par ligne du CSV.
+    """
+    curseur = connexion.cursor()
+    colonnes = fonctionnalites.COLONNES_CONTRAVENTIONS
+    requete = f"""
+        INSERT INTO contraventions ({", ".join(colonnes)})
+        VALUES ({", ".join("?" * len(colonnes))})
+    """
+    inseres = 0
+    for ligne in lignes:
+        valeurs = fonctionnalites.convertir_ligne(ligne)
+        curseur.execute(
+            "SELECT COUNT(*) FROM contraventions WHERE id_poursuite = ?",
+            (valeurs[0],))
+        if curseur.fetchone()[0] == 0:
+            curseur.execute(requete, valeurs)
+            inseres += 1
+    return inseres
+
+
+def comparer_insertions(contexte):
+    """
+    Insère le CSV initial dans une base vide, ligne par ligne puis par
+    lots (fonctionnalites.inserer_contraventions), dans une seule
+    transaction chaque fois. Ligne par ligne, les déclencheurs FTS5
+    écrivent à chaque insertion; par lots, la base vide est chargée en
+    masse et l'index plein texte reconstruit à la fin (compris dans la
+    mesure).
+    """
+    chemin = os.path.join(
+        contexte["dossier"], f"comparaison-{contexte['lignes']}.db")
+    mesures = {}
+    for nom, inserer in (
+            ("insertion_ligne_par_ligne", inserer_ligne_par_ligne),
+            ("insertion_par_lots", lambda connexion, lignes:
+             fonctionnalites.inserer_contraventions(
+                 connexion, lignes)["inseres"])):
+        for suffixe in ("", "-wal", "-shm"):
+            if os.path.exists(chemin + suffixe):
+                os.remove(chemin + suffixe)
+        connexion = base_de_donnees.ouvrir_connexion(chemin)
+        try:
+            base_de_donnees.migrer_schema(connexion)
+            with open(contexte["csv"], encoding="utf-8",
+                      newline="") as fichier:
+                debut = time.perf_counter()
+                with connexion:
+                    inseres = inserer(connexion, csv.DictReader(fichier))
+                mesures[nom] = resume(
+                    [time.perf_counter() - debut], inseres)
+        finally:
+            connexion.close()
+    for suffixe in ("", "-wal", "-shm"):
+        if os.path.exists(chemin + suffixe):
+            os.remove(chemin + suffixe)
+    mesures["insertion_acceleration"] = round(
+        mesures["insertion_ligne_par_ligne"]["p50_ms"]
+        / mesures["insertion_par_lots"]["p50_ms"], 1)
+    return mesures
+
+
+def suite_ingestion(contexte):
+    """
+    Construit la base du banc d'essai avec A1 et mesure l'importation
+    initiale, une réimportation du même fichier (inchangé) et la
+    publication suivante (1 % de statuts changés, 1 % de nouvelles
+    contraventions), qui notifie les utilisateurs fictifs. Compare enfin
+    l'insertion par lots à l'insertion ligne par ligne d'origine.
+    """
+    instantane = os.path.splitext(contexte["bd"])[0] + ".instantane"
+    for fichier in (contexte["bd"], contexte["bd"] + "-wal",
+                    contexte["bd"] + "-shm", instantane):
+        if os.path.exists(fichier):
+            os.remove(fichier)
+
+    mesures = {}
+
+    def importer(nom, source):
+        debut = time.perf_counter()
+        rapport = generateur.importer(contexte["bd"], source)
+        mesures[nom] = resume(
+            [time.perf_counter() - debut],
+            rapport["inseres"] + rapport["mis_a_jour"] or None)
+        return rapport
+
+    with silencieux():
+        rapport = importer("A1_initiale", contexte["csv"])
+        generateur.ajouter_utilisateurs(
+            contexte["bd"], UTILISATEURS, graine=contexte["graine"])
+        importer("A1_inchangee", contexte["csv"])
+        suivante = importer("A1_suivante", contexte["csv_suivant"])
+
+    mesures["octets_csv"] = rapport["octets"]
+    mesures["notifications"] = suivante["notifications"]
+    mesures["taille_bd_mo"] = round(
+        os.path.getsize(contexte["bd"]) / 1024 / 1024, 1)
+    with silencieux():
+        mesures.update(comparer_insertions(contexte))
+    return mesures
+
+
+def suite_requetes(contexte):
+    """
+    Mesure chaque méthode de lecture de Database.
+    """
+    pool = base_de_donnees.PoolConnexions(taille=1)
+    db = base_de_donnees.Database(pool)
+    p = parametres_requetes(db)
+    repetitions = contexte["repetitions"]
+    identifiant_session = str(uuid.uuid4())
+    db.ajouter_session(identifiant_session, p["utilisateur"],
+                       int(time.time()))
+
+    def page(curseur):
+        return len(curseur.fetchall())
+
+    appels = {
+        "version_donnees": lambda: db.version_donnees() and 1,
+        "lister_etablissements": lambda: len(db.lister_etablissements()),
+        "rechercher_contraventions_frequent": lambda: len(
+            db.rechercher_contraventions(
+                etablissement=p["etablissement_frequent"])),
+        "rechercher_contraventions_rare": lambda: len(
+            db.rechercher_contraventions(
+                etablissement=p["etablissement_rare"])),
+        "rechercher_contraventions_proprietaire": lambda: len(
+            db.rechercher_contraventions(proprietaire=p["proprietaire"])),
+        "rechercher_contraventions_rue": lambda: len(
+            db.rechercher_contraventions(rue=p["rue"])),
+        "curseur_contraventions_page": lambda: page(
+            db.curseur_contraventions(
+                etablissement=p["mot_etablissement"], limite=100)),
+        "rechercher_contraventions_par_dates_mois": lambda: len(
+            db.rechercher_contraventions_par_dates(*p["mois"])),
+        "rechercher_contraventions_par_dates_annee": lambda: len(
+            db.rechercher_contraventions_par_dates(*p["annee"])),
+        "curseur_contraventions_par_dates_page": lambda: page(
+            db.curseur_contraventions_par_dates(*p["annee"], limite=100)),
+        "statistiques_infractions": lambda: len(
+            db.statistiques_infractions()),
+        "pire_etablissement": lambda: db.pire_etablissement() and 1,
+        "historique_ingestions": lambda: len(db.historique_ingestions()),
+        "obtenir_utilisateur": lambda: db.obtenir_utilisateur(
+            p["utilisateur"]) and 1,
+        "obtenir_session": lambda: db.obtenir_session(
+            identifiant_session) and 1,
+        "etablissements_par_ids": lambda: len(
+            db.etablissements_par_ids(p["business_ids"])),
+        "etablissements_surveilles": lambda: len(
+            db.etablissements_surveilles(p["utilisateur"])),
+        "surveillants": lambda: len(db.surveillants(p["business_ids"])),
+        "notifications_utilisateur": lambda: len(
+            db.notifications_utilisateur(p["utilisateur"])),
+    }
+    try:
+        return {
+            nom: chronometrer(appel, repetitions, lignes=True)
+            for nom, appel in appels.items()
+        }
+    finally:
+        db.deconnecter()
+        pool.fermer()
+
+
+def suite_recherche(contexte):
+    """
+    Compare la recherche A2 par l'index plein texte (FTS5) à un filtre
+    LIKE '%...%' sur la table, pour les trois critères du formulaire,
+    puis mesure l'autocomplétion E2 par l'index en mémoire
+    (autocompletion.py), saisie lettre par lettre.
+    """
+    import autocompletion
+
+    db = base_de_donnees.Database()
+    p = parametres_requetes(db)
+    repetitions = contexte["repetitions"]
+    mesures = {}
+    try:
+        for critere, colonne, valeur in (
+                ("etablissement", "etablissement", p["mot_etablissement"]),
+                ("proprietaire", "proprietaire", p["proprietaire"]),
+                ("rue", "adresse", p["rue"])):
+            mesures[f"fts_{critere}"] = chronometrer(
+                lambda: len(db.rechercher_contraventions(
+                    **{critere: valeur})),
+                repetitions, lignes=True)
+            mesures[f"like_{critere}"] = chronometrer(
+                lambda: len(db.get_connexion().execute(f"""
+                    SELECT * FROM contraventions
+                     WHERE {colonne} LIKE ?
+                     ORDER BY date DESC, id_poursuite DESC
+                """, (f"%{valeur}%",)).fetchall()),
+                repetitions, lignes=True)
+
+        debut = time.perf_counter()
+        index = autocompletion.MoteurAutocompletion().index(db)
+        mesures["autocompletion_construction"] = resume(
+            [time.perf_counter() - debut], len(index))
+        mot = p["etablissement_frequent"]
+        saisies = [mot[:i] for i in range(1, min(len(mot), 12) + 1)]
+        mesures["autocompletion_index"] = chronometrer(
+            lambda: sum(len(index.rechercher(saisie))
+                        for saisie in saisies),
+            repetitions, lignes=True)
+        mesures["autocompletion_saisies"] = len(saisies)
+    finally:
+        db.deconnecter()
+    return mesures
+
+
+def suite_metriques(contexte):
+    """
+    Mesure le coût de l'instrumentation (metriques.py) des méthodes de
+    Database en appelant chaque méthode avec et sans son enveloppe, puis
+    celui de la mesure des routes Flask (app.fin_mesure) sur la route de
+    recherche A2, mesure activée puis coupée.
+    """
+    import metriques
+
+    os.environ.setdefault("SECRET_KEY", "banc-essai")
+    import app as application
+
+    db = base_de_donnees.Database()
+    p = parametres_requetes(db)
+    repetitions = contexte["repetitions"] * 100
+    mesures = {}
+
+    def surcout(nom, avec, sans):
+        mesures[f"{nom}_instrumentee"] = resume(avec)
+        mesures[f"{nom}_brute"] = resume(sans)
+        # Médianes non arrondies : le surcoût est de l'ordre de la
+        # microseconde, la précision des résumés
+        avec, sans = statistics.median(avec), statistics.median(sans)
+        mesures[f"{nom}_surcout_us"] = round((avec - sans) * 1e6, 2)
+        mesures[f"{nom}_surcout_pct"] = round(100 * (avec / sans - 1), 2)
+
+    try:
+        for nom, args in (
+                ("rechercher_contraventions",
+                 (p["etablissement_rare"],)),
+                ("pire_etablissement", ())):
+            methode = getattr(base_de_donnees.Database, nom)
+            brute = getattr(methode, "__wrapped__", None)
+            if brute is None:
+                return {"actives": False}
+            # Appels alternés, pour que les deux séries subissent les
+            # mêmes variations de la machine
+            durees = {methode: [], brute: []}
+            for _ in range(repetitions):
+                for fonction, serie in durees.items():
+                    debut = time.perf_counter()
+                    fonction(db, *args)
+                    serie.append(time.perf_counter() - debut)
+            surcout(nom, durees[methode], durees[brute])
+
+        client = application.app.test_client()
+        formulaire = {"etablissement": p["etablissement_rare"]}
+        durees = {True: [], False: []}
+        for _ in range(contexte["repetitions"] * 10):
+            for actives, serie in durees.items():
+                metriques.ACTIVES = actives
+                debut = time.perf_counter()
+                client.post("/recherche", data=formulaire)
+                serie.append(time.perf_counter() - debut)
+        metriques.ACTIVES = True
+        surcout("route_recherche", durees[True], durees[False])
+    finally:
+        db.deconnecter()
+    return mesures
+
+
+def suite_analytique(contexte):
+    """
+    Agrégats par période d'analytique.py (colonnes NumPy) comparés aux
+    requêtes SQL équivalentes, sur une année puis sur toute la période,
+    durée de construction des colonnes, puis écriture et ouverture de
+    l'instantané (mmap) qui les partage entre les processus.
+    """
+    import analytique
+
+    db = base_de_donnees.Database()
+    connexion = db.get_connexion()
+    repetitions = contexte["repetitions"]
+    mesures = {}
+    try:
+        debut = time.perf_counter()
+        colonnes = analytique.charger_colonnes(db)
+        mesures["construction"] = resume(
+            [time.perf_counter() - debut], len(colonnes))
+
+        annee = (generateur.PREMIERE_DATE.year
+                 + generateur.DERNIERE_DATE.year) // 2
+        for nom, jours in (
+                ("annee", (date(annee, 1, 1), date(annee, 12, 31))),
+                ("tout", (date(1900, 1, 1), date(2100, 12, 31)))):
+            du, au = (jour.strftime("%Y%m%d") for jour in jours)
+            mesures[f"numpy_resume_{nom}"] = chronometrer(
+                lambda: colonnes.resume(*jours), repetitions)
+            mesures[f"numpy_par_etablissement_{nom}"] = chronometrer(
+                lambda: len(colonnes.par_etablissement(*jours)),
+                repetitions, lignes=True)
+            mesures[f"sql_par_etablissement_{nom}"] = chronometrer(
+                lambda: len(connexion.execute("""
+                    SELECT etablissement, COUNT(*), SUM(montant)
+                      FROM contraventions
+                     WHERE date BETWEEN ? AND ?
+                     GROUP BY etablissement
+                     ORDER BY 2 DESC, 1
+                """, (du, au)).fetchall()),
+                repetitions, lignes=True)
+            mesures[f"sql_par_mois_{nom}"] = chronometrer(
+                lambda: len(connexion.execute("""
+                    SELECT substr(date, 1, 6), COUNT(*), SUM(montant)
+                      FROM contraventions
+                     WHERE date BETWEEN ? AND ?
+                     GROUP BY 1
+                """, (du, au)).fetchall()),
+                repetitions, lignes=True)
+
+        chemin = os.path.join(
+            contexte["dossier"], f"banc-{contexte['lignes']}.instantane")
+        mesures["instantane_ecriture"] = chronometrer(
+            lambda: colonnes.enregistrer(chemin), 3, lignes=len(colonnes))
+        mesures["instantane_ouverture"] = chronometrer(
+            lambda: analytique.Colonnes.depuis_instantane(chemin),
+            repetitions)
+        projetees = analytique.Colonnes.depuis_instantane(chemin)
+        jours = (date(1900, 1, 1), date(2100, 12, 31))
+        mesures["instantane_resume_tout"] = chronometrer(
+            lambda: projetees.resume(*jours), repetitions)
+        mesures["etablissements_sql"] = chronometrer(
+            lambda: len(db.lister_etablissements()), repetitions,
+            lignes=True)
+        mesures["etablissements_instantane"] = chronometrer(
+            lambda: len(list(projetees.liste_etablissements)),
+            repetitions, lignes=True)
+        mesures["taille_instantane_mo"] = round(
+            os.path.getsize(chemin) / 1024 / 1024, 1)
+        mesures["memoire_colonnes_mo"] = round(sum(
+            getattr(colonnes, nom).nbytes for nom in (
+                "jours", "mois", "etablissements", "categories",
+                "statuts", "montants")
+        ) / 1024 / 1024, 1)
+    finally:
+        db.deconnecter()
+    return mesures
+
+
+def suite_serialisation(contexte):
+    """
+    Lecture et encodage JSON des contraventions (/contrevenants,
+    /infractions) : sqlite3.Row converties en dictionnaires, comparées
+    aux Contravention encodées par gabarit (exportations.encodeur_json).
+    Durées, puis allocations mesurées avec tracemalloc.
+    """
+    db = base_de_donnees.Database()
+    repetitions = contexte["repetitions"]
+    debut, fin = "19000101", "21001231"
+    mesures = {}
+
+    def lire(compacte, limite=None):
+        curseur = db.curseur_contraventions_par_dates(debut, fin, limite)
+        if not compacte:
+            curseur.row_factory = sqlite3.Row
+        return curseur
+
+    def avec_dictionnaires(limite=None):
+        return "[" + ",".join(
+            json.dumps(dict(ligne), sort_keys=True)
+            for ligne in lire(False, limite).fetchall()
+        ) + "]"
+
+    def avec_gabarit(limite=None):
+        curseur = lire(True, limite)
+        encoder = exportations.encodeur_json(
+            [colonne[0] for colonne in curseur.description])
+        return "[" + ",".join(map(encoder, curseur.fetchall())) + "]"
+
+    try:
+        mesures["json_identique"] = (
+            json.loads(avec_dictionnaires()) == json.loads(avec_gabarit()))
+        total = len(lire(True).fetchall())
+        page = exportations.LIMITE_MAX
+        mesures["lecture_row"] = chronometrer(
+            lambda: len(lire(False).fetchall()), repetitions, lignes=True)
+        mesures["lecture_contravention"] = chronometrer(
+            lambda: len(lire(True).fetchall()), repetitions, lignes=True)
+        for nom, limite, lignes in (("page", page, min(page, total)),
+                                    ("tout", None, total)):
+            mesures[f"json_dictionnaires_{nom}"] = chronometrer(
+                lambda: avec_dictionnaires(limite), repetitions,
+                lignes=lignes)
+            mesures[f"json_gabarit_{nom}"] = chronometrer(
+                lambda: avec_gabarit(limite), repetitions, lignes=lignes)
+
+        # Encodage seul, sur des lignes déjà lues
+        lignes_row = lire(False).fetchall()
+        contraventions = lire(True).fetchall()
+        encoder = exportations.encodeur_json(
+            base_de_donnees.CHAMPS_CONTRAVENTION)
+        mesures["encodage_dictionnaires"] = chronometrer(
+            lambda: ",".join(json.dumps(dict(ligne), sort_keys=True)
+                             for ligne in lignes_row),
+            repetitions, lignes=total)
+        mesures["encodage_gabarit"] = chronometrer(
+            lambda: ",".join(map(encoder, contraventions)), repetitions,
+            lignes=total)
+        del lignes_row, contraventions
+
+        mesures["allocations_lecture_row"] = allocations(
+            lambda: lire(False).fetchall())
+        mesures["allocations_lecture_contravention"] = allocations(
+            lambda: lire(True).fetchall())
+        mesures["allocations_json_dictionnaires"] = allocations(
+            avec_dictionnaires)
+        mesures["allocations_json_gabarit"] = allocations(avec_gabarit)
+    finally:
+        db.deconnecter()
+    return mesures
+
+
+def suite_pool(contexte):
+    """
+    Requêtes courtes lancées par FILS_POOL fils : connexions empruntées
+    au pool, puis connexion ouverte et fermée à chaque requête.
+    """
+    mesures = {}
+    for mode in ("pool", "sans_pool"):
+        pool = (base_de_donnees.PoolConnexions(taille=FILS_POOL)
+                if mode == "pool" else None)
+        durees = []
+
+        def travail():
+            for _ in range(OPERATIONS_POOL):
+                debut = time.perf_counter()
+                db = base_de_donnees.Database(pool)
+                try:
+                    db.version_donnees()
+                    db.pire_etablissement()
+                finally:
+                    db.deconnecter()
+                durees.append(time.perf_counter() - debut)
+
+        fils = [threading.Thread(target=travail) for _ in range(FILS_POOL)]
+        debut = time.perf_counter()
+        for fil in fils:
+            fil.start()
+        for fil in fils:
+            fil.join()
+        total = time.perf_counter() - debut
+        mesures[mode] = resume(durees)
+        mesures[f"{mode}_operations_s"] = round(len(durees) / total)
+        if pool is not None:
+            pool.fermer()
+    return mesures
+
+
+def suite_ecrivain(contexte):
+    """
+    ECRITURES inscriptions simultanées (utilisateur et session) pendant
+    qu'une autre connexion garde le verrou d'écriture DUREE_VERROU
+    secondes : par le fil d'écriture (ecrivain.Ecrivain), puis par des
+    transactions directes sur les connexions du pool.
+    """
+    import ecrivain
+
+    mesures = {}
+    for mode in ("ecrivain", "direct"):
+        pool = base_de_donnees.PoolConnexions()
+        fil_ecriture = ecrivain.Ecrivain() if mode == "ecrivain" else None
+        durees = []
+        erreurs = []
+
+        def verrouiller():
+            connexion = base_de_donnees.ouvrir_connexion()
+            with connexion:
+                connexion.execute(
+                    "UPDATE metadonnees SET valeur = valeur "
+                    "WHERE cle = 'version_donnees'")
+                time.sleep(DUREE_VERROU)
+            connexion.close()
+
+        def inscrire(numero):
+            nom = f"{mode}_{uuid.uuid4().hex[:8]}_{numero}"
+            debut = time.perf_counter()
+            db = base_de_donnees.Database(pool, fil_ecriture)
+            try:
+                if db.creer_utilisateur(nom, "-", "-", "Banc", "Essai") \
+                        is None or not db.ajouter_session(
+                            str(uuid.uuid4()), nom, int(time.time())):
+                    erreurs.append(numero)
+                    return
+            except Exception:
+                erreurs.append(numero)
+                return
+            finally:
+                db.deconnecter()
+            durees.append(time.perf_counter() - debut)
+
+        with silencieux():
+            verrou = threading.Thread(target=verrouiller)
+            verrou.start()
+            time.sleep(0.2)
+            fils = [threading.Thread(target=inscrire, args=(i,))
+                    for i in range(ECRITURES)]
+            debut = time.perf_counter()
+            for fil in fils:
+                fil.start()
+            for fil in fils:
+                fil.join()
+            verrou.join()
+        mesures[f"{mode}_duree_s"] = round(time.perf_counter() - debut, 2)
+        mesures[f"{mode}_reussies"] = len(durees)
+        mesures[f"{mode}_erreurs"] = len(erreurs)
+        if durees:
+            mesures[mode] = resume(durees)
+        if fil_ecriture is not None:
+            fil_ecriture.arreter()
+        pool.fermer()
+    return mesures
+
+
+def suite_mots_de_passe(contexte):
+    """
+    Durée d'un hachage scrypt pour chaque coût de COUTS_SCRYPT et débit
+    de connexions (vérifications simultanées) au coût par défaut.
+    """
+    import mots_de_passe
+
+    mesures = {}
+    for n in COUTS_SCRYPT:
+        service = mots_de_passe.ServiceMotsDePasse(n=n, algorithme="scrypt")
+        mesures[f"hacher_scrypt_n{n}"] = chronometrer(
+            lambda: service.hacher("mot de passe"), 5)
+        service.fermer()
+
+    service = mots_de_passe.ServiceMotsDePasse()
+    password_hash, salt = service.hacher("mot de passe")
+    verifications = 8 * mots_de_passe.TRAVAILLEURS
+    fils = [
+        threading.Thread(target=service.verifier,
+                         args=("mot de passe", password_hash, salt))
+        for _ in range(verifications)
+    ]
+    debut = time.perf_counter()
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+    mesures["connexions_s"] = round(
+        verifications / (time.perf_counter() - debut), 1)
+    mesures["algorithme"] = service.algorithme
+    service.fermer()
+    return mesures
+
+
+def suite_routes(contexte):
+    """
+    Mesure chaque route de l'application Flask avec le client de test,
+    connecté comme un utilisateur qui surveille des établissements.
+    Les routes mises en cache sont mesurées cache vidé, puis servies
+    par le cache. L'inscription et la connexion par mot de passe sont
+    mesurées par la suite mots_de_passe.
+    """
+    os.environ.setdefault("SECRET_KEY", "banc-essai")
+    import app as application
+
+    db = base_de_donnees.Database(application.pool)
+    p = parametres_requetes(db)
+    password_hash, salt = application.service_mdp.hacher("banc")
+    db.creer_utilisateur("banc", password_hash, salt, "Banc", "Essai")
+    db.ajouter_surveillances("banc", p["business_ids"][:5])
+    empreinte = photos.enregistrer(
+        io.BytesIO(b"\x89PNG\r\n\x1a\n" + os.urandom(4096)))
+    db.ajout_photo_profil("banc", empreinte)
+    db.deconnecter()
+
+    client = application.app.test_client()
+    identifiant_session = str(uuid.uuid4())
+    application.sessions.creer(identifiant_session, "banc")
+    with client.session_transaction() as session:
+        session["utilisateur"] = "banc"
+        session["id_session"] = identifiant_session
+
+    repetitions = contexte["repetitions"]
+    lourdes = max(3, repetitions // 10)
+    du, au = (f"{d[:4]}-{d[4:6]}-{d[6:]}" for d in p["annee"])
+    mot = quote(p["mot_etablissement"])
+    # (nom, méthode, URL, options du client, répétitions)
+    routes = [
+        ("/", "GET", "/", {}, repetitions),
+        ("/recherche", "POST", "/recherche",
+         {"data": {"etablissement": p["mot_etablissement"]}}, repetitions),
+        ("/contrevenants", "GET", f"/contrevenants?du={du}&au={au}", {},
+         lourdes),
+        ("/contrevenants (page)", "GET",
+         f"/contrevenants?du={du}&au={au}&limite=100", {}, repetitions),
+        ("/doc", "GET", "/doc", {}, repetitions),
+        ("/etablissements", "GET", "/etablissements", {}, repetitions),
+        ("/infractions", "GET", "/infractions?etablissement="
+         + quote(p["etablissement_frequent"]), {}, repetitions),
+        ("/pire-etablissement", "GET", "/pire-etablissement", {},
+         repetitions),
+        ("/statistiques", "GET", "/statistiques", {}, repetitions),
+        ("/statistiques/xml", "GET", "/statistiques/xml", {}, repetitions),
+        ("/statistiques/csv", "GET", "/statistiques/csv", {}, repetitions),
+        ("/statistiques/periode", "GET",
+         f"/statistiques/periode?du={du}&au={au}", {}, repetitions),
+        ("/contrevenants.csv", "GET", "/contrevenants.csv", {}, lourdes),
+        ("/contrevenants.xml", "GET", "/contrevenants.xml", {}, lourdes),
+        ("/connexion", "GET", "/connexion", {}, repetitions),
+        ("/inscription", "GET", "/inscription", {}, repetitions),
+        ("/profil", "GET", "/profil", {}, repetitions),
+        ("/photo", "GET", f"/photo/banc?v={empreinte}", {}, repetitions),
+        ("/rechercher-etablissements", "GET",
+         f"/rechercher-etablissements?entree={mot[:3]}", {}, repetitions),
+        ("/etablissements-surveilles", "GET", "/etablissements-surveilles",
+         {}, repetitions),
+        ("/sante", "GET", "/sante", {}, repetitions),
+        ("/metrics", "GET", "/metrics", {}, repetitions),
+        ("/notifications", "GET", "/notifications", {}, repetitions),
+    ]
+
+    mesures = {}
+    for nom, methode, url, options, nombre in routes:
+        nom = f"{methode} {nom}"
+        octets = []
+
+        def appel(vider=True):
+            if vider:
+                application.cache.vider()
+            reponse = client.open(url, method=methode, **options)
+            corps = reponse.get_data()
+            reponse.close()
+            if reponse.status_code != 200:
+                raise RuntimeError(f"{methode} {url} : {reponse.status}")
+            octets.append(len(corps))
+
+        mesures[nom] = chronometrer(appel, nombre)
+        mesures[nom]["octets"] = octets[-1]
+        if url.split("?")[0] in ROUTES_EN_CACHE:
+            mesures[f"{nom} (cache)"] = chronometrer(
+                lambda: appel(vider=False), nombre)
+    return mesures
+
+
+def suite_api_async(contexte):
+    """
+    Générateur de charge du serveur de lecture asynchrone (api_async.py):
+    CLIENTS_ASYNC connexions HTTP/1.1 persistantes envoient en tout
+    REQUETES_ASYNC requêtes réparties sur les routes de lecture. Les
+    requêtes identiques simultanées partagent une exécution.
+    """
+    import api_async
+
+    db = base_de_donnees.Database()
+    p = parametres_requetes(db)
+    db.deconnecter()
+    du, au = (f"{d[:4]}-{d[4:6]}-{d[6:]}" for d in p["mois"])
+    cibles = [
+        "/etablissements", "/pire-etablissement", "/statistiques",
+        f"/contrevenants?du={du}&au={au}&limite=100",
+        "/infractions?etablissement="
+        + quote(p["etablissement_rare"]) + "&limite=50",
+    ]
+
+    with socket.socket() as prise:
+        prise.bind(("127.0.0.1", 0))
+        port = prise.getsockname()[1]
+    serveur = api_async.ServeurLecture(chemin=contexte["bd"])
+    threading.Thread(
+        target=lambda: asyncio.run(serveur.servir("127.0.0.1", port)),
+        daemon=True
+    ).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    durees = []
+    statuts = {}
+
+    async def client(numero):
+        lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+        for i in range(REQUETES_ASYNC // CLIENTS_ASYNC):
+            cible = cibles[(numero + i) % len(cibles)]
+            debut = time.perf_counter()
+            ecrivain.write(
+                f"GET {cible} HTTP/1.1\r\nHost: banc\r\n\r\n".encode())
+            entete = await lecteur.readuntil(b"\r\n\r\n")
+            lignes = entete.decode("latin-1").split("\r\n")
+            longueur = next(
+                int(ligne.split(":")[1]) for ligne in lignes
+                if ligne.lower().startswith("content-length:"))
+            await lecteur.readexactly(longueur)
+            durees.append(time.perf_counter() - debut)
+            statut = lignes[0].split(" ")[1]
+            statuts[statut] = statuts.get(statut, 0) + 1
+        ecrivain.close()
+
+    async def charger():
+        await asyncio.gather(*(client(i) for i in range(CLIENTS_ASYNC)))
+
+    debut = time.perf_counter()
+    asyncio.run(charger())
+    total = time.perf_counter() - debut
+    return {
+        "requetes": resume(durees),
+        "requetes_s": round(len(durees) / total),
+        "statuts": statuts,
+        "executions": serveur.executions,
+        "partages": serveur.partages,
+    }
+
+
+SUITES = {
+    "ingestion": suite_ingestion,
+    "requetes": suite_requetes,
+    "recherche": suite_recherche,
+    "analytique": suite_analytique,
+    "serialisation": suite_serialisation,
+    "routes": suite_routes,
+    "pool": suite_pool,
+    "ecrivain": suite_ecrivain,
+    "metriques": suite_metriques,
+    "api_async": suite_api_async,
+    "mots_de_passe": suite_mots_de_passe,
+}
+
+
+def executer_suite(nom, contexte):
+    """
+    Exécute une suite dans le processus courant (processus neuf lancé
+    par __main__.py, pour que le pic de mémoire lui soit propre).
+
+    Args:
+        nom (str): Nom de la suite (clé de SUITES).
+        contexte (dict): Contexte de la taille de données.
+
+    Returns:
+        dict: Durée de la suite, pic de mémoire résidente du processus
+        et mesures.
+    """
+    preparer_processus(contexte)
+    debut = time.perf_counter()
+    mesures = SUITES[nom](contexte)
+    return {
+        "duree_s": round(time.perf_counter() - debut, 2),
+        "rss_max_mo": rss_max_mo(),
+        "mesures": mesures,
+    }
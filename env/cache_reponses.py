@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+
+
+# Budget mémoire par défaut du cache (corps des réponses, en octets)
+BUDGET_OCTETS = 32 * 1024 * 1024
+
+# Taille maximale d'une réponse diffusée en continu mise en cache
+TAILLE_MAX_FLUX = 4 * 1024 * 1024
+
+
+class CacheReponses:
+    """
+    Cache LRU de réponses HTTP en mémoire, borné en octets.
+
+    Les entrées sont associées à une version des données (voir
+    Database.version_donnees) : dès qu'une nouvelle version est observée,
+    tout le cache est invalidé.
+    """
+
+    def __init__(self, budget_octets=BUDGET_OCTETS,
+                 taille_max_flux=TAILLE_MAX_FLUX):
+        self.budget_octets = budget_octets
+        self.taille_max_flux = taille_max_flux
+        self.taille_octets = 0
+        self.version = None
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def __len__(self):
+        return len(self._entrees)
+
+    def obtenir(self, cle, version):
+        """
+        Renvoie l'entrée associée à la clé pour cette version des données.
+
+        Args:
+            cle (hashable): Clé de la réponse (route et paramètres).
+            version (str): Version courante des données.
+
+        Returns:
+            tuple: (corps, entêtes) ou None si absente.
+        """
+        with self._verrou:
+            if version != self.version:
+                self._invalider(version)
+                return None
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                self._entrees.move_to_end(cle)
+            return entree
+
+    def stocker(self, cle, version, corps, entetes):
+        """
+        Enregistre une réponse et évince les moins récemment utilisées
+        si le budget est dépassé. Une réponse plus grosse que le budget
+        n'est pas conservée.
+
+        Args:
+            cle (hashable): Clé de la réponse.
+            version (str): Version des données ayant servi à la produire.
+            corps (bytes): Corps de la réponse.
+            entetes (list): Entêtes (nom, valeur) à restituer.
+        """
+        if len(corps) > self.budget_octets:
+            return
+
+        with self._verrou:
+            if version != self.version:
+                self._invalider(version)
+
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None:
+                self.taille_octets -= len(ancienne[0])
+
+            self._entrees[cle] = (corps, entetes)
+            self.taille_octets += len(corps)
+
+            while self.taille_octets > self.budget_octets:
+                _, (corps_evince, _) = self._entrees.popitem(last=False)
+                self.taille_octets -= len(corps_evince)
+
+    def copier_flux(self, flux, cle, version, entetes):
+        """
+        Relaie un flux de réponse tout en conservant une copie des
+        morceaux; la copie est mise en cache à la fin du flux, sauf si
+        elle dépasse taille_max_flux (elle est alors abandonnée).
+
+        Args:
+            flux (iterable): Morceaux d'octets de la réponse.
+            cle (hashable): Clé de la réponse.
+            version (str): Version des données ayant servi à la produire.
+            entetes (list): Entêtes (nom, valeur) à restituer.
+
+        Yields:
+            bytes: Morceaux du flux, inchangés.
+        """
+        morceaux = []
+        taille = 0
+        for morceau in flux:
+            yield morceau
+            if morceaux is not None:
+                taille += len(morceau)
+                if taille > self.taille_max_flux:
+                    morceaux = None
+                else:
+                    morceaux.append(morceau)
+
+        if morceaux is not None:
+            self.stocker(cle, version, b"".join(morceaux), entetes)
+
+    def vider(self):
+        """
+        Supprime toutes les entrées.
+        """
+        with self._verrou:
+            self._invalider(self.version)
+
+    def _invalider(self, version):
+        self._entrees.clear()
+        self.taille_octets = 0
+        self.version = version
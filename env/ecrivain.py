@@ -0,0 +1,235 @@
+import base_de_donnees
+import queue
+import sqlite3
+import threading
+import time
+from concurrent import futures
+
+
+# Attente maximale d'une écriture soumise (secondes)
+DELAI_ECRITURE = 30
+
+# Nombre maximal d'écritures regroupées dans une transaction
+TAILLE_GROUPE = 200
+
+# Pause entre deux tentatives d'obtenir le verrou d'écriture (secondes)
+PAUSE_VERROU = 0.05
+
+
+class _Operation:
+    __slots__ = ("fonction", "args", "echeance", "future")
+
+    def __init__(self, fonction, args, echeance):
+        self.fonction = fonction
+        self.args = args
+        self.echeance = echeance
+        self.future = futures.Future()
+
+
+class Ecrivain:
+    """
+    Fil d'écriture unique d'un processus : les écritures des requêtes
+    (utilisateurs, sessions, surveillances) sont mises en file et
+    exécutées par un seul fil, sur sa propre connexion.
+
+    Les écritures en attente sont regroupées dans une transaction
+    (BEGIN IMMEDIATE ... COMMIT) et chacune est isolée par un SAVEPOINT :
+    l'échec de l'une n'annule pas les autres. Si l'importation A1 détient
+    le verrou d'écriture, le fil attend et réessaie; une écriture qui n'a
+    pas commencé après 'delai' secondes est abandonnée, une écriture
+    commencée est attendue jusqu'à la validation de son groupe.
+    """
+
+    def __init__(self, chemin=None, delai=DELAI_ECRITURE,
+                 taille_groupe=TAILLE_GROUPE):
+        self.chemin = chemin
+        self.delai = delai
+        self.taille_groupe = taille_groupe
+        self._file = queue.Queue()
+        self._verrou = threading.Lock()
+        self._fil = None
+
+    def soumettre(self, fonction, *args, delai=None):
+        """
+        Met une écriture en file.
+
+        Args:
+            fonction (callable): Appelée avec (connexion, *args); elle
+                exécute ses requêtes sans valider la transaction.
+            *args: Arguments de la fonction.
+            delai (float, optional): Délai au-delà duquel l'écriture est
+                abandonnée si elle n'a pas commencé (self.delai par
+                défaut).
+
+        Returns:
+            concurrent.futures.Future: Résultat de la fonction, disponible
+            une fois la transaction validée.
+        """
+        self.demarrer()
+        delai = self.delai if delai is None else delai
+        operation = _Operation(fonction, args, time.monotonic() + delai)
+        self._file.put(operation)
+        return operation.future
+
+    def executer(self, fonction, *args, delai=None):
+        """
+        Soumet une écriture et attend son résultat.
+
+        Args:
+            fonction (callable): Voir soumettre.
+            *args: Arguments de la fonction.
+            delai (float, optional): Voir soumettre.
+
+        Returns:
+            Valeur renvoyée par la fonction.
+
+        Raises:
+            sqlite3.OperationalError: Si l'écriture n'a pas commencé
+                avant le délai.
+            Exception: Toute erreur levée par la fonction.
+        """
+        delai = self.delai if delai is None else delai
+        future = self.soumettre(fonction, *args, delai=delai)
+        try:
+            return future.result(timeout=delai)
+        except futures.TimeoutError:
+            if future.cancel():
+                raise sqlite3.OperationalError("Délai d'écriture dépassé")
+        # Le fil a pris l'écriture : il l'abandonne si son échéance passe
+        # avant son SAVEPOINT, sinon elle sera validée (ou annulée) avec
+        # son groupe. Le résultat est attendu pour ne pas annoncer un
+        # échec à l'appelant alors que l'écriture est validée.
+        return future.result()
+
+    def demarrer(self):
+        """
+        Démarre le fil d'écriture, s'il ne tourne pas déjà.
+        """
+        if self._fil is not None:
+            return
+        with self._verrou:
+            if self._fil is not None:
+                return
+            self._fil = threading.Thread(
+                target=self._boucle, name="ecrivain", daemon=True
+            )
+            self._fil.start()
+
+    def arreter(self):
+        """
+        Termine les écritures en file puis arrête le fil.
+        """
+        fil = self._fil
+        if fil is None:
+            return
+        self._file.put(None)
+        fil.join()
+        self._fil = None
+
+    def _boucle(self):
+        try:
+            connexion = base_de_donnees.ouvrir_connexion(self.chemin)
+            base_de_donnees.migrer_schema(connexion)
+        except Exception as e:
+            # Le prochain appel à soumettre relancera le fil
+            print("Erreur à l'ouverture de la connexion d'écriture:", e)
+            with self._verrou:
+                self._fil = None
+            self._echouer_en_file(e)
+            return
+        try:
+            while True:
+                operation = self._file.get()
+                if operation is None:
+                    return
+                groupe = [operation]
+                while len(groupe) < self.taille_groupe:
+                    try:
+                        operation = self._file.get_nowait()
+                    except queue.Empty:
+                        break
+                    if operation is None:
+                        self._file.put(None)
+                        break
+                    groupe.append(operation)
+                try:
+                    self._executer_groupe(connexion, groupe)
+                except Exception as e:
+                    # Seul ce groupe échoue : le fil continue
+                    print("Erreur du fil d'écriture:", e)
+                    if connexion.in_transaction:
+                        connexion.rollback()
+                    for operation in groupe:
+                        if not operation.future.done():
+                            operation.future.set_exception(e)
+        finally:
+            connexion.close()
+
+    def _echouer_en_file(self, erreur):
+        # Fait échouer les écritures en file (le fil ne peut pas démarrer)
+        while True:
+            try:
+                operation = self._file.get_nowait()
+            except queue.Empty:
+                return
+            if operation is not None and \
+                    operation.future.set_running_or_notify_cancel():
+                operation.future.set_exception(erreur)
+
+    def _executer_groupe(self, connexion, groupe):
+        groupe = [operation for operation in groupe
+                  if operation.future.set_running_or_notify_cancel()]
+
+        while True:
+            groupe = self._retirer_expirees(groupe)
+            if not groupe:
+                return
+            try:
+                connexion.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError:
+                time.sleep(PAUSE_VERROU)
+
+        # Le verrou a pu se faire attendre (importation A1 en cours), et
+        # chaque écriture du groupe allonge l'attente des suivantes :
+        # l'échéance est vérifiée juste avant de commencer chacune.
+        resultats = []
+        for operation in groupe:
+            if operation.echeance < time.monotonic():
+                operation.future.set_exception(sqlite3.OperationalError(
+                    "Délai d'écriture dépassé"))
+                continue
+            connexion.execute("SAVEPOINT operation")
+            try:
+                resultat = operation.fonction(connexion, *operation.args)
+                connexion.execute("RELEASE operation")
+                resultats.append((operation, resultat, None))
+            except Exception as e:
+                connexion.execute("ROLLBACK TO operation")
+                connexion.execute("RELEASE operation")
+                resultats.append((operation, None, e))
+
+        try:
+            connexion.commit()
+        except sqlite3.Error as e:
+            connexion.rollback()
+            for operation, _, _ in resultats:
+                operation.future.set_exception(e)
+            return
+
+        for operation, resultat, erreur in resultats:
+            if erreur is None:
+                operation.future.set_result(resultat)
+            else:
+                operation.future.set_exception(erreur)
+
+    def _retirer_expirees(self, groupe):
+        maintenant = time.monotonic()
+        restantes = []
+        for operation in groupe:
+            if operation.echeance < maintenant:
+                operation.future.set_exception(sqlite3.OperationalError(
+                    "Délai d'écriture dépassé"))
+            else:
+                restantes.append(operation)
+        return restantes
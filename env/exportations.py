@@ -0,0 +1,294 @@
+import base64
+import csv
+import io
+import json
+import operator
+import re
+import zlib
+
+
+# Nombre de lignes lues à la fois dans un curseur SQLite
+TAILLE_LOT = 500
+
+# Taille à partir de laquelle un morceau est envoyé au client (octets)
+TAILLE_TAMPON = 16 * 1024
+
+# Taille maximale d'une page de résultats (paramètre 'limite')
+LIMITE_MAX = 1000
+
+# Encodage JSON d'une valeur lue dans SQLite, selon son type (les
+# autres types passent par json.dumps)
+ENCODEURS_JSON = {
+    str: json.encoder.encode_basestring_ascii,
+    int: int.__repr__,
+    type(None): lambda valeur: "null",
+}
+
+# Caractères interdits en XML 1.0 (caractères de contrôle)
+CARACTERES_INTERDITS_XML = re.compile(
+    "[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def encoder_curseur(ligne):
+    """
+    Encode la clé (date, id_poursuite) d'une contravention en curseur
+    opaque de pagination.
+    """
+    cle = json.dumps([ligne["date"], ligne["id_poursuite"]])
+    return base64.urlsafe_b64encode(cle.encode()).decode()
+
+
+def decoder_curseur(curseur):
+    """
+    Décode un curseur produit par encoder_curseur.
+
+    Returns:
+        tuple: (date, id_poursuite).
+
+    Raises:
+        ValueError: Si le curseur est invalide.
+    """
+    try:
+        date_cle, id_poursuite = json.loads(base64.urlsafe_b64decode(curseur))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Paramètre 'curseur' invalide") from e
+    if not isinstance(id_poursuite, int) \
+            or not isinstance(date_cle, (int, str)):
+        raise ValueError("Paramètre 'curseur' invalide")
+    return date_cle, id_poursuite
+
+
+def lire_pagination(limite, curseur):
+    """
+    Valide les paramètres de pagination d'une liste de contraventions.
+
+    Args:
+        limite (str): Paramètre 'limite' (None s'il est absent).
+        curseur (str): Paramètre 'curseur' (None s'il est absent).
+
+    Returns:
+        tuple: (limite, apres) où limite est un entier ou None et apres
+        la clé (date, id_poursuite) décodée ou None.
+
+    Raises:
+        ValueError: Si un paramètre est invalide.
+    """
+    apres = decoder_curseur(curseur) if curseur else None
+    if limite is not None:
+        if not limite.isdigit() or not 1 <= int(limite) <= LIMITE_MAX:
+            raise ValueError(
+                f"Le paramètre 'limite' doit être entre 1 et {LIMITE_MAX}")
+        limite = int(limite)
+    return limite, apres
+
+
+def lignes_curseur(curseur, taille_lot=TAILLE_LOT):
+    """
+    Parcourt un curseur SQLite par lots avec fetchmany.
+
+    Args:
+        curseur (sqlite3.Cursor): Curseur positionné sur les résultats.
+        taille_lot (int): Nombre de lignes lues à la fois.
+
+    Yields:
+        sqlite3.Row | Contravention: Lignes du curseur.
+    """
+    while True:
+        lignes = curseur.fetchmany(taille_lot)
+        if not lignes:
+            return
+        yield from lignes
+
+
+def encodeur_json(colonnes):
+    """
+    Prépare l'encodage JSON de lignes SQLite en objets dont les clés sont
+    les colonnes, triées comme le fait Flask.
+
+    Le gabarit des clés est calculé une seule fois : pour chaque ligne,
+    seules les valeurs sont encodées, lues par position, sans
+    dictionnaire intermédiaire.
+
+    Args:
+        colonnes (list): Noms des colonnes, dans l'ordre des lignes
+            (curseur.description).
+
+    Returns:
+        callable: Fonction (ligne) -> str, pour un tuple, une
+        Contravention ou un sqlite3.Row.
+    """
+    ordre = sorted(range(len(colonnes)), key=colonnes.__getitem__)
+    gabarit = "{" + ",".join(
+        json.dumps(colonnes[i]).replace("%", "%%") + ":%s" for i in ordre
+    ) + "}"
+    if len(ordre) > 1:
+        extraire = operator.itemgetter(*ordre)
+    else:
+        def extraire(ligne):
+            return [ligne[i] for i in ordre]
+    encodeurs = ENCODEURS_JSON
+
+    def encoder(ligne):
+        # tuple() lit les valeurs sans passer par un __getitem__ redéfini
+        return gabarit % tuple([
+            encodeurs.get(type(valeur), json.dumps)(valeur)
+            for valeur in extraire(tuple(ligne))
+        ])
+    return encoder
+
+
+def flux_json(curseur, taille_lot=TAILLE_LOT):
+    """
+    Produit un tableau JSON par morceaux à partir d'un curseur SQLite,
+    lu par lots avec fetchmany : les lignes ne sont jamais toutes
+    en mémoire. Elles sont encodées directement, sans dictionnaire
+    (voir encodeur_json).
+
+    Args:
+        curseur (sqlite3.Cursor): Curseur positionné sur les résultats.
+        taille_lot (int): Nombre de lignes lues à la fois.
+
+    Yields:
+        bytes: Morceaux du tableau encodés en UTF-8.
+    """
+    encoder = encodeur_json([colonne[0] for colonne in curseur.description])
+    yield b"["
+    separateur = ""
+    while True:
+        lignes = curseur.fetchmany(taille_lot)
+        if not lignes:
+            break
+        yield (separateur + ",".join(map(encoder, lignes))).encode("utf-8")
+        separateur = ","
+    yield b"]"
+
+
+def flux_csv(entetes, lignes, delimiteur=";"):
+    """
+    Produit un fichier CSV par morceaux : csv.writer écrit dans un petit
+    tampon vidé dès qu'il dépasse TAILLE_TAMPON.
+
+    Args:
+        entetes (list): Noms des colonnes.
+        lignes (iterable): Valeurs de chaque ligne.
+        delimiteur (str): Séparateur de colonnes.
+
+    Yields:
+        bytes: Morceaux du fichier encodés en UTF-8.
+    """
+    tampon = io.StringIO()
+    writer = csv.writer(tampon, delimiter=delimiteur)
+    writer.writerow(entetes)
+
+    for ligne in lignes:
+        writer.writerow(ligne)
+        if tampon.tell() >= TAILLE_TAMPON:
+            yield tampon.getvalue().encode("utf-8")
+            tampon.seek(0)
+            tampon.truncate()
+
+    yield tampon.getvalue().encode("utf-8")
+
+
+def echapper_xml(valeur):
+    """
+    Échappe une valeur pour un texte ou un attribut XML.
+
+    Args:
+        valeur: Valeur à écrire (None donne une chaîne vide).
+
+    Returns:
+        str: Texte sûr à placer entre balises ou entre guillemets.
+    """
+    if valeur is None:
+        return ""
+    texte = CARACTERES_INTERDITS_XML.sub("", str(valeur))
+    return (
+        texte.replace("&", "&amp;")
+        .replace("<", "&lt;")
+        .replace(">", "&gt;")
+        .replace('"', "&quot;")
+    )
+
+
+def flux_xml(racine, elements):
+    """
+    Produit un document XML par morceaux, sans construire d'arbre.
+
+    Args:
+        racine (str): Nom de l'élément racine.
+        elements (iterable): Tuples (nom, attributs, contenu) où contenu
+            est un texte ou une liste de tuples (nom, texte) d'enfants.
+
+    Yields:
+        bytes: Morceaux du document encodés en UTF-8.
+    """
+    morceaux = [f"<?xml version='1.0' encoding='utf-8'?>\n<{racine}>"]
+    taille = 0
+
+    for nom, attributs, contenu in elements:
+        attributs_xml = "".join(
+            f' {cle}="{echapper_xml(valeur)}"'
+            for cle, valeur in attributs.items()
+        )
+        if isinstance(contenu, list):
+            contenu = "".join(
+                f"<{enfant}>{echapper_xml(texte)}</{enfant}>"
+                for enfant, texte in contenu
+            )
+        else:
+            contenu = echapper_xml(contenu)
+        morceau = f"<{nom}{attributs_xml}>{contenu}</{nom}>"
+        morceaux.append(morceau)
+        taille += len(morceau)
+
+        if taille >= TAILLE_TAMPON:
+            yield "".join(morceaux).encode("utf-8")
+            morceaux.clear()
+            taille = 0
+
+    morceaux.append(f"</{racine}>")
+    yield "".join(morceaux).encode("utf-8")
+
+
+def compresser_gzip(flux, niveau=6):
+    """
+    Compresse un flux d'octets au format gzip, morceau par morceau.
+
+    Args:
+        flux (iterable): Morceaux d'octets.
+        niveau (int): Niveau de compression zlib (1 à 9).
+
+    Yields:
+        bytes: Morceaux compressés.
+    """
+    compresseur = zlib.compressobj(niveau, zlib.DEFLATED, 31)
+    for morceau in flux:
+        compresse = compresseur.compress(morceau)
+        if compresse:
+            yield compresse
+    yield compresseur.flush()
+
+
+# Encodages de contenu proposés, par ordre de préférence. Un autre
+# compresseur en continu (brotli, par exemple) s'ajoute ici.
+ENCODAGES = {
+    "gzip": compresser_gzip,
+}
+
+
+def choisir_encodage(encodages_acceptes):
+    """
+    Choisit l'encodage de contenu à utiliser pour un client.
+
+    Args:
+        encodages_acceptes (werkzeug.datastructures.Accept): Valeur
+            analysée de l'entête Accept-Encoding.
+
+    Returns:
+        str: Encodage retenu, ou None pour un contenu non compressé.
+    """
+    for encodage in ENCODAGES:
+        if encodages_acceptes[encodage]:
+            return encodage
+    return None
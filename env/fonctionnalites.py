@@ -1,88 +1,427 @@
+import analytique
 import base_de_donnees
-import sqlite3
 import requests
 import csv
-from io import StringIO
+import codecs
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager, nullcontext
 
 
-def A1():
+URL_CONTRAVENTION = (
+    "https://data.montreal.ca/dataset/05a9e718-6810-4e73-8bb9-5955efeb91a0"
+    "/resource/7f939a08-be8a-45e1-b208-d8744dca8fc6/"
+    "download/violations.csv"
+)
+
+# Nombre de lignes envoyées à SQLite par appel à executemany
+TAILLE_LOT = 5000
+
+# Taille des morceaux lus sur le réseau ou sur le disque (octets)
+TAILLE_MORCEAU = 64 * 1024
+
+COLONNES_CONTRAVENTIONS = (
+    "id_poursuite", "business_id", "date", "description",
+    "adresse", "date_jugement", "etablissement",
+    "montant", "proprietaire", "ville",
+    "statut", "date_statut", "categorie"
+)
+
+REQUETE_INSERTION = f"""
+    INSERT INTO contraventions (
+        {", ".join(COLONNES_CONTRAVENTIONS)}
+    ) VALUES ({", ".join("?" * len(COLONNES_CONTRAVENTIONS))})
+    ON CONFLICT(id_poursuite) DO NOTHING
+"""
+
+# Lignes déjà connues : seul un changement de statut donne lieu à une
+# écriture. Les ID absents sous le plafond sont d'abord insérés par
+# REQUETE_INSERTION : les deux requêtes comptent ainsi séparément les
+# insertions et les mises à jour.
+REQUETE_MISE_A_JOUR = f"""
+    INSERT INTO contraventions (
+        {", ".join(COLONNES_CONTRAVENTIONS)}
+    ) VALUES ({", ".join("?" * len(COLONNES_CONTRAVENTIONS))})
+    ON CONFLICT(id_poursuite) DO UPDATE
+       SET statut = excluded.statut,
+           date_statut = excluded.date_statut
+     WHERE contraventions.date_statut IS NOT excluded.date_statut
+"""
+
+
+def convertir_ligne(ligne):
     """
-    Récupère les contraventions depuis une URL, analyse le fichier CSV,
-    et met à jour la table 'contraventions' de la base de données SQLite
-    en évitant les doublons selon l'ID de poursuite.
+    Convertit une ligne du CSV en tuple prêt pour l'insertion.
 
-    Cette fonction télécharge les données de contraventions,
-    vérifie si elles sont déjà présentes
-    dans la base de données, et les insère si elles ne sont pas en doublon.
+    Args:
+        ligne (dict): Ligne lue par csv.DictReader.
 
     Returns:
-        str: Message d'erreur si le téléchargement échoue, sinon rien.
-    """
+        tuple: Valeurs dans l'ordre de COLONNES_CONTRAVENTIONS.
 
-    URL_CONTRAVENTION = (
-        "https://data.montreal.ca/dataset/05a9e718-6810-4e73-8bb9-5955efeb91a0"
-        "/resource/7f939a08-be8a-45e1-b208-d8744dca8fc6/"
-        "download/violations.csv"
+    Raises:
+        KeyError: Si une colonne attendue est absente.
+        ValueError: Si un identifiant n'est pas un entier.
+    """
+    return (
+        int(ligne["id_poursuite"]), int(ligne["business_id"]),
+        ligne["date"], ligne["description"],
+        ligne["adresse"], ligne["date_jugement"], ligne["etablissement"],
+        ligne["montant"], ligne["proprietaire"], ligne["ville"],
+        ligne["statut"], ligne["date_statut"], ligne["categorie"]
     )
 
-    response = requests.get(URL_CONTRAVENTION)
-    response.encoding = "utf-8"
 
-    if response.status_code != 200:
-        return f"Erreur lors du téléchargement du CSV : {response.status_code}"
+def inserer_contraventions(connexion, reader, haut_niveau=None,
+                           taille_lot=TAILLE_LOT):
+    """
+    Insère les lignes du CSV par lots, sans valider la transaction.
 
-    contenu = response.text
-    fichier = StringIO(contenu)
-    reader = csv.DictReader(fichier)
+    Les lignes dont l'id_poursuite dépasse le plafond (haut_niveau) sont
+    nouvelles et insérées directement; les doublons sont écartés par
+    ON CONFLICT, sans requête de vérification préalable. Les autres sont
+    insérées si elles sont absentes, sinon écrites seulement si leur
+    date_statut a changé.
 
-    connexion = sqlite3.connect(base_de_donnees.CHEMIN_BD)
-    curseur = connexion.cursor()
+    Sans plafond (table vide), le chargement se fait en masse : les
+    déclencheurs de la table sont suspendus et l'index plein texte est
+    reconstruit en une passe à la fin, au lieu d'une écriture FTS5 par
+    ligne. La table temporaire 'delta' n'est alors pas alimentée.
 
-    requete_verif = "SELECT COUNT(*) FROM contraventions WHERE id_poursuite=?"
-    requete = """
-    INSERT INTO contraventions (
-        id_poursuite, business_id, date, description,
-        adresse, date_jugement, etablissement,
-        montant, proprietaire, ville,
-        statut, date_statut, categorie
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    Args:
+        connexion (sqlite3.Connection): Connexion à la base.
+        reader (iterable): Lignes du CSV (dictionnaires).
+        haut_niveau (int, optional): Plus grand id_poursuite déjà en
+            base, None si la table est vide.
+        taille_lot (int): Nombre de lignes par appel à executemany.
+
+    Returns:
+        dict: Nombre de lignes insérées, mises à jour, ignorées
+        et rejetées.
     """
+    rapport = {"inseres": 0, "mis_a_jour": 0, "ignores": 0, "rejetes": 0}
+    curseur = connexion.cursor()
+    nouvelles = []
+    anciennes = []
 
-    num_ligne = 0
-    for i in reader:
-        id_poursuite = int(i["id_poursuite"])
+    def vider_nouvelles():
+        curseur.executemany(REQUETE_INSERTION, nouvelles)
+        rapport["inseres"] += curseur.rowcount
+        rapport["ignores"] += len(nouvelles) - curseur.rowcount
+        nouvelles.clear()
 
-        curseur.execute(requete_verif, (id_poursuite,))
-        if curseur.fetchone()[0] == 0:
+    def vider_anciennes():
+        # Une ligne insérée ici a déjà sa date_statut : la mise à jour
+        # qui suit ne la compte pas
+        curseur.executemany(REQUETE_INSERTION, anciennes)
+        inseres = curseur.rowcount
+        curseur.executemany(REQUETE_MISE_A_JOUR, anciennes)
+        rapport["inseres"] += inseres
+        rapport["mis_a_jour"] += curseur.rowcount
+        rapport["ignores"] += len(anciennes) - inseres - curseur.rowcount
+        anciennes.clear()
+
+    en_masse = haut_niveau is None
+    with (base_de_donnees.declencheurs_suspendus(connexion, "contraventions")
+          if en_masse else nullcontext()):
+        for num_ligne, ligne in enumerate(reader, start=1):
             try:
-                id_poursuite = int(i["id_poursuite"])
-                business_id = int(i["business_id"])
-                date = i["date"]
-                description = i["description"]
-                adresse = i["adresse"]
-                date_jugement = i["date_jugement"]
-                etablissement = i["etablissement"]
-                montant = i["montant"]
-                proprietaire = i["proprietaire"]
-                ville = i["ville"]
-                statut = i["statut"]
-                date_statut = i["date_statut"]
-                categorie = i["categorie"]
-
-                curseur.execute(
-                    requete,
-                    (
-                        id_poursuite, business_id, date, description,
-                        adresse, date_jugement, etablissement, montant,
-                        proprietaire, ville, statut, date_statut, categorie
-                    )
-                )
-                num_ligne += 1
-
-            except Exception as e:
-                print(f"""Erreur lors de l'insertion
-                       de la ligne suivante : {num_ligne}""")
-                print("Erreur :", e)
-
-    connexion.commit()
-    connexion.close()
+                valeurs = convertir_ligne(ligne)
+            except (KeyError, TypeError, ValueError) as e:
+                rapport["rejetes"] += 1
+                print(f"Ligne {num_ligne} rejetée : {e}")
+                continue
+
+            if en_masse or valeurs[0] > haut_niveau:
+                nouvelles.append(valeurs)
+                if len(nouvelles) >= taille_lot:
+                    vider_nouvelles()
+            else:
+                anciennes.append(valeurs)
+                if len(anciennes) >= taille_lot:
+                    vider_anciennes()
+
+        if nouvelles:
+            vider_nouvelles()
+        if anciennes:
+            vider_anciennes()
+
+    if en_masse:
+        connexion.execute("""
+            INSERT INTO contraventions_fts (contraventions_fts)
+            VALUES ('rebuild')
+        """)
+
+    return rapport
+
+
+def suivre_changements(connexion):
+    """
+    Prépare la table temporaire 'delta', qui reçoit par déclencheurs
+    l'id_poursuite de chaque contravention insérée ('nouvelle') ou dont
+    le statut change ('statut') sur cette connexion.
+
+    Args:
+        connexion (sqlite3.Connection): Connexion utilisée par A1.
+    """
+    connexion.executescript("""
+        CREATE TEMP TABLE IF NOT EXISTS delta (
+            id_poursuite INTEGER PRIMARY KEY,
+            nature TEXT NOT NULL
+        );
+        CREATE TEMP TRIGGER IF NOT EXISTS delta_ai
+        AFTER INSERT ON main.contraventions BEGIN
+            INSERT OR IGNORE INTO delta
+            VALUES (new.id_poursuite, 'nouvelle');
+        END;
+        CREATE TEMP TRIGGER IF NOT EXISTS delta_au
+        AFTER UPDATE OF date_statut ON main.contraventions BEGIN
+            INSERT OR IGNORE INTO delta
+            VALUES (new.id_poursuite, 'statut');
+        END;
+    """)
+
+
+def diffuser_notifications(connexion):
+    """
+    Crée, pour chaque utilisateur qui surveille l'établissement concerné,
+    une notification par contravention de la table temporaire 'delta'
+    (sans valider la transaction).
+
+    Une seule requête ensembliste joint le delta aux listes de
+    surveillance (index sur surveillances.business_id), quel que soit le
+    nombre d'utilisateurs.
+
+    Args:
+        connexion (sqlite3.Connection): Connexion utilisée par A1.
+
+    Returns:
+        int: Nombre de notifications créées.
+    """
+    curseur = connexion.execute("""
+        INSERT INTO notifications (
+            username, business_id, id_poursuite, nature
+        )
+        SELECT surveillances.username, contraventions.business_id,
+               delta.id_poursuite, delta.nature
+          FROM temp.delta
+          JOIN contraventions USING (id_poursuite)
+          JOIN surveillances
+            ON surveillances.business_id = contraventions.business_id
+    """)
+    return curseur.rowcount
+
+
+def lire_metadonnees(connexion):
+    """
+    Lit les métadonnées de la dernière importation.
+
+    Returns:
+        dict: Valeurs par clé (etag, last_modified, empreinte...).
+    """
+    curseur = connexion.execute("SELECT cle, valeur FROM metadonnees")
+    return dict(curseur.fetchall())
+
+
+def ecrire_metadonnees(connexion, valeurs):
+    """
+    Enregistre des métadonnées d'importation (sans valider la transaction).
+
+    Args:
+        connexion (sqlite3.Connection): Connexion à la base.
+        valeurs (dict): Valeurs par clé; None efface la clé.
+    """
+    connexion.executemany(
+        "DELETE FROM metadonnees WHERE cle = ?",
+        [(cle,) for cle, valeur in valeurs.items() if valeur is None]
+    )
+    connexion.executemany("""
+        INSERT INTO metadonnees (cle, valeur) VALUES (?, ?)
+        ON CONFLICT(cle) DO UPDATE SET valeur = excluded.valeur
+    """, [(cle, valeur) for cle, valeur in valeurs.items()
+          if valeur is not None])
+
+
+def lignes_decodees(morceaux, encodage="utf-8-sig"):
+    """
+    Décode des morceaux d'octets au fil de l'eau et produit des lignes.
+
+    Le décodage est incrémental : un caractère UTF-8 coupé entre deux
+    morceaux est reconstitué. Seul '\\n' sert de séparateur et il est
+    conservé, afin que csv.DictReader gère les champs entre guillemets
+    qui contiennent des retours à la ligne.
+
+    Args:
+        morceaux (iterable): Morceaux d'octets (réseau ou fichier).
+        encodage (str): Encodage du fichier ('utf-8-sig' retire le BOM).
+
+    Yields:
+        str: Lignes du fichier, terminées par '\\n' sauf la dernière.
+    """
+    decodeur = codecs.getincrementaldecoder(encodage)()
+    reste = ""
+    for morceau in morceaux:
+        lignes = (reste + decodeur.decode(morceau)).split("\n")
+        reste = lignes.pop()
+        for ligne in lignes:
+            yield ligne + "\n"
+    reste += decodeur.decode(b"", final=True)
+    if reste:
+        yield reste
+
+
+@contextmanager
+def ouvrir_source(source=None, metadonnees=None):
+    """
+    Ouvre la source du CSV des contraventions en lecture en continu.
+
+    Pour une URL, les validateurs de la dernière importation (ETag,
+    Last-Modified) sont envoyés afin que le serveur réponde 304 si le
+    fichier n'a pas été republié.
+
+    Args:
+        source (str | os.PathLike | file, optional): URL HTTP(S), chemin
+            d'un fichier local ou objet fichier (texte ou binaire).
+            Par défaut, l'URL des données ouvertes de la Ville.
+        metadonnees (dict, optional): Métadonnées de la dernière
+            importation (voir lire_metadonnees).
+
+    Yields:
+        tuple: (morceaux d'octets ou None si non modifié, validateurs
+        HTTP à conserver pour la prochaine importation).
+
+    Raises:
+        requests.HTTPError: Si le serveur ne répond ni 200 ni 304.
+    """
+    if source is None:
+        source = URL_CONTRAVENTION
+    metadonnees = metadonnees or {}
+
+    if isinstance(source, str) and source.startswith(("http://", "https://")):
+        entetes = {}
+        if metadonnees.get("etag"):
+            entetes["If-None-Match"] = metadonnees["etag"]
+        if metadonnees.get("last_modified"):
+            entetes["If-Modified-Since"] = metadonnees["last_modified"]
+
+        with requests.get(source, headers=entetes, stream=True) as response:
+            validateurs = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+            if response.status_code == 304:
+                yield None, validateurs
+            elif response.status_code != 200:
+                raise requests.HTTPError(
+                    response.status_code, response=response)
+            else:
+                yield (response.iter_content(chunk_size=TAILLE_MORCEAU),
+                       validateurs)
+
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fichier:
+            yield iter(lambda: fichier.read(TAILLE_MORCEAU), b""), {}
+
+    elif isinstance(source.read(0), str):
+        yield iter(
+            lambda: source.read(TAILLE_MORCEAU).encode("utf-8"), b""), {}
+
+    else:
+        yield iter(lambda: source.read(TAILLE_MORCEAU), b""), {}
+
+
+def A1(source=None):
+    """
+    Récupère les contraventions depuis une URL, analyse le fichier CSV,
+    et met à jour la table 'contraventions' de la base de données SQLite
+    en évitant les doublons selon l'ID de poursuite.
+
+    L'importation est conditionnelle : une réponse 304 ou un fichier dont
+    l'empreinte SHA-256 est identique à celle de la dernière importation
+    termine la fonction sans analyser le CSV. Sinon, le fichier est copié
+    sur disque en continu, puis analysé et inséré par lots dans une seule
+    transaction; seules les lignes nouvelles ou dont la date_statut a
+    changé sont écrites. Dans la même transaction, les statistiques et
+    les fiches des établissements touchés sont recalculées, les
+    utilisateurs qui les surveillent sont notifiés et la version des
+    données (qui invalide les caches des réponses) est incrémentée.
+    ANALYZE met enfin à jour les statistiques du planificateur, puis
+    l'instantané des colonnes (voir analytique.ecrire_instantane) est
+    remplacé. La mémoire utilisée par l'importation ne dépend pas de la
+    taille du fichier.
+
+    Args:
+        source (str | os.PathLike | file, optional): URL, fichier local ou
+            objet fichier à importer (voir ouvrir_source).
+
+    Returns:
+        dict | str: Rapport {"inchange", "octets", "inseres", "mis_a_jour",
+        "ignores", "rejetes", "notifications"} ou message d'erreur si le
+        téléchargement échoue (statut HTTP ou erreur réseau).
+    """
+    rapport = {"inchange": True, "octets": 0, "inseres": 0,
+               "mis_a_jour": 0, "ignores": 0, "rejetes": 0,
+               "notifications": 0}
+
+    connexion = base_de_donnees.ouvrir_connexion()
+    try:
+        base_de_donnees.migrer_schema(connexion)
+        suivre_changements(connexion)
+        metadonnees = lire_metadonnees(connexion)
+
+        with ouvrir_source(source, metadonnees) as (morceaux, validateurs), \
+                tempfile.TemporaryFile() as copie:
+            if morceaux is None:
+                return rapport
+
+            empreinte = hashlib.sha256()
+            for morceau in morceaux:
+                empreinte.update(morceau)
+                copie.write(morceau)
+                rapport["octets"] += len(morceau)
+            validateurs["empreinte"] = empreinte.hexdigest()
+
+            with connexion:
+                if validateurs["empreinte"] != metadonnees.get("empreinte"):
+                    copie.seek(0)
+                    lignes = lignes_decodees(
+                        iter(lambda: copie.read(TAILLE_MORCEAU), b""))
+                    haut_niveau = connexion.execute(
+                        "SELECT MAX(id_poursuite) FROM contraventions"
+                    ).fetchone()[0]
+                    rapport.update(inserer_contraventions(
+                        connexion, csv.DictReader(lignes), haut_niveau))
+                    rapport["inchange"] = False
+                    # Un chargement en masse n'alimente pas 'delta' : tout
+                    # est recalculé
+                    delta = haut_niveau is not None
+                    base_de_donnees.reconstruire_statistiques(
+                        connexion, delta=delta)
+                    base_de_donnees.reconstruire_etablissements(
+                        connexion, delta=delta)
+                    rapport["notifications"] = diffuser_notifications(
+                        connexion)
+                    connexion.execute("""
+                        INSERT INTO metadonnees (cle, valeur)
+                        VALUES ('version_donnees', 1)
+                        ON CONFLICT(cle) DO UPDATE SET valeur = valeur + 1
+                    """)
+                ecrire_metadonnees(connexion, validateurs)
+
+            # Statistiques du planificateur à jour pour les nouveaux index
+            if not rapport["inchange"]:
+                connexion.execute("ANALYZE contraventions")
+    except requests.HTTPError as e:
+        return f"Erreur lors du téléchargement du CSV : {e.args[0]}"
+    except requests.RequestException as e:
+        return f"Erreur réseau lors du téléchargement du CSV : {e}"
+    finally:
+        connexion.close()
+
+    # Instantané des colonnes, projeté en mémoire par l'application
+    if not rapport["inchange"] or not os.path.exists(
+            analytique.chemin_instantane()):
+        analytique.ecrire_instantane()
+
+    return rapport
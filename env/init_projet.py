@@ -5,7 +5,8 @@ import fonctionnalites
 if __name__ == '__main__':
     print("Initialisation de la base de données")
     try:
-        fonctionnalites.A1()
+        rapport = fonctionnalites.A1()
         print("Téléchargement réussie.")
+        print(rapport)
     except Exception as e:
         print("Une erreur est survenue lors de l'importation : ", e)
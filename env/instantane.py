@@ -0,0 +1,203 @@
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+
+# Fichier binaire en lecture seule, projeté en mémoire (mmap) par chaque
+# processus : les pages sont partagées par le cache du système au lieu
+# d'être recopiées dans des objets Python propres à chaque processus.
+#
+# Format (petit-boutiste) :
+#   entête   : MAGIQUE, FORMAT, nombre de sections, version des données
+#   sections : nom, type NumPy, position et nombre d'éléments
+#   données  : tableaux de taille fixe, alignés sur ALIGNEMENT octets
+# Une table de chaînes 'nom' est stockée en deux sections : 'nom.pos'
+# (positions de début, plus la fin) et 'nom.utf8' (octets UTF-8).
+
+MAGIQUE = b"CONTRAVI"
+FORMAT = 1
+
+ENTETE = struct.Struct("<8sII32s")
+SECTION = struct.Struct("<32s8sQQ")
+
+ALIGNEMENT = 64
+
+
+class Chaines:
+    """
+    Table de chaînes d'un instantané, décodées à la demande.
+
+    S'utilise comme une liste en lecture seule (len, indice, itération).
+    """
+
+    __slots__ = ("_positions", "_octets")
+
+    def __init__(self, positions, octets):
+        self._positions = positions
+        self._octets = octets
+
+    def __len__(self):
+        return len(self._positions) - 1
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("Indice hors de la table de chaînes")
+        debut = int(self._positions[indice])
+        fin = int(self._positions[indice + 1])
+        return self._octets[debut:fin].tobytes().decode("utf-8")
+
+    def __iter__(self):
+        positions = self._positions.tolist()
+        octets = self._octets
+        for debut, fin in zip(positions, positions[1:]):
+            yield octets[debut:fin].tobytes().decode("utf-8")
+
+
+def _sections_chaines(nom, valeurs):
+    encodees = [valeur.encode("utf-8") for valeur in valeurs]
+    positions = np.zeros(len(encodees) + 1, dtype="<u8")
+    if encodees:
+        np.cumsum([len(valeur) for valeur in encodees], out=positions[1:])
+    return [
+        (f"{nom}.pos", positions),
+        (f"{nom}.utf8", np.frombuffer(b"".join(encodees), dtype="u1")),
+    ]
+
+
+def ecrire(chemin, version, tableaux, chaines):
+    """
+    Écrit un instantané, puis le met en place par un renommage atomique :
+    un processus qui lit l'ancien fichier le garde intact.
+
+    Args:
+        chemin (str): Fichier de l'instantané.
+        version (str): Version des données (voir
+            Database.version_donnees).
+        tableaux (dict): Tableaux NumPy à une dimension, par nom.
+        chaines (dict): Listes de chaînes, par nom.
+
+    Raises:
+        OSError: Si le fichier ne peut pas être écrit.
+        ValueError: Si un nom dépasse 32 octets ou qu'un tableau n'est
+            pas à une dimension.
+    """
+    sections = [
+        (nom, np.ascontiguousarray(tableau))
+        for nom, tableau in tableaux.items()
+    ]
+    for nom, valeurs in chaines.items():
+        sections.extend(_sections_chaines(nom, valeurs))
+
+    for nom, tableau in sections:
+        if len(nom.encode("utf-8")) > 32 or tableau.ndim != 1:
+            raise ValueError(f"Section invalide : {nom}")
+
+    position = ENTETE.size + SECTION.size * len(sections)
+    descriptions = []
+    for nom, tableau in sections:
+        position += -position % ALIGNEMENT
+        descriptions.append(SECTION.pack(
+            nom.encode("utf-8"), tableau.dtype.newbyteorder("<").str.encode(),
+            position, len(tableau)))
+        position += tableau.nbytes
+
+    dossier = os.path.dirname(os.path.abspath(chemin))
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier, suffix=".tmp")
+    try:
+        with os.fdopen(descripteur, "wb") as fichier:
+            fichier.write(ENTETE.pack(
+                MAGIQUE, FORMAT, len(sections), str(version).encode("utf-8")))
+            for description in descriptions:
+                fichier.write(description)
+            for nom, tableau in sections:
+                fichier.write(b"\0" * (-fichier.tell() % ALIGNEMENT))
+                fichier.write(tableau.astype(
+                    tableau.dtype.newbyteorder("<"), copy=False).tobytes())
+            fichier.flush()
+            os.fsync(fichier.fileno())
+        os.replace(temporaire, chemin)
+    except BaseException:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+
+
+class Instantane:
+    """
+    Instantané ouvert en lecture : ses tableaux sont des vues NumPy
+    (np.frombuffer) sur la projection du fichier, sans copie.
+
+    La projection reste valide si le fichier est remplacé : elle est
+    libérée quand plus aucun tableau ne l'utilise.
+    """
+
+    def __init__(self, chemin):
+        """
+        Args:
+            chemin (str): Fichier de l'instantané.
+
+        Raises:
+            OSError: Si le fichier ne peut pas être lu.
+            ValueError: Si ce n'est pas un instantané de ce format.
+        """
+        with open(chemin, "rb") as fichier:
+            self._projection = mmap.mmap(
+                fichier.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._projection) < ENTETE.size:
+            raise ValueError("Instantané tronqué")
+        magique, format_, nombre, version = ENTETE.unpack_from(
+            self._projection)
+        if magique != MAGIQUE or format_ != FORMAT:
+            raise ValueError("Format d'instantané non reconnu")
+        self.version = version.rstrip(b"\0").decode("utf-8")
+
+        self._sections = {}
+        for i in range(nombre):
+            nom, type_numpy, position, taille = SECTION.unpack_from(
+                self._projection, ENTETE.size + i * SECTION.size)
+            type_numpy = np.dtype(type_numpy.rstrip(b"\0").decode())
+            if position + taille * type_numpy.itemsize > len(
+                    self._projection):
+                raise ValueError("Instantané tronqué")
+            self._sections[nom.rstrip(b"\0").decode("utf-8")] = (
+                type_numpy, position, taille)
+
+    def tableau(self, nom):
+        """
+        Renvoie un tableau de l'instantané.
+
+        Args:
+            nom (str): Nom de la section.
+
+        Returns:
+            numpy.ndarray: Vue en lecture seule sur le fichier.
+
+        Raises:
+            KeyError: Si la section n'existe pas.
+        """
+        type_numpy, position, taille = self._sections[nom]
+        if taille == 0:
+            return np.empty(0, dtype=type_numpy)
+        return np.frombuffer(self._projection, dtype=type_numpy,
+                             count=taille, offset=position)
+
+    def chaines(self, nom):
+        """
+        Renvoie une table de chaînes de l'instantané.
+
+        Args:
+            nom (str): Nom de la table.
+
+        Returns:
+            Chaines: Chaînes décodées à la demande.
+        """
+        return Chaines(self.tableau(f"{nom}.pos"),
+                       self.tableau(f"{nom}.utf8"))
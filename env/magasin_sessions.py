@@ -0,0 +1,227 @@
+import base_de_donnees
+import threading
+import time
+from collections import OrderedDict
+
+
+# Durée de vie d'une session sans activité (secondes)
+DUREE_INACTIVITE = 14 * 24 * 3600
+
+# Durée de vie maximale d'une session, même active (secondes)
+DUREE_MAX = 30 * 24 * 3600
+
+# Nombre de sessions conservées en mémoire
+TAILLE_MEMOIRE = 10000
+
+# Délai après lequel une session en mémoire est revérifiée dans la base
+# (déconnexion depuis un autre processus, purge) (secondes)
+DELAI_VERIFICATION = 60
+
+# Intervalle entre deux passages du fil de purge (secondes)
+INTERVALLE_PURGE = 300
+
+# Nombre de sessions supprimées par transaction lors d'une purge
+TAILLE_LOT_PURGE = 500
+
+
+class MagasinSessions:
+    """
+    Sessions de connexion (table 'sessions') avec un niveau LRU en
+    mémoire.
+
+    Une session valide est servie depuis la mémoire; elle n'est relue
+    dans la base qu'après DELAI_VERIFICATION. La dernière activité est
+    retenue en mémoire et écrite par lots par le fil de purge, qui
+    supprime aussi les sessions expirées : une requête protégée ne
+    provoque donc aucune écriture.
+    """
+
+    def __init__(self, pool, ecrivain=None,
+                 duree_inactivite=DUREE_INACTIVITE, duree_max=DUREE_MAX,
+                 taille_memoire=TAILLE_MEMOIRE):
+        self.pool = pool
+        self.ecrivain = ecrivain
+        self.duree_inactivite = duree_inactivite
+        self.duree_max = duree_max
+        self.taille_memoire = taille_memoire
+        # id_session -> [username, cree_le, vu_le, verifie_le]
+        self._memoire = OrderedDict()
+        # id_session -> vu_le à écrire dans la base
+        self._activites = {}
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        self._fil = None
+
+    def creer(self, identifiant_session, nom_utilisateur):
+        """
+        Enregistre une nouvelle session.
+
+        Args:
+            identifiant_session (str): L'ID de la session.
+            nom_utilisateur (str): Le nom d'utilisateur.
+
+        Returns:
+            bool: True si la session a été enregistrée.
+        """
+        self.demarrer()
+        maintenant = int(time.time())
+        db = base_de_donnees.Database(self.pool, self.ecrivain)
+        try:
+            if not db.ajouter_session(identifiant_session, nom_utilisateur,
+                                      maintenant):
+                return False
+        finally:
+            db.deconnecter()
+
+        with self._verrou:
+            self._memoriser(identifiant_session, [
+                nom_utilisateur, maintenant, maintenant, maintenant
+            ])
+        return True
+
+    def valider(self, identifiant_session, nom_utilisateur):
+        """
+        Vérifie qu'une session existe, appartient à l'utilisateur et n'a
+        pas expiré, puis note son activité.
+
+        Args:
+            identifiant_session (str): L'ID de la session (cookie).
+            nom_utilisateur (str): Le nom d'utilisateur du cookie.
+
+        Returns:
+            bool: True si la session est valide.
+        """
+        if not identifiant_session:
+            return False
+        self.demarrer()
+        maintenant = int(time.time())
+
+        with self._verrou:
+            entree = self._memoire.get(identifiant_session)
+            if entree is not None:
+                self._memoire.move_to_end(identifiant_session)
+
+        if entree is None or maintenant - entree[3] >= DELAI_VERIFICATION:
+            entree = self._charger(identifiant_session, maintenant)
+            if entree is None:
+                return False
+
+        if entree[0] != nom_utilisateur or self._expiree(entree, maintenant):
+            self.supprimer(identifiant_session)
+            return False
+
+        with self._verrou:
+            entree[2] = maintenant
+            self._activites[identifiant_session] = maintenant
+        return True
+
+    def supprimer(self, identifiant_session):
+        """
+        Supprime une session (déconnexion ou expiration).
+
+        Args:
+            identifiant_session (str): L'ID de la session.
+        """
+        with self._verrou:
+            self._memoire.pop(identifiant_session, None)
+            self._activites.pop(identifiant_session, None)
+
+        db = base_de_donnees.Database(self.pool, self.ecrivain)
+        try:
+            db.supprimer_session(identifiant_session)
+        finally:
+            db.deconnecter()
+
+    def purger(self):
+        """
+        Écrit les activités en attente puis supprime, par lots, les
+        sessions inactives depuis plus de duree_inactivite.
+
+        Returns:
+            int: Nombre de sessions supprimées de la base.
+        """
+        maintenant = int(time.time())
+        with self._verrou:
+            activites = [(vu_le, identifiant) for identifiant, vu_le
+                         in self._activites.items()]
+            self._activites.clear()
+            for identifiant in [
+                identifiant for identifiant, entree in self._memoire.items()
+                if self._expiree(entree, maintenant)
+            ]:
+                del self._memoire[identifiant]
+
+        db = base_de_donnees.Database(self.pool, self.ecrivain)
+        try:
+            if activites:
+                db.toucher_sessions(activites)
+            return db.purger_sessions(
+                maintenant - self.duree_inactivite, TAILLE_LOT_PURGE)
+        finally:
+            db.deconnecter()
+
+    def demarrer(self, intervalle=INTERVALLE_PURGE):
+        """
+        Démarre le fil de purge, s'il ne tourne pas déjà.
+
+        Args:
+            intervalle (float): Délai entre deux purges (secondes).
+        """
+        if self._fil is not None:
+            return
+        with self._verrou:
+            if self._fil is not None:
+                return
+            self._arret.clear()
+            self._fil = threading.Thread(
+                target=self._boucle, args=(intervalle,),
+                name="purge-sessions", daemon=True
+            )
+            self._fil.start()
+
+    def arreter(self):
+        """
+        Arrête le fil de purge après une dernière écriture des activités.
+        """
+        fil = self._fil
+        if fil is None:
+            return
+        self._arret.set()
+        fil.join()
+        self._fil = None
+
+    def _boucle(self, intervalle):
+        while not self._arret.wait(intervalle):
+            try:
+                self.purger()
+            except Exception as e:
+                print(f"Erreur lors de la purge des sessions : {e}")
+        self.purger()
+
+    def _charger(self, identifiant_session, maintenant):
+        db = base_de_donnees.Database(self.pool, self.ecrivain)
+        try:
+            ligne = db.obtenir_session(identifiant_session)
+        finally:
+            db.deconnecter()
+
+        with self._verrou:
+            if ligne is None:
+                self._memoire.pop(identifiant_session, None)
+                self._activites.pop(identifiant_session, None)
+                return None
+            vu_le = max(ligne["vu_le"],
+                        self._activites.get(identifiant_session, 0))
+            entree = [ligne["username"], ligne["cree_le"], vu_le, maintenant]
+            self._memoriser(identifiant_session, entree)
+            return entree
+
+    def _expiree(self, entree, maintenant):
+        return (maintenant - entree[2] > self.duree_inactivite
+                or maintenant - entree[1] > self.duree_max)
+
+    def _memoriser(self, identifiant_session, entree):
+        self._memoire[identifiant_session] = entree
+        self._memoire.move_to_end(identifiant_session)
+        while len(self._memoire) > self.taille_memoire:
+            self._memoire.popitem(last=False)
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+
+# Mesures actives (METRIQUES=0 dans l'environnement pour les couper)
+ACTIVES = os.getenv("METRIQUES", "1") != "0"
+
+# Seuil (ms) au-delà duquel un appel à Database est journalisé avec le
+# plan de sa dernière requête SQL (SEUIL_REQUETE_LENTE_MS, 0 = jamais)
+SEUIL_LENT = float(os.getenv("SEUIL_REQUETE_LENTE_MS", "0")) / 1000
+
+# Bornes supérieures (secondes) des intervalles des histogrammes
+BORNES = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogramme:
+    """
+    Histogramme à intervalles fixes (BORNES) et son total.
+
+    Les compteurs sont de simples entiers incrémentés sans verrou : sous
+    forte concurrence, une observation peut très rarement se perdre, ce
+    qui est acceptable pour des mesures.
+    """
+
+    __slots__ = ("compteurs", "somme")
+
+    def __init__(self):
+        self.compteurs = [0] * (len(BORNES) + 1)
+        self.somme = 0.0
+
+    def observer(self, valeur):
+        self.compteurs[bisect_left(BORNES, valeur)] += 1
+        self.somme += valeur
+
+
+class Registre:
+    """
+    Histogrammes de durées et compteurs, indexés par (nom, étiquettes).
+    """
+
+    def __init__(self):
+        self.histogrammes = {}
+        self.compteurs = {}
+        self._verrou = threading.Lock()
+
+    @staticmethod
+    def cle(nom, **etiquettes):
+        """
+        Renvoie la clé d'une mesure, à calculer une fois pour toutes
+        sur les chemins fréquents (voir ajouter).
+
+        Returns:
+            tuple: (nom, étiquettes triées).
+        """
+        return (nom, tuple(sorted(etiquettes.items())))
+
+    def histogramme(self, nom, **etiquettes):
+        """
+        Renvoie l'histogramme d'un nom et d'étiquettes, créé au besoin.
+
+        Returns:
+            Histogramme: Histogramme à alimenter.
+        """
+        cle = self.cle(nom, **etiquettes)
+        histogramme = self.histogrammes.get(cle)
+        if histogramme is None:
+            with self._verrou:
+                histogramme = self.histogrammes.setdefault(cle, Histogramme())
+        return histogramme
+
+    def incrementer(self, nom, valeur=1, **etiquettes):
+        """
+        Ajoute une valeur à un compteur.
+        """
+        self.ajouter(self.cle(nom, **etiquettes), valeur)
+
+    def ajouter(self, cle, valeur=1):
+        """
+        Ajoute une valeur au compteur d'une clé déjà calculée (voir cle).
+        """
+        self.compteurs[cle] = self.compteurs.get(cle, 0) + valeur
+
+    def exporter(self, jauges=()):
+        """
+        Produit les mesures au format texte de Prometheus.
+
+        Args:
+            jauges (iterable): Tuples (nom, étiquettes, valeur) de valeurs
+                instantanées à ajouter.
+
+        Returns:
+            str: Texte de l'exposition.
+        """
+        lignes = []
+        vus = set()
+
+        def type_metrique(nom, genre):
+            if nom not in vus:
+                vus.add(nom)
+                lignes.append(f"# TYPE {nom} {genre}")
+
+        for (nom, etiquettes), histogramme in sorted(
+                self.histogrammes.items()):
+            if not any(histogramme.compteurs):
+                continue
+            type_metrique(nom, "histogram")
+            cumul = 0
+            for borne, compte in zip(
+                    BORNES + ("+Inf",), list(histogramme.compteurs)):
+                cumul += compte
+                lignes.append(
+                    f"{nom}_bucket"
+                    f"{_etiquettes(etiquettes + (('le', borne),))} {cumul}")
+            lignes.append(
+                f"{nom}_sum{_etiquettes(etiquettes)} {histogramme.somme}")
+            lignes.append(f"{nom}_count{_etiquettes(etiquettes)} {cumul}")
+
+        for (nom, etiquettes), valeur in sorted(self.compteurs.items()):
+            type_metrique(nom, "counter")
+            lignes.append(f"{nom}{_etiquettes(etiquettes)} {valeur}")
+
+        for nom, etiquettes, valeur in jauges:
+            type_metrique(nom, "gauge")
+            lignes.append(
+                f"{nom}{_etiquettes(tuple(sorted(etiquettes.items())))} "
+                f"{valeur}")
+
+        return "\n".join(lignes) + "\n"
+
+
+def _etiquettes(etiquettes):
+    if not etiquettes:
+        return ""
+    texte = ",".join(
+        f'{cle}="{_echapper(valeur)}"' for cle, valeur in etiquettes)
+    return "{" + texte + "}"
+
+
+def _echapper(valeur):
+    return (str(valeur).replace("\\", "\\\\")
+            .replace('"', '\\"').replace("\n", "\\n"))
+
+
+registre = Registre()
+
+
+def mesurer_methode(fonction):
+    """
+    Décorateur d'une méthode de Database : durée de l'appel dans
+    db_duree_secondes et nombre de lignes renvoyées (listes) dans
+    db_lignes_total. Si SEUIL_LENT est atteint, l'appel est journalisé
+    avec le plan (EXPLAIN QUERY PLAN) de sa dernière requête SQL.
+    """
+    if not ACTIVES:
+        return fonction
+    # Histogramme et clé du compteur résolus une fois, à la décoration
+    observer = registre.histogramme(
+        "db_duree_secondes", methode=fonction.__name__).observer
+    cle_lignes = registre.cle("db_lignes_total", methode=fonction.__name__)
+    horloge = time.perf_counter
+
+    @wraps(fonction)
+    def wrapper(self, *args, **kwargs):
+        debut = horloge()
+        resultat = fonction(self, *args, **kwargs)
+        duree = horloge() - debut
+        observer(duree)
+        if type(resultat) is list:
+            registre.ajouter(cle_lignes, len(resultat))
+        if SEUIL_LENT and duree >= SEUIL_LENT:
+            journaliser_lente(fonction.__name__, duree, self.connexion)
+        return resultat
+    return wrapper
+
+
+def instrumenter(classe):
+    """
+    Décorateur de classe : applique mesurer_methode à chaque méthode
+    publique.
+    """
+    for nom, valeur in list(vars(classe).items()):
+        if callable(valeur) and not nom.startswith("_"):
+            setattr(classe, nom, mesurer_methode(valeur))
+    return classe
+
+
+# Dernière requête SQL exécutée par chaque fil (voir tracer)
+_trace = threading.local()
+
+
+def tracer(requete):
+    """
+    Rappel de sqlite3.Connection.set_trace_callback : retient la
+    dernière requête du fil courant pour journaliser_lente.
+    """
+    _trace.derniere = requete
+
+
+def journaliser_lente(nom, duree, connexion):
+    """
+    Affiche un appel lent et le plan de sa dernière requête SQL.
+
+    Args:
+        nom (str): Méthode de Database.
+        duree (float): Durée de l'appel (secondes).
+        connexion (sqlite3.Connection): Connexion utilisée.
+    """
+    requete = getattr(_trace, "derniere", None)
+    print(f"Requête lente ({duree * 1000:.1f} ms) dans {nom} : {requete}")
+    if connexion is None or not requete \
+            or not requete.lstrip().upper().startswith(("SELECT", "WITH")):
+        return
+    try:
+        connexion.set_trace_callback(None)
+        for ligne in connexion.execute(f"EXPLAIN QUERY PLAN {requete}"):
+            print("   ", ligne[-1])
+    except Exception as e:
+        print("    Plan indisponible :", e)
+    finally:
+        connexion.set_trace_callback(tracer)
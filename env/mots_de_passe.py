@@ -0,0 +1,224 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent import futures
+
+
+# Coût de scrypt (N, r, p) : N double le temps et la mémoire par hachage
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# Itérations de PBKDF2-SHA256 (si scrypt n'est pas disponible)
+PBKDF2_ITERATIONS = 600000
+
+# Fils de calcul des hachages et nombre maximal de calculs en attente
+TRAVAILLEURS = 4
+FILE_MAX = 32
+
+# Attente maximale d'un hachage (secondes)
+DELAI_HACHAGE = 10
+
+
+class ServiceSature(RuntimeError):
+    """
+    Levée quand trop de hachages sont déjà en attente.
+    """
+
+
+class ServiceMotsDePasse:
+    """
+    Hachage et vérification des mots de passe (scrypt, ou PBKDF2-SHA256
+    si l'OpenSSL de Python n'offre pas scrypt).
+
+    Les calculs, volontairement coûteux, sont faits dans un groupe borné
+    de fils : au-delà de FILE_MAX calculs en attente, les demandes sont
+    refusées (ServiceSature) au lieu d'occuper les fils du serveur web.
+
+    Le hachage est enregistré avec son algorithme et son coût, par
+    exemple 'scrypt$16384$8$1$<hex>'; le salt reste dans sa colonne.
+    Les anciens hachages SHA-512 (hexadécimaux, sans '$') sont encore
+    acceptés et signalés comme à refaire.
+    """
+
+    def __init__(self, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                 iterations=PBKDF2_ITERATIONS, travailleurs=TRAVAILLEURS,
+                 file_max=FILE_MAX, algorithme=None):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.iterations = iterations
+        self.algorithme = algorithme or (
+            "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+        )
+        self._executeur = futures.ThreadPoolExecutor(
+            max_workers=travailleurs, thread_name_prefix="mots-de-passe"
+        )
+        self._places = threading.BoundedSemaphore(travailleurs + file_max)
+
+    def hacher(self, mot_de_passe):
+        """
+        Hache un mot de passe avec un nouveau salt et le coût courant.
+
+        Args:
+            mot_de_passe (str): Mot de passe en clair.
+
+        Returns:
+            tuple: (password_hash, salt) à enregistrer.
+
+        Raises:
+            ServiceSature: Si trop de hachages sont en attente.
+        """
+        salt = os.urandom(16).hex()
+        return self._calculer(self._hacher, mot_de_passe, salt), salt
+
+    def verifier(self, mot_de_passe, password_hash, salt):
+        """
+        Vérifie un mot de passe.
+
+        Args:
+            mot_de_passe (str): Mot de passe saisi.
+            password_hash (str): Hachage enregistré.
+            salt (str): Salt enregistré.
+
+        Returns:
+            tuple: (valide, a_rehacher); a_rehacher est vrai pour un
+            ancien hachage SHA-512 ou un coût différent du coût courant.
+
+        Raises:
+            ServiceSature: Si trop de hachages sont en attente.
+        """
+        return self._calculer(self._verifier, mot_de_passe,
+                              password_hash, salt)
+
+    def fermer(self):
+        """
+        Arrête les fils de calcul.
+        """
+        self._executeur.shutdown(wait=False, cancel_futures=True)
+
+    def _calculer(self, fonction, *args):
+        if not self._places.acquire(blocking=False):
+            raise ServiceSature("Trop de hachages de mots de passe en cours")
+        try:
+            future = self._executeur.submit(fonction, *args)
+        except Exception:
+            self._places.release()
+            raise
+        # La place est rendue à la fin du calcul (ou à son annulation), et
+        # non quand l'appelant renonce à attendre : un calcul trop long
+        # occupe toujours un fil.
+        future.add_done_callback(lambda _: self._places.release())
+        try:
+            return future.result(timeout=DELAI_HACHAGE)
+        except futures.TimeoutError:
+            future.cancel()
+            raise ServiceSature("Hachage du mot de passe trop long")
+
+    def _hacher(self, mot_de_passe, salt):
+        if self.algorithme == "scrypt":
+            return "$".join((
+                "scrypt", str(self.n), str(self.r), str(self.p),
+                _scrypt(mot_de_passe, salt, self.n, self.r, self.p)
+            ))
+        return "$".join((
+            "pbkdf2_sha256", str(self.iterations),
+            _pbkdf2(mot_de_passe, salt, self.iterations)
+        ))
+
+    def _verifier(self, mot_de_passe, password_hash, salt):
+        parties = password_hash.split("$")
+
+        if len(parties) == 1:
+            # Ancien format : SHA-512 de salt + mot de passe (inscription)
+            # ou de mot de passe + salt (API)
+            valide = any(
+                hmac.compare_digest(
+                    hashlib.sha512(texte.encode("utf-8")).hexdigest(),
+                    password_hash
+                )
+                for texte in (salt + mot_de_passe, mot_de_passe + salt)
+            )
+            return valide, valide
+
+        if parties[0] == "scrypt" and len(parties) == 5:
+            n, r, p = (int(valeur) for valeur in parties[1:4])
+            attendu = _scrypt(mot_de_passe, salt, n, r, p)
+            courant = (self.algorithme == "scrypt"
+                       and (n, r, p) == (self.n, self.r, self.p))
+        elif parties[0] == "pbkdf2_sha256" and len(parties) == 3:
+            iterations = int(parties[1])
+            attendu = _pbkdf2(mot_de_passe, salt, iterations)
+            courant = (self.algorithme == "pbkdf2_sha256"
+                       and iterations == self.iterations)
+        else:
+            return False, False
+
+        valide = hmac.compare_digest(attendu, parties[-1])
+        return valide, valide and not courant
+
+
+def _scrypt(mot_de_passe, salt, n, r, p):
+    return hashlib.scrypt(
+        mot_de_passe.encode("utf-8"), salt=salt.encode("utf-8"),
+        n=n, r=r, p=p, maxmem=256 * n * r, dklen=32
+    ).hex()
+
+
+def _pbkdf2(mot_de_passe, salt, iterations):
+    return hashlib.pbkdf2_hmac(
+        "sha256", mot_de_passe.encode("utf-8"), salt.encode("utf-8"),
+        iterations
+    ).hex()
+
+
+class LimiteurDebit:
+    """
+    Limiteur par clé (adresse IP, nom d'utilisateur) à seau de jetons :
+    'capacite' essais d'affilée, puis un essai de plus toutes les
+    'periode' secondes.
+
+    Les compteurs sont en mémoire, propres à chaque processus.
+    """
+
+    def __init__(self, capacite, periode, taille_max=100000):
+        self.capacite = capacite
+        self.periode = periode
+        self.taille_max = taille_max
+        # clé -> (jetons, horodatage)
+        self._seaux = {}
+        self._verrou = threading.Lock()
+
+    def autoriser(self, cle):
+        """
+        Consomme un jeton pour cette clé, s'il en reste.
+
+        Args:
+            cle (hashable): Clé limitée.
+
+        Returns:
+            bool: True si l'essai est permis.
+        """
+        maintenant = time.monotonic()
+        with self._verrou:
+            jetons, depuis = self._seaux.get(cle, (self.capacite, maintenant))
+            jetons = min(self.capacite,
+                         jetons + (maintenant - depuis) / self.periode)
+            if len(self._seaux) >= self.taille_max and cle not in self._seaux:
+                self._elaguer(maintenant)
+            if jetons < 1:
+                self._seaux[cle] = (jetons, maintenant)
+                return False
+            self._seaux[cle] = (jetons - 1, maintenant)
+            return True
+
+    def _elaguer(self, maintenant):
+        # Retire les seaux redevenus pleins (équivalents à une clé absente)
+        pleins = [
+            cle for cle, (jetons, depuis) in self._seaux.items()
+            if jetons + (maintenant - depuis) / self.periode >= self.capacite
+        ]
+        for cle in pleins:
+            del self._seaux[cle]
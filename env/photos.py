@@ -0,0 +1,162 @@
+import hashlib
+import os
+import tempfile
+
+try:
+    from PIL import Image
+except ImportError:
+    # Pillow est facultatif : sans lui, aucune miniature n'est produite
+    Image = None
+
+
+DOSSIER_PHOTOS = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "photos"
+)
+
+# Taille des morceaux copiés sur le disque (octets)
+TAILLE_MORCEAU = 64 * 1024
+
+# Taille maximale d'une photo téléversée (octets)
+TAILLE_MAX = 5 * 1024 * 1024
+
+# Côtés (pixels) des miniatures JPEG produites à l'enregistrement
+MINIATURES = (64, 256)
+
+# Signatures (premiers octets) des formats acceptés
+SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+}
+
+
+def type_image(debut):
+    """
+    Reconnaît le format d'une image à ses premiers octets.
+
+    Args:
+        debut (bytes): Premiers octets du fichier.
+
+    Returns:
+        str: Type MIME, ou None si le format n'est pas accepté.
+    """
+    for signature, type_mime in SIGNATURES.items():
+        if debut.startswith(signature):
+            return type_mime
+    return None
+
+
+def chemin_photo(empreinte, taille=None, dossier=None):
+    """
+    Chemin d'une photo (ou d'une de ses miniatures) dans le magasin.
+
+    Les fichiers sont nommés par leur empreinte SHA-256 et répartis en
+    sous-dossiers selon ses deux premiers caractères.
+
+    Args:
+        empreinte (str): Empreinte SHA-256 (hexadécimale) de la photo.
+        taille (int, optional): Côté de la miniature voulue.
+        dossier (str, optional): Racine du magasin (DOSSIER_PHOTOS par
+            défaut).
+
+    Returns:
+        str: Chemin du fichier (qui peut ne pas exister).
+    """
+    nom = empreinte if taille is None else f"{empreinte}-{taille}.jpg"
+    return os.path.join(dossier or DOSSIER_PHOTOS, empreinte[:2], nom)
+
+
+def type_photo(chemin):
+    """
+    Type MIME d'une photo enregistrée.
+
+    Args:
+        chemin (str): Chemin du fichier.
+
+    Returns:
+        str: Type MIME (image/jpeg pour un format non reconnu, comme
+        l'ancienne colonne photo_profil).
+    """
+    with open(chemin, "rb") as f:
+        return type_image(f.read(8)) or "image/jpeg"
+
+
+def enregistrer(flux, taille_max=TAILLE_MAX, verifier=True, dossier=None):
+    """
+    Copie une photo dans le magasin, par morceaux, en calculant son
+    empreinte au passage; une photo déjà présente n'est pas dupliquée.
+    Les miniatures sont produites si Pillow est installé.
+
+    Args:
+        flux (file-like): Contenu de la photo (méthode read).
+        taille_max (int, optional): Taille maximale acceptée (None pour
+            aucune limite).
+        verifier (bool): Si vrai, seuls les formats de SIGNATURES sont
+            acceptés.
+        dossier (str, optional): Racine du magasin.
+
+    Returns:
+        str: Empreinte SHA-256 de la photo.
+
+    Raises:
+        ValueError: Si la photo est trop grosse ou n'est pas une image
+            acceptée.
+    """
+    dossier = dossier or DOSSIER_PHOTOS
+    os.makedirs(dossier, exist_ok=True)
+    empreinte = hashlib.sha256()
+    taille = 0
+
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier, suffix=".tmp")
+    try:
+        with os.fdopen(descripteur, "wb") as sortie:
+            while True:
+                morceau = flux.read(TAILLE_MORCEAU)
+                if not morceau:
+                    break
+                if taille == 0 and verifier and not type_image(morceau):
+                    raise ValueError("Format d'image non accepté")
+                taille += len(morceau)
+                if taille_max is not None and taille > taille_max:
+                    raise ValueError("Photo trop volumineuse")
+                empreinte.update(morceau)
+                sortie.write(morceau)
+        if taille == 0:
+            raise ValueError("Photo vide")
+
+        empreinte = empreinte.hexdigest()
+        chemin = chemin_photo(empreinte, dossier=dossier)
+        if os.path.exists(chemin):
+            os.remove(temporaire)
+        else:
+            os.makedirs(os.path.dirname(chemin), exist_ok=True)
+            os.replace(temporaire, chemin)
+            creer_miniatures(empreinte, dossier)
+        return empreinte
+    except BaseException:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+
+
+def creer_miniatures(empreinte, dossier=None):
+    """
+    Produit les miniatures JPEG (MINIATURES) d'une photo du magasin.
+    Sans Pillow, ou si l'image ne peut pas être décodée, rien n'est fait.
+
+    Args:
+        empreinte (str): Empreinte de la photo.
+        dossier (str, optional): Racine du magasin.
+    """
+    if Image is None:
+        return
+    try:
+        with Image.open(chemin_photo(empreinte, dossier=dossier)) as image:
+            image = image.convert("RGB")
+            for cote in MINIATURES:
+                miniature = image.copy()
+                miniature.thumbnail((cote, cote))
+                chemin = chemin_photo(empreinte, cote, dossier)
+                miniature.save(chemin + ".tmp", "JPEG", quality=85)
+                os.replace(chemin + ".tmp", chemin)
+    except (OSError, ValueError) as e:
+        print("Erreur lors de la création des miniatures:", e)
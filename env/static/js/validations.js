@@ -56,34 +56,30 @@ function rechercheDates() {
       return;
   }
 
-  fetch(`/contrevenants?du=${dateDebut}&au=${dateFin}`)
+  // Agrégats calculés par le serveur (nombre par établissement)
+  fetch(`/statistiques/periode?du=${dateDebut}&au=${dateFin}`)
       .then(response => {
           if (!response.ok) throw new Error(response.statusText);
           return response.json();
       })
       .then(data => {
-          const stats = {};
-          data.forEach(item => {
-              const nom = item.etablissement;
-              stats[nom] = (stats[nom] || 0) + 1;
-          });
-
           const container = document.getElementById('resultats-dates');
           let tableau = `
+              <p>${data.nb} contravention(s), ${data.montant_total} $ d'amendes</p>
               <table class="tableau">
                   <thead>
                       <tr><th>Établissement</th><th>Nombre de contraventions</th></tr>
                   </thead>
                   <tbody>
           `;
-          for (const nom in stats) {
+          data.etablissements.forEach(item => {
               tableau += `
                       <tr>
-                          <td>${nom}</td>
-                          <td>${stats[nom]}</td>
+                          <td>${item.etablissement}</td>
+                          <td>${item.nb}</td>
                       </tr>
               `;
-          }
+          });
           tableau += '</tbody></table>';
           container.innerHTML = tableau;
       })
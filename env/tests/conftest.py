@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+# Les modules de l'application s'importent à plat depuis env/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import base_de_donnees  # noqa: E402
+
+
+@pytest.fixture
+def chemin_bd(tmp_path, monkeypatch):
+    """
+    Dirige l'application vers une base vide dans un dossier temporaire
+    (créée par migrer_schema au premier accès).
+    """
+    chemin = str(tmp_path / "base_de_donnees.db")
+    monkeypatch.setattr(base_de_donnees, "CHEMIN_BD", chemin)
+    return chemin
+
+
+@pytest.fixture
+def connexion(chemin_bd):
+    """
+    Connexion à une base vide dont le schéma est à jour.
+    """
+    connexion = base_de_donnees.ouvrir_connexion(chemin_bd)
+    base_de_donnees.migrer_schema(connexion)
+    yield connexion
+    connexion.close()
+
+
+@pytest.fixture
+def application(connexion, monkeypatch):
+    """
+    Application Flask dont le pool, le fil d'écriture et les sessions
+    visent la base temporaire, avec des caches vides.
+    """
+    monkeypatch.setenv("SECRET_KEY", "test")
+    import analytique
+    import app
+    import autocompletion
+    import cache_reponses
+    import ecrivain
+    import magasin_sessions
+
+    pool = base_de_donnees.PoolConnexions()
+    ecrivain_bd = ecrivain.Ecrivain()
+    monkeypatch.setattr(app, "pool", pool)
+    monkeypatch.setattr(app, "ecrivain_bd", ecrivain_bd)
+    sessions = magasin_sessions.MagasinSessions(pool, ecrivain_bd)
+    monkeypatch.setattr(app, "sessions", sessions)
+    monkeypatch.setattr(app, "cache", cache_reponses.CacheReponses())
+    monkeypatch.setattr(app, "moteur_analytique",
+                        analytique.MoteurAnalytique())
+    monkeypatch.setattr(app, "moteur_autocompletion",
+                        autocompletion.MoteurAutocompletion())
+    app.app.config["TESTING"] = True
+    yield app
+    sessions.arreter()
+    ecrivain_bd.arreter()
+    pool.fermer()
+
+
+@pytest.fixture
+def client(application, connexion):
+    """
+    Client de test connecté sous le compte 'alice'.
+    """
+    with connexion:
+        connexion.execute("""
+            INSERT INTO utilisateurs (username, password_hash, salt,
+                                      nom, prenom)
+            VALUES ('alice', '', '', 'Alice', 'Alice')
+        """)
+    client = application.app.test_client()
+    identifiant_session = "session-alice"
+    assert application.sessions.creer(identifiant_session, "alice")
+    with client.session_transaction() as session:
+        session["utilisateur"] = "alice"
+        session["id_session"] = identifiant_session
+    return client
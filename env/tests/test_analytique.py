@@ -0,0 +1,204 @@
+import json
+from datetime import date
+
+import pytest
+
+import analytique
+import base_de_donnees
+import fonctionnalites
+
+
+def changer_version(connexion, version):
+    with connexion:
+        connexion.execute("""
+            INSERT INTO metadonnees (cle, valeur)
+            VALUES ('version_donnees', ?)
+            ON CONFLICT(cle) DO UPDATE SET valeur = excluded.valeur
+        """, (version,))
+
+
+@pytest.fixture
+def db(connexion):
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            (i, 100 + i % 3, f"202401{i:02d}", "Description", "1 rue",
+             "20240301", f"Restaurant {i % 3}", 100 * i, "Propriétaire",
+             "Montréal", "Ouvert", "20240110", "Restaurant")
+            for i in range(1, 10)
+        ])
+        base_de_donnees.reconstruire_etablissements(connexion)
+    changer_version(connexion, "1")
+    db = base_de_donnees.Database()
+    yield db
+    db.deconnecter()
+
+
+def test_colonnes_disponibles_sans_instantane(db, tmp_path):
+    moteur = analytique.MoteurAnalytique(str(tmp_path / "bd.instantane"))
+
+    assert moteur.colonnes_disponibles(db) is None
+    # Rien n'a été construit depuis la base
+    assert moteur._colonnes is None
+
+
+def test_colonnes_disponibles_apres_instantane(db, connexion, tmp_path):
+    chemin = str(tmp_path / "bd.instantane")
+    moteur = analytique.MoteurAnalytique(chemin)
+    assert analytique.ecrire_instantane(chemin)
+
+    colonnes = moteur.colonnes_disponibles(db)
+
+    assert colonnes is not None
+    assert colonnes.version == "1"
+    assert list(colonnes.liste_etablissements) == db.lister_etablissements()
+    assert colonnes.compter(date(2024, 1, 1), date(2024, 1, 31)) == 9
+
+    # Une importation rend l'instantané périmé
+    changer_version(connexion, "2")
+    assert moteur.colonnes_disponibles(db) is None
+    assert moteur.colonnes(db).version == "2"
+    assert moteur.colonnes_disponibles(db).version == "2"
+
+
+def test_instantane_perime_ouvert_une_fois_par_version(db, connexion,
+                                                       tmp_path,
+                                                       monkeypatch):
+    chemin = str(tmp_path / "bd.instantane")
+    moteur = analytique.MoteurAnalytique(chemin)
+    assert analytique.ecrire_instantane(chemin)
+    changer_version(connexion, "2")
+
+    ouvertures = []
+    depuis_instantane = analytique.Colonnes.depuis_instantane
+
+    def compter(chemin):
+        ouvertures.append(chemin)
+        return depuis_instantane(chemin)
+
+    monkeypatch.setattr(analytique.Colonnes, "depuis_instantane", compter)
+
+    for _ in range(3):
+        assert moteur.colonnes_disponibles(db) is None
+    assert len(ouvertures) == 1
+
+    # Nouvelle version des données : l'instantané est vérifié à nouveau
+    changer_version(connexion, "3")
+    assert moteur.colonnes_disponibles(db) is None
+    assert len(ouvertures) == 2
+
+    # Instantané réécrit à la version courante : il est ouvert
+    assert analytique.ecrire_instantane(chemin)
+    assert moteur.colonnes_disponibles(db).version == "3"
+    assert len(ouvertures) == 3
+
+
+@pytest.fixture
+def periode(connexion):
+    # (id, établissement, date, montant, catégorie, statut)
+    lignes = [
+        (1, "Chez Ali", "20240101", 100, "Restaurant", "Ouvert"),
+        (2, "Chez Ali", "20240301", 200, "Épicerie", "Fermé"),
+        (3, "Chez Ali", "20240201", 300, "Restaurant", "Ouvert"),
+        (4, "Pizza Roma", "20240115", 50, "Restaurant", "Ouvert"),
+        (5, "Bistro", "20240120", 75, "Restaurant", "Fermé"),
+        (6, "Bistro", "20240630", 25, "Épicerie", "Ouvert"),
+        # Date impossible : hors de toute période
+        (7, "Bistro", "20240231", 1000, "Restaurant", "Ouvert"),
+    ]
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            (i, 100 + i, jour, "Description", "1 rue", "20240301",
+             etablissement, montant, "Propriétaire", "Montréal", statut,
+             "20240110", categorie)
+            for i, etablissement, jour, montant, categorie, statut in lignes
+        ])
+    db = base_de_donnees.Database()
+    try:
+        yield analytique.charger_colonnes(db)
+    finally:
+        db.deconnecter()
+
+
+def test_jours_depuis_dates():
+    jours = analytique.jours_depuis_dates([19700101, 20240229, 20230229,
+                                           20241301, 20240100])
+    assert jours[0] == 0
+    assert jours[1] == analytique.numero_jour(date(2024, 2, 29))
+    assert list(jours[2:]) == [analytique.JOUR_INCONNU] * 3
+
+
+def test_resume_d_une_periode(periode):
+    assert periode.resume(date(2024, 1, 1), date(2024, 3, 31)) == {
+        "du": "2024-01-01",
+        "au": "2024-03-31",
+        "nb": 5,
+        "montant_total": 725,
+        "etablissements": [
+            {"etablissement": "Chez Ali", "nb": 3, "montant": 600},
+            # À nombre égal, par nom
+            {"etablissement": "Bistro", "nb": 1, "montant": 75},
+            {"etablissement": "Pizza Roma", "nb": 1, "montant": 50},
+        ],
+        "mois": [
+            {"mois": "2024-01", "nb": 3, "montant": 225},
+            {"mois": "2024-02", "nb": 1, "montant": 300},
+            {"mois": "2024-03", "nb": 1, "montant": 200},
+        ],
+        "categories": [{"categorie": "Restaurant", "nb": 4},
+                       {"categorie": "Épicerie", "nb": 1}],
+        "statuts": [{"statut": "Ouvert", "nb": 3},
+                    {"statut": "Fermé", "nb": 2}],
+    }
+
+
+def test_bornes_incluses(periode):
+    assert periode.compter(date(2024, 1, 15), date(2024, 1, 20)) == 2
+    assert periode.compter(date(2024, 1, 16), date(2024, 1, 19)) == 0
+    assert periode.somme_amendes(date(2024, 1, 15), date(2024, 1, 15)) == 50
+    # La date impossible n'entre dans aucune période
+    assert periode.compter(date(1900, 1, 1), date(2100, 12, 31)) == 6
+
+
+def test_mois_sans_contravention_compris(periode):
+    assert periode.par_mois(date(2024, 3, 1), date(2024, 6, 30)) == [
+        {"mois": "2024-03", "nb": 1, "montant": 200},
+        {"mois": "2024-04", "nb": 0, "montant": 0},
+        {"mois": "2024-05", "nb": 0, "montant": 0},
+        {"mois": "2024-06", "nb": 1, "montant": 25},
+    ]
+
+
+def test_periode_vide_ou_inversee(periode):
+    for du, au in [(date(2023, 1, 1), date(2023, 12, 31)),
+                   (date(2024, 3, 31), date(2024, 1, 1))]:
+        resume = periode.resume(du, au)
+        assert resume["nb"] == resume["montant_total"] == 0
+        assert resume["etablissements"] == resume["mois"] == []
+        assert resume["categories"] == resume["statuts"] == []
+
+
+def test_route_statistiques_periode(application, periode):
+    client = application.app.test_client()
+
+    reponse = client.get(
+        "/statistiques/periode?du=2024-01-01&au=2024-03-31&limite=1")
+
+    assert reponse.status_code == 200
+    resume = reponse.get_json()
+    assert resume == json.loads(json.dumps(periode.resume(
+        date(2024, 1, 1), date(2024, 3, 31), 1)))
+    assert [ligne["etablissement"] for ligne in resume["etablissements"]] \
+        == ["Chez Ali"]
+
+
+@pytest.mark.parametrize("parametres, erreur", [
+    ("du=2024-01-01", "obligatoires"),
+    ("du=2024-01-01&au=2024-02-30", "Dates invalides"),
+    ("du=2024-01-01&au=2024-01-31&limite=-1", "limite"),
+])
+def test_route_statistiques_periode_invalide(application, parametres,
+                                             erreur):
+    reponse = application.app.test_client().get(
+        f"/statistiques/periode?{parametres}")
+    assert reponse.status_code == 400
+    assert erreur in reponse.get_json()["erreur"]
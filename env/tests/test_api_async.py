@@ -0,0 +1,188 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import api_async
+import exportations
+import fonctionnalites
+
+
+# Contraventions en base : plus d'une page de LIMITE_MAX lignes
+NB_CONTRAVENTIONS = exportations.LIMITE_MAX + 5
+
+
+@pytest.fixture
+def serveur(connexion, chemin_bd):
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            (i, 100 + i % 10, "20240105", "Description", "1 rue Principale",
+             "20240301", f"Restaurant {i % 10}", 500, "Propriétaire",
+             "Montréal", "Ouvert", "20240110", "Restaurant")
+            for i in range(1, NB_CONTRAVENTIONS + 1)
+        ])
+    serveur = api_async.ServeurLecture(chemin=chemin_bd, travailleurs=2)
+    yield serveur
+    serveur.executeur.shutdown()
+    serveur.pool.fermer()
+
+
+async def lire_reponse(lecteur):
+    entete = await lecteur.readuntil(b"\r\n\r\n")
+    lignes = entete.decode("latin-1").split("\r\n")
+    entetes = {}
+    for ligne in lignes[1:]:
+        nom, _, valeur = ligne.partition(":")
+        if nom:
+            entetes[nom.strip().lower()] = valeur.strip()
+    if "content-length" in entetes:
+        corps = await lecteur.readexactly(int(entetes["content-length"]))
+    elif entetes.get("transfer-encoding") == "chunked":
+        corps = b""
+        while True:
+            taille = int((await lecteur.readuntil(b"\r\n")).strip(), 16)
+            corps += (await lecteur.readexactly(taille + 2))[:-2]
+            if not taille:
+                break
+    else:
+        # Corps délimité par la fermeture de la connexion
+        corps = await lecteur.read()
+    return int(lignes[0].split(" ")[1]), entetes, corps
+
+
+def echanger(serveur, *requetes):
+    """
+    Envoie des requêtes brutes sur une même connexion et renvoie les
+    réponses lues, jusqu'à la fermeture de la connexion par le serveur.
+    """
+    async def dialoguer():
+        ecoute = await asyncio.start_server(
+            serveur.traiter_connexion, "127.0.0.1", 0)
+        port = ecoute.sockets[0].getsockname()[1]
+        lecteur, ecrivain = await asyncio.open_connection("127.0.0.1", port)
+        reponses = []
+        try:
+            for requete in requetes:
+                ecrivain.write(requete)
+                await ecrivain.drain()
+                try:
+                    reponses.append(await asyncio.wait_for(
+                        lire_reponse(lecteur), 5))
+                except asyncio.IncompleteReadError:
+                    break
+        finally:
+            ecrivain.close()
+            await ecrivain.wait_closed()
+            # Laisse le serveur constater la fermeture
+            await asyncio.sleep(0.05)
+            ecoute.close()
+            await ecoute.wait_closed()
+        return reponses
+
+    return asyncio.run(dialoguer())
+
+
+def requete(cible, *entetes, corps=b"", methode="GET", version="HTTP/1.1"):
+    lignes = [f"{methode} {cible} {version}", "Host: test", *entetes]
+    return ("\r\n".join(lignes) + "\r\n\r\n").encode("latin-1") + corps
+
+
+def test_corps_ignore_garde_la_connexion(serveur):
+    corps = b'{"ignore": true}'
+    reponses = echanger(
+        serveur,
+        requete("/infractions?etablissement=restaurant&limite=1",
+                f"Content-Length: {len(corps)}", corps=corps),
+        requete("/infractions?etablissement=restaurant&limite=1"),
+    )
+    assert [statut for statut, _, _ in reponses] == [200, 200]
+    assert reponses[0][1]["connection"] == "keep-alive"
+
+
+def test_corps_chunked_ferme_la_connexion(serveur):
+    reponses = echanger(
+        serveur,
+        requete("/infractions?etablissement=restaurant&limite=1",
+                "Transfer-Encoding: chunked",
+                corps=b"4\r\nabcd\r\n0\r\n\r\n"),
+        requete("/infractions?etablissement=restaurant&limite=1"),
+    )
+    assert len(reponses) == 1
+    assert reponses[0][1]["connection"] == "close"
+
+
+def test_corps_trop_grand_ferme_la_connexion(serveur):
+    longueur = api_async.TAILLE_MAX_CORPS + 1
+    reponses = echanger(
+        serveur,
+        requete("/infractions?etablissement=restaurant&limite=1",
+                f"Content-Length: {longueur}"),
+    )
+    assert reponses[0][1]["connection"] == "close"
+
+
+@pytest.mark.parametrize("accept_encoding, encodage", [
+    ("gzip", "gzip"),
+    ("gzip, deflate, br", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+    ("", None),
+])
+def test_encodage_negocie(serveur, accept_encoding, encodage):
+    (statut, entetes, corps), = echanger(serveur, requete(
+        "/infractions?etablissement=restaurant&limite=50",
+        f"Accept-Encoding: {accept_encoding}", "Connection: close"))
+    assert statut == 200
+    assert entetes.get("content-encoding") == encodage
+    if encodage:
+        corps = gzip.decompress(corps)
+    assert len(json.loads(corps)) == 50
+
+
+def test_liste_complete_diffusee_sans_limite(serveur):
+    reponses = echanger(
+        serveur,
+        requete("/contrevenants?du=2024-01-01&au=2024-12-31"),
+        requete("/infractions?etablissement=restaurant",
+                "Accept-Encoding: gzip"),
+    )
+    (statut, entetes, corps), (_, entetes_gzip, corps_gzip) = reponses
+
+    assert statut == 200
+    assert entetes["transfer-encoding"] == "chunked"
+    assert "x-curseur-suivant" not in entetes
+    lignes = json.loads(corps)
+    assert len(lignes) == NB_CONTRAVENTIONS
+    assert len({ligne["id_poursuite"] for ligne in lignes}) == \
+        NB_CONTRAVENTIONS
+    # La connexion reste utilisable après un corps diffusé
+    assert entetes_gzip["content-encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(corps_gzip))) == NB_CONTRAVENTIONS
+    # Les connexions prises pendant la diffusion sont rendues au pool
+    assert serveur.pool._libres.qsize() == serveur.pool.ouvertes
+
+
+def test_liste_complete_en_http_1_0(serveur):
+    (statut, entetes, corps), = echanger(serveur, requete(
+        "/contrevenants?du=2024-01-01&au=2024-12-31", version="HTTP/1.0"))
+    assert statut == 200
+    assert entetes["connection"] == "close"
+    assert "transfer-encoding" not in entetes
+    assert len(json.loads(corps)) == NB_CONTRAVENTIONS
+
+
+def test_page_avec_limite(serveur):
+    (statut, entetes, corps), = echanger(serveur, requete(
+        "/contrevenants?du=2024-01-01&au=2024-12-31&limite=1000",
+        "Connection: close"))
+    assert statut == 200
+    assert len(json.loads(corps)) == 1000
+    suivant = entetes["x-curseur-suivant"]
+
+    (statut, entetes, corps), = echanger(serveur, requete(
+        "/contrevenants?du=2024-01-01&au=2024-12-31&limite=1000"
+        f"&curseur={suivant}", "Connection: close"))
+    assert len(json.loads(corps)) == 5
+    assert "x-curseur-suivant" not in entetes
@@ -0,0 +1,112 @@
+import pytest
+
+import autocompletion
+
+
+ETABLISSEMENTS = [
+    # (business_id, nom, nb_contraventions)
+    (1, "Pizza Roma", 1),
+    (2, "La Pizza du Coin", 10),
+    (3, "Lapizzaria", 50),
+    (4, "Café Olé", 5),
+    (5, "CAFÉ DU PARC", 7),
+    (6, "Chez Ali", 3),
+    (7, "Restaurant Chez Nous", 20),
+    (8, "&", 100),
+    (9, "-", 2),
+]
+
+
+@pytest.fixture
+def index():
+    return autocompletion.IndexEtablissements("1", ETABLISSEMENTS)
+
+
+def ids(resultats):
+    return [business_id for business_id, _ in resultats]
+
+
+def test_replier():
+    assert autocompletion.replier("  Café-Olé!  ") == "cafe ole"
+    assert autocompletion.replier("&") == ""
+
+
+def test_noms_sans_lettres_ignores(index):
+    # « & » et « - » ne donnent aucun mot : ils ne sont pas indexés
+    assert len(index) == 7
+    assert ids(index.rechercher("a", limite=50)) != []
+
+
+def test_prefixe_du_nom(index):
+    assert ids(index.rechercher("chez")) == [6, 7]
+    assert ids(index.rechercher("chez a")) == [6]
+
+
+def test_prefixe_de_mots(index):
+    # Chaque mot saisi commence un mot du nom, dans n'importe quel ordre
+    assert ids(index.rechercher("nous chez")) == [7]
+    assert ids(index.rechercher("coin")) == [2]
+
+
+def test_sous_chaine(index):
+    assert ids(index.rechercher("stau")) == [7]
+    assert ids(index.rechercher("izzari")) == [3]
+    # Moins de TAILLE_NGRAMME caractères : pas de recherche au milieu
+    assert ids(index.rechercher("zz")) == []
+
+
+def test_accents_et_casse(index):
+    assert ids(index.rechercher("cafe")) == [5, 4]
+    assert ids(index.rechercher("CAFÉ")) == [5, 4]
+    assert ids(index.rechercher("olé")) == [4]
+
+
+@pytest.mark.parametrize("entree", ["piz", "pizza"])
+def test_classement_par_pertinence_puis_rang(index, entree):
+    # Début du nom, puis début d'un mot, puis milieu d'un mot : chaque
+    # niveau passe avant le suivant, quel que soit le nombre de
+    # contraventions; à l'intérieur d'un niveau, le plus grand d'abord.
+    assert ids(index.rechercher(entree)) == [1, 2, 3]
+
+
+def test_limite(index):
+    assert ids(index.rechercher("piz", limite=2)) == [1, 2]
+    assert index.rechercher("piz", limite=0) == []
+    assert index.rechercher("   ") == []
+
+
+def test_business_id_en_double_garde_le_plus_frequent():
+    index = autocompletion.IndexEtablissements("1", [
+        (1, "Ancien Nom", 2), (1, "Nouveau Nom", 8), (1, "&", 9)])
+    assert index.rechercher("nom") == [(1, "Nouveau Nom")]
+
+
+class BaseFactice:
+    def __init__(self):
+        self.version = "1"
+        self.etablissements = list(ETABLISSEMENTS)
+        self.lectures = 0
+
+    def version_donnees(self):
+        return self.version
+
+    def lister_etablissements_classes(self):
+        self.lectures += 1
+        return self.etablissements
+
+
+def test_index_reconstruit_a_chaque_version():
+    moteur = autocompletion.MoteurAutocompletion()
+    db = BaseFactice()
+
+    index = moteur.index(db)
+    assert moteur.index(db) is index
+    assert db.lectures == 1
+
+    db.version = "2"
+    db.etablissements.append((10, "Chez Zoé", 1))
+    nouvel_index = moteur.index(db)
+    assert nouvel_index is not index
+    assert nouvel_index.version == "2"
+    assert db.lectures == 2
+    assert ids(nouvel_index.rechercher("chez")) == [6, 10, 7]
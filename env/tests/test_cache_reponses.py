@@ -0,0 +1,112 @@
+import gzip
+
+import pytest
+
+import cache_reponses
+import fonctionnalites
+from test_analytique import changer_version
+
+
+def test_lru_borne_en_octets():
+    cache = cache_reponses.CacheReponses(budget_octets=10)
+    cache.stocker("a", "1", b"aaaa", [])
+    cache.stocker("b", "1", b"bbbb", [])
+    assert cache.obtenir("a", "1") == (b"aaaa", [])
+
+    # « b » est le moins récemment utilisé : il est évincé
+    cache.stocker("c", "1", b"cccc", [])
+    assert cache.obtenir("b", "1") is None
+    assert len(cache) == 2
+    assert cache.taille_octets == 8
+
+    # Plus gros que le budget : pas conservé
+    cache.stocker("d", "1", b"d" * 11, [])
+    assert cache.obtenir("d", "1") is None
+
+
+def test_nouvelle_version_invalide_tout():
+    cache = cache_reponses.CacheReponses()
+    cache.stocker("a", "1", b"aaaa", [("X", "1")])
+    assert cache.obtenir("a", "2") is None
+    assert len(cache) == 0
+    assert cache.taille_octets == 0
+    # Une réponse produite avec l'ancienne version ne revient pas
+    assert cache.obtenir("a", "1") is None
+
+
+def test_copier_flux():
+    cache = cache_reponses.CacheReponses(taille_max_flux=6)
+    assert list(cache.copier_flux(iter([b"ab", b"cd"]), "petit", "1",
+                                  [])) == [b"ab", b"cd"]
+    assert cache.obtenir("petit", "1") == (b"abcd", [])
+
+    # Trop gros : relayé en entier, mais pas mis en cache
+    assert b"".join(cache.copier_flux(iter([b"abcd", b"efgh"]), "gros",
+                                      "1", [])) == b"abcdefgh"
+    assert cache.obtenir("gros", "1") is None
+
+
+@pytest.fixture
+def donnees(connexion):
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            (i, 100 + i, "20240105", "Description", "1 rue", "20240301",
+             f"Restaurant {i}", 100, "Propriétaire", "Montréal", "Ouvert",
+             "20240110", "Restaurant")
+            for i in range(1, 4)
+        ])
+    changer_version(connexion, "1")
+
+
+def test_etag_et_304(client, connexion, donnees):
+    url = "/contrevenants?du=2024-01-01&au=2024-12-31"
+    reponse = client.get(url)
+    assert reponse.status_code == 200
+    etag = reponse.headers["ETag"]
+    assert reponse.headers["Cache-Control"] == "no-cache"
+    corps = reponse.data
+
+    reponse = client.get(url, headers={"If-None-Match": etag})
+    assert reponse.status_code == 304
+    assert reponse.data == b""
+    assert reponse.headers["ETag"] == etag
+
+    # Servie par le cache : même corps, même ETag
+    reponse = client.get(url)
+    assert (reponse.data, reponse.headers["ETag"]) == (corps, etag)
+
+    # Une importation change la version : l'ETag ne correspond plus
+    with connexion:
+        connexion.execute(fonctionnalites.REQUETE_INSERTION, (
+            4, 104, "20240106", "Description", "1 rue", "20240301",
+            "Restaurant 4", 100, "Propriétaire", "Montréal", "Ouvert",
+            "20240110", "Restaurant"))
+    changer_version(connexion, "2")
+    reponse = client.get(url, headers={"If-None-Match": etag})
+    assert reponse.status_code == 200
+    assert reponse.headers["ETag"] != etag
+    assert len(reponse.get_json()) == 4
+
+
+def lire(client, url, **entetes):
+    # Une réponse diffusée est lue avant la requête suivante
+    reponse = client.get(url, headers=entetes)
+    return reponse.get_data(), reponse.headers
+
+
+def test_etag_propre_aux_parametres_et_a_l_encodage(client, donnees):
+    url = "/contrevenants.csv?du=2024-01-01&au=2024-12-31"
+    simple, entetes_simple = lire(client, url)
+    compresse, entetes_compresse = lire(client, url,
+                                        **{"Accept-Encoding": "gzip"})
+    _, entetes_autre = lire(
+        client, "/contrevenants.csv?du=2024-01-02&au=2024-12-31")
+
+    assert entetes_compresse["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compresse) == simple
+    assert len({entetes_simple["ETag"], entetes_compresse["ETag"],
+                entetes_autre["ETag"]}) == 3
+
+    # La version compressée en cache n'est pas servie sans gzip
+    assert lire(client, url)[0] == simple
+    assert lire(client, url, **{"Accept-Encoding": "gzip"})[0] == compresse
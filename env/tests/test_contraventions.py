@@ -0,0 +1,93 @@
+import json
+import sqlite3
+
+import pytest
+
+import base_de_donnees
+import exportations
+import fonctionnalites
+
+
+# Lignes compactes (Contravention), recherche par dates au format
+# YYYYMMDD et encodage JSON sans dictionnaire intermédiaire.
+
+LIGNE = (1, 101, 20240105, 'Description "citée" é\n', "1 rue", 20240301,
+         "Restaurant", 500, None, "Montréal", "Ouvert", 20240110,
+         "Restaurant")
+
+
+@pytest.fixture
+def db(connexion):
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            (i, 100 + i, f"202401{i:02d}", "Description", "1 rue",
+             "20240301", f"Restaurant {i}", 100 * i, "Propriétaire",
+             "Montréal", "Ouvert", "20240110", "Restaurant")
+            for i in range(1, 11)
+        ])
+    db = base_de_donnees.Database()
+    yield db
+    db.deconnecter()
+
+
+def test_contravention_par_attribut_nom_et_position():
+    contravention = base_de_donnees.fabrique_contravention(None, LIGNE)
+
+    assert isinstance(contravention, tuple)
+    assert contravention.date == contravention["date"] == contravention[2]
+    assert contravention[-1] == "Restaurant"
+    assert contravention[:2] == (1, 101)
+    assert dict(contravention) == dict(
+        zip(base_de_donnees.CHAMPS_CONTRAVENTION, LIGNE))
+    assert repr(contravention) == "Contravention(1, 20240105)"
+    with pytest.raises(IndexError, match="Champ inconnu"):
+        contravention["inconnu"]
+    # Aucun dictionnaire par instance
+    with pytest.raises(AttributeError):
+        contravention.autre = 1
+
+
+def test_par_dates_yyyymmdd(db):
+    lignes = db.rechercher_contraventions_par_dates("20240103", "20240105")
+
+    # Bornes incluses, de la plus récente à la plus ancienne
+    assert [ligne.id_poursuite for ligne in lignes] == [5, 4, 3]
+    assert all(isinstance(ligne, base_de_donnees.Contravention)
+               for ligne in lignes)
+    # Les dates sont stockées comme des entiers YYYYMMDD
+    assert lignes[0].date == 20240105
+    assert db.rechercher_contraventions_par_dates(20240103, 20240105) == \
+        lignes
+
+
+def test_par_dates_iso_refusees_par_la_base(db):
+    # Le format YYYY-MM-JJ n'est pas compris : les routes le convertissent
+    assert db.rechercher_contraventions_par_dates(
+        "2024-01-03", "2024-01-05") == []
+
+
+def test_route_convertit_les_dates_iso(client, db):
+    reponse = client.get("/contrevenants?du=2024-01-03&au=2024-01-05")
+
+    assert reponse.status_code == 200
+    assert [ligne["id_poursuite"] for ligne in reponse.get_json()] == \
+        [5, 4, 3]
+
+
+def test_encodeur_json_identique_a_json_dumps(connexion, db):
+    colonnes = list(base_de_donnees.CHAMPS_CONTRAVENTION)
+    encoder = exportations.encodeur_json(colonnes)
+    contravention = base_de_donnees.fabrique_contravention(None, LIGNE)
+    connexion.row_factory = sqlite3.Row
+    rangee = connexion.execute("SELECT * FROM contraventions").fetchone()
+
+    for ligne in (LIGNE, contravention, rangee):
+        attendu = dict(zip(colonnes, tuple(ligne)))
+        assert json.loads(encoder(ligne)) == attendu
+        assert encoder(ligne) == json.dumps(
+            attendu, sort_keys=True, separators=(",", ":"))
+
+
+def test_encodeur_json_une_colonne():
+    encoder = exportations.encodeur_json(["nom"])
+    assert encoder(("Chez Ali",)) == '{"nom":"Chez Ali"}'
@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+import time
+from concurrent import futures
+
+import pytest
+
+import base_de_donnees
+import ecrivain
+
+
+# Inscriptions simultanées
+NB_INSCRIPTIONS = 40
+
+
+@pytest.fixture
+def fil_ecriture(connexion, chemin_bd):
+    fil = ecrivain.Ecrivain(chemin_bd, delai=0.5)
+    fil.executer(lambda connexion: None)
+    yield fil
+    fil.arreter()
+
+
+def inscrire(fil, username):
+    db = base_de_donnees.Database(ecrivain=fil)
+    try:
+        return db.creer_utilisateur(username, "hash", "sel", "Nom", "Prénom")
+    finally:
+        db.deconnecter()
+
+
+def inscrire_lentement(fil, username):
+    # Inscription dont l'écriture dure : un groupe complet dépasse
+    # largement le délai
+    def ecrire(connexion):
+        curseur = connexion.execute("""
+            INSERT INTO utilisateurs (username, password_hash, salt,
+                                      nom, prenom)
+            VALUES (?, 'hash', 'sel', 'Nom', 'Prénom')
+        """, (username,))
+        time.sleep(0.05)
+        return curseur.lastrowid
+
+    try:
+        return fil.executer(ecrire)
+    except sqlite3.Error:
+        return None
+
+
+def inscrire_pendant_verrou(fil, chemin_bd, duree, usernames,
+                            inscription=inscrire):
+    """
+    Lance les inscriptions en parallèle pendant qu'une autre connexion
+    (comme l'importation A1) détient le verrou d'écriture 'duree'
+    secondes, et renvoie le résultat de chacune.
+    """
+    autre = base_de_donnees.ouvrir_connexion(chemin_bd)
+    autre.execute("BEGIN IMMEDIATE")
+    # Le fil attend le verrou avec une première écriture : à la
+    # libération, les inscriptions en file forment un seul groupe
+    fil.soumettre(lambda connexion: None)
+    liberation = threading.Timer(duree, autre.commit)
+    liberation.start()
+    try:
+        with futures.ThreadPoolExecutor(len(usernames)) as executeur:
+            resultats = dict(zip(usernames, executeur.map(
+                lambda username: inscription(fil, username), usernames)))
+    finally:
+        liberation.join()
+        autre.close()
+    return resultats
+
+
+def inscrits(connexion):
+    return [
+        ligne["username"] for ligne in connexion.execute(
+            "SELECT username FROM utilisateurs")
+    ]
+
+
+def test_inscriptions_attendent_le_verrou(fil_ecriture, chemin_bd,
+                                          connexion):
+    usernames = [f"user{i}" for i in range(NB_INSCRIPTIONS)]
+
+    resultats = inscrire_pendant_verrou(fil_ecriture, chemin_bd, 0.2,
+                                        usernames)
+
+    assert all(resultats.values())
+    assert len(set(resultats.values())) == NB_INSCRIPTIONS
+    assert sorted(inscrits(connexion)) == sorted(usernames)
+
+
+@pytest.mark.parametrize("inscription", [inscrire, inscrire_lentement])
+@pytest.mark.parametrize("duree", [0.4, 0.5, 0.6, 1.0])
+def test_echec_annonce_signifie_rien_d_ecrit(fil_ecriture, chemin_bd,
+                                             connexion, duree, inscription):
+    # Verrou libéré autour de l'échéance (delai=0.5) : chaque inscription
+    # est validée ou annoncée en échec, jamais les deux.
+    usernames = [f"user{i}" for i in range(NB_INSCRIPTIONS)]
+
+    resultats = inscrire_pendant_verrou(fil_ecriture, chemin_bd, duree,
+                                        usernames, inscription)
+
+    reussies = {u for u, resultat in resultats.items() if resultat}
+    assert set(inscrits(connexion)) == reussies
+
+    # Réessayer les inscriptions en échec ne crée ni doublon ni erreur
+    for username in set(usernames) - reussies:
+        assert inscrire(fil_ecriture, username)
+    assert sorted(inscrits(connexion)) == sorted(usernames)
+
+
+def test_erreur_inattendue_n_arrete_pas_le_fil(fil_ecriture, connexion,
+                                               monkeypatch):
+    executer_groupe = fil_ecriture._executer_groupe
+
+    def echouer(connexion, groupe):
+        monkeypatch.setattr(fil_ecriture, "_executer_groupe",
+                            executer_groupe)
+        raise RuntimeError("panne")
+
+    monkeypatch.setattr(fil_ecriture, "_executer_groupe", echouer)
+    with pytest.raises(RuntimeError):
+        fil_ecriture.executer(lambda c: c.execute("SELECT 1"))
+
+    assert inscrire(fil_ecriture, "alice")
+    assert inscrits(connexion) == ["alice"]
+
+
+def test_echec_a_l_ouverture_relance_le_fil(chemin_bd, tmp_path):
+    fil = ecrivain.Ecrivain(str(tmp_path / "absent" / "base.db"), delai=1)
+    debut = time.monotonic()
+    with pytest.raises(sqlite3.OperationalError):
+        fil.executer(lambda c: c.execute("SELECT 1"))
+    assert time.monotonic() - debut < 1
+
+    fil.chemin = chemin_bd
+    assert fil.executer(lambda c: c.execute("SELECT 1").fetchone()[0]) == 1
+    fil.arreter()
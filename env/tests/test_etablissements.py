@@ -0,0 +1,112 @@
+import sqlite3
+
+import pytest
+
+import base_de_donnees
+import fonctionnalites
+
+
+def contravention(i, business_id, etablissement, date, montant=100,
+                  adresse="1 rue"):
+    return (i, business_id, date, "Description", adresse, "20240301",
+            etablissement, montant, "Propriétaire", "Montréal", "Ouvert",
+            "20240110", "Restaurant")
+
+
+CONTRAVENTIONS = [
+    contravention(1, 10, "Chez Ali", "20240101", 100, "1 rue Ancienne"),
+    contravention(2, 10, "Chez Ali et Fils", "20240301", 200,
+                  "2 rue Nouvelle"),
+    contravention(3, 10, "Chez Ali", "20240201", 300),
+    contravention(4, 20, "Bistro", "20240115", 50),
+    contravention(5, 30, "Bistro", "20240120", 75),
+]
+
+
+@pytest.fixture
+def donnees(connexion):
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION,
+                              CONTRAVENTIONS)
+        base_de_donnees.reconstruire_etablissements(connexion)
+
+
+def fiches(connexion):
+    return {ligne[0]: tuple(ligne[1:]) for ligne in connexion.execute("""
+        SELECT business_id, nom, adresse, nb_contraventions,
+               montant_total, derniere_date
+          FROM etablissements
+    """)}
+
+
+def test_une_fiche_par_business_id(connexion, donnees):
+    assert fiches(connexion) == {
+        # Nom et adresse de la contravention la plus récente
+        10: ("Chez Ali et Fils", "2 rue Nouvelle", 3, 600, 20240301),
+        20: ("Bistro", "1 rue", 1, 50, 20240115),
+        30: ("Bistro", "1 rue", 1, 75, 20240120),
+    }
+
+
+def test_mise_a_jour_limitee_au_delta(connexion, donnees):
+    fonctionnalites.suivre_changements(connexion)
+    with connexion:
+        connexion.execute(
+            "UPDATE etablissements SET nom = 'Modifié' WHERE business_id = 30")
+        connexion.execute(fonctionnalites.REQUETE_INSERTION, contravention(
+            6, 20, "Bistro Renommé", "20240401", 25))
+        base_de_donnees.reconstruire_etablissements(connexion, delta=True)
+
+    resultat = fiches(connexion)
+    assert resultat[20] == ("Bistro Renommé", "1 rue", 2, 75, 20240401)
+    # Établissement absent du delta : inchangé
+    assert resultat[30][0] == "Modifié"
+
+
+def test_lectures(connexion, donnees):
+    db = base_de_donnees.Database()
+    try:
+        # Deux business_id du même nom : un seul nom listé
+        assert db.lister_etablissements() == ["Bistro", "Chez Ali et Fils"]
+        assert sorted(tuple(ligne) for ligne in db.etablissements_par_ids(
+            [10, "30", 99])) == [(10, "Chez Ali et Fils"), (30, "Bistro")]
+        assert [tuple(ligne) for ligne in db.lister_etablissements_classes()
+                ][0] == (10, "Chez Ali et Fils", 3)
+    finally:
+        db.deconnecter()
+
+
+def test_route_etablissements(client, donnees):
+    reponse = client.get("/etablissements")
+    assert reponse.status_code == 200
+    assert reponse.get_json() == ["Bistro", "Chez Ali et Fils"]
+
+
+def test_listes_de_surveillance_reprises(chemin_bd):
+    # Base d'avant les migrations : listes d'id_poursuite en texte
+    connexion = sqlite3.connect(chemin_bd)
+    with open(base_de_donnees.CHEMMIN_SQL, encoding="utf-8") as f:
+        connexion.executescript(f.read())
+    connexion.executescript("""
+        ALTER TABLE utilisateurs
+          ADD COLUMN etablissements_surveilles TEXT DEFAULT '';
+    """)
+    connexion.executemany(fonctionnalites.REQUETE_INSERTION, CONTRAVENTIONS)
+    connexion.executemany("""
+        INSERT INTO utilisateurs (username, password_hash, salt, nom,
+                                  prenom, etablissements_surveilles)
+        VALUES (?, '', '', 'Nom', 'Prénom', ?)
+    """, [("alice", "1,3, 4,x"), ("bob", "")])
+    connexion.commit()
+    connexion.close()
+
+    connexion = base_de_donnees.ouvrir_connexion(chemin_bd)
+    try:
+        base_de_donnees.migrer_schema(connexion)
+        # id_poursuite 1 et 3 : même établissement (10); 4 : établissement 20
+        assert [tuple(ligne) for ligne in connexion.execute("""
+            SELECT username, business_id FROM surveillances
+             ORDER BY username, business_id
+        """)] == [("alice", 10), ("alice", 20)]
+    finally:
+        connexion.close()
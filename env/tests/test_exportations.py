@@ -0,0 +1,67 @@
+import gzip
+import tracemalloc
+
+import exportations
+
+
+# Nombre de lignes exportées : plusieurs mégaoctets de texte
+NB_LIGNES = 100_000
+
+# Pic de mémoire toléré pendant l'exportation, indépendant de NB_LIGNES
+PIC_MAX = 1024 * 1024
+
+ENTETES = ["id_poursuite", "etablissement", "date", "description", "montant"]
+
+
+def lignes():
+    for i in range(NB_LIGNES):
+        yield (i, f"Restaurant {i % 997}", "20240105",
+               "Description de la contravention & <détails>", 500 + i % 7)
+
+
+def elements():
+    for ligne in lignes():
+        yield ("contravention", {"id_poursuite": ligne[0]},
+               list(zip(ENTETES[1:], ligne[1:])))
+
+
+def consommer(flux):
+    """
+    Lit un flux d'octets morceau par morceau, comme le serveur WSGI, et
+    renvoie sa taille et le pic de mémoire allouée pendant la lecture.
+    """
+    taille = 0
+    tracemalloc.start()
+    try:
+        for morceau in flux:
+            taille += len(morceau)
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return taille, pic
+
+
+def test_flux_csv_memoire_bornee():
+    taille, pic = consommer(exportations.flux_csv(ENTETES, lignes()))
+    assert taille > 5 * PIC_MAX
+    assert pic < PIC_MAX
+
+
+def test_flux_xml_memoire_bornee():
+    taille, pic = consommer(exportations.flux_xml("contraventions",
+                                                  elements()))
+    assert taille > 5 * PIC_MAX
+    assert pic < PIC_MAX
+
+
+def test_flux_csv_compresse_memoire_bornee():
+    _, pic = consommer(exportations.compresser_gzip(
+        exportations.flux_csv(ENTETES, lignes())))
+    assert pic < PIC_MAX
+
+
+def test_compresser_gzip_conserve_le_contenu():
+    flux = exportations.flux_csv(ENTETES, lignes())
+    compresse = b"".join(exportations.compresser_gzip(
+        exportations.flux_csv(ENTETES, lignes())))
+    assert gzip.decompress(compresse) == b"".join(flux)
@@ -0,0 +1,322 @@
+import csv
+import io
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import base_de_donnees
+import fonctionnalites
+
+
+# A1 contre un serveur HTTP local : réponse 200, 304 (validateurs),
+# fichier republié à l'identique (empreinte), fichier modifié et erreurs
+# du serveur ou du réseau. Puis migrations simultanées de plusieurs
+# processus (application, fil d'écriture, travailleur d'ingestion).
+
+# Processus qui migrent la même base en même temps
+NB_PROCESSUS = 6
+
+# Programme d'un processus : attend l'instant de départ commun, puis
+# migre la base
+MIGRATION = """
+import sys, time
+import base_de_donnees
+chemin, depart = sys.argv[1], float(sys.argv[2])
+connexion = base_de_donnees.ouvrir_connexion(chemin)
+time.sleep(max(0, depart - time.time()))
+base_de_donnees.migrer_schema(connexion)
+"""
+
+
+def contravention(id_poursuite, statut="Ouvert", date_statut="20240110"):
+    return {
+        "id_poursuite": id_poursuite, "business_id": 100 + id_poursuite,
+        "date": "20240105", "description": "Description",
+        "adresse": "1 rue Saint-Denis", "date_jugement": "20240301",
+        "etablissement": f"Restaurant {id_poursuite}", "montant": 500,
+        "proprietaire": "Propriétaire", "ville": "Montréal",
+        "statut": statut, "date_statut": date_statut,
+        "categorie": "Restaurant",
+    }
+
+
+def csv_octets(lignes):
+    tampon = io.StringIO()
+    writer = csv.DictWriter(
+        tampon, fieldnames=fonctionnalites.COLONNES_CONTRAVENTIONS)
+    writer.writeheader()
+    writer.writerows(lignes)
+    return tampon.getvalue().encode("utf-8")
+
+
+class Publication:
+    """
+    Fichier publié par le serveur local, et requêtes qu'il a reçues.
+    """
+
+    def __init__(self, corps, etag='"v1"', statut=200):
+        self.corps = corps
+        self.etag = etag
+        self.statut = statut
+        self.requetes = []
+
+
+@pytest.fixture
+def serveur():
+    publication = Publication(csv_octets([contravention(i)
+                                          for i in range(1, 6)]))
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def do_GET(self):
+            publication.requetes.append(dict(self.headers))
+            if publication.statut != 200:
+                self.send_response(publication.statut)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.headers.get("If-None-Match") == publication.etag:
+                self.send_response(304)
+                self.send_header("ETag", publication.etag)
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header("ETag", publication.etag)
+                self.send_header("Content-Length",
+                                 str(len(publication.corps)))
+                self.end_headers()
+                self.wfile.write(publication.corps)
+
+        def log_message(self, *args):
+            pass
+
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), Gestionnaire)
+    fil = threading.Thread(target=serveur.serve_forever, daemon=True)
+    fil.start()
+    publication.url = (
+        f"http://127.0.0.1:{serveur.server_port}/violations.csv")
+    yield publication
+    serveur.shutdown()
+    serveur.server_close()
+
+
+def metadonnees():
+    connexion = base_de_donnees.ouvrir_connexion()
+    try:
+        return fonctionnalites.lire_metadonnees(connexion)
+    finally:
+        connexion.close()
+
+
+def nombre_contraventions():
+    connexion = base_de_donnees.ouvrir_connexion()
+    try:
+        return connexion.execute(
+            "SELECT COUNT(*) FROM contraventions").fetchone()[0]
+    finally:
+        connexion.close()
+
+
+def test_200_importe_et_enregistre_les_validateurs(chemin_bd, serveur):
+    rapport = fonctionnalites.A1(serveur.url)
+
+    assert rapport["inchange"] is False
+    assert rapport["inseres"] == 5
+    assert rapport["octets"] == len(serveur.corps)
+    assert nombre_contraventions() == 5
+    valeurs = metadonnees()
+    assert valeurs["etag"] == '"v1"'
+    assert valeurs["empreinte"]
+    assert "If-None-Match" not in serveur.requetes[0]
+
+
+def test_304_n_analyse_pas_le_fichier(chemin_bd, serveur):
+    fonctionnalites.A1(serveur.url)
+    version = metadonnees()["version_donnees"]
+
+    rapport = fonctionnalites.A1(serveur.url)
+
+    assert serveur.requetes[-1]["If-None-Match"] == '"v1"'
+    assert rapport["inchange"] is True
+    assert rapport["octets"] == 0
+    assert rapport["inseres"] == 0
+    assert metadonnees()["version_donnees"] == version
+
+
+def test_empreinte_identique_ignore_le_fichier(chemin_bd, serveur):
+    fonctionnalites.A1(serveur.url)
+    version = metadonnees()["version_donnees"]
+    serveur.etag = '"v2"'
+
+    rapport = fonctionnalites.A1(serveur.url)
+
+    assert rapport["inchange"] is True
+    assert rapport["octets"] == len(serveur.corps)
+    assert rapport["inseres"] == rapport["mis_a_jour"] == 0
+    valeurs = metadonnees()
+    assert valeurs["etag"] == '"v2"'
+    assert valeurs["version_donnees"] == version
+
+
+def test_fichier_modifie_traite_nouvelles_lignes_et_statuts(chemin_bd,
+                                                            serveur):
+    fonctionnalites.A1(serveur.url)
+    version = metadonnees()["version_donnees"]
+    lignes = [contravention(i) for i in range(1, 6)]
+    lignes[1] = contravention(2, "Fermé", "20240220")
+    lignes.append(contravention(6))
+    serveur.corps = csv_octets(lignes)
+    serveur.etag = '"v2"'
+
+    rapport = fonctionnalites.A1(serveur.url)
+
+    assert rapport["inchange"] is False
+    assert rapport["inseres"] == 1
+    assert rapport["mis_a_jour"] == 1
+    assert rapport["ignores"] == 4
+    assert nombre_contraventions() == 6
+    assert int(metadonnees()["version_donnees"]) == int(version) + 1
+
+
+def test_erreur_du_serveur(chemin_bd, serveur):
+    fonctionnalites.A1(serveur.url)
+    serveur.statut = 500
+    serveur.etag = '"v2"'
+
+    rapport = fonctionnalites.A1(serveur.url)
+
+    assert isinstance(rapport, str)
+    assert "500" in rapport
+    assert metadonnees()["etag"] == '"v1"'
+    assert nombre_contraventions() == 5
+
+
+def test_erreur_reseau(chemin_bd):
+    # Port libre : la connexion est refusée
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    rapport = fonctionnalites.A1(f"http://127.0.0.1:{port}/violations.csv")
+
+    assert isinstance(rapport, str)
+    assert "réseau" in rapport
+    assert "etag" not in metadonnees()
+
+
+def declencheurs(connexion):
+    return sorted(
+        (schema, nom) for schema in ("main", "temp")
+        for nom, in connexion.execute(f"""
+            SELECT name FROM {schema}.sqlite_master
+             WHERE type = 'trigger' AND tbl_name = 'contraventions'
+        """))
+
+
+def test_declencheurs_suspendus_puis_recrees(connexion):
+    fonctionnalites.suivre_changements(connexion)
+    avant = declencheurs(connexion)
+    assert ("temp", "delta_ai") in avant
+    assert ("main", "contraventions_fts_ai") in avant
+
+    with connexion:
+        with base_de_donnees.declencheurs_suspendus(
+                connexion, "contraventions"):
+            assert declencheurs(connexion) == []
+            connexion.execute(fonctionnalites.REQUETE_INSERTION,
+                              fonctionnalites.convertir_ligne(
+                                  contravention(1)))
+    assert declencheurs(connexion) == avant
+    assert connexion.execute("SELECT COUNT(*) FROM delta").fetchone()[0] == 0
+
+    # Un chargement interrompu : l'annulation rétablit les déclencheurs
+    with pytest.raises(RuntimeError):
+        with connexion:
+            with base_de_donnees.declencheurs_suspendus(
+                    connexion, "contraventions"):
+                raise RuntimeError("interrompu")
+    assert declencheurs(connexion) == avant
+
+
+def test_chargement_initial_en_masse(chemin_bd, serveur):
+    fonctionnalites.A1(serveur.url)
+
+    connexion = base_de_donnees.ouvrir_connexion()
+    try:
+        assert declencheurs(connexion) == [
+            ("main", "contraventions_fts_ad"),
+            ("main", "contraventions_fts_ai"),
+            ("main", "contraventions_fts_au"),
+        ]
+        # Index plein texte reconstruit après le chargement
+        assert connexion.execute("""
+            SELECT COUNT(*) FROM contraventions_fts
+             WHERE contraventions_fts MATCH 'etablissement:restaurant'
+        """).fetchone()[0] == 5
+        # Statistiques et établissements recalculés en entier
+        assert connexion.execute(
+            "SELECT COUNT(*) FROM stats_etablissements").fetchone()[0] == 5
+        assert connexion.execute(
+            "SELECT COUNT(*) FROM etablissements").fetchone()[0] == 5
+    finally:
+        connexion.close()
+
+    # Importation suivante : les déclencheurs tiennent l'index à jour
+    serveur.corps = csv_octets([contravention(i) for i in range(1, 7)])
+    serveur.etag = '"v2"'
+    assert fonctionnalites.A1(serveur.url)["inseres"] == 1
+    connexion = base_de_donnees.ouvrir_connexion()
+    try:
+        assert connexion.execute("""
+            SELECT rowid FROM contraventions_fts
+             WHERE contraventions_fts MATCH 'etablissement:6'
+        """).fetchone()[0] == 6
+        assert connexion.execute(
+            "SELECT COUNT(*) FROM etablissements").fetchone()[0] == 6
+    finally:
+        connexion.close()
+
+
+@pytest.mark.parametrize("ancienne", [False, True])
+def test_migrations_simultanees(chemin_bd, ancienne):
+    if ancienne:
+        # Base créée avant les migrations : schéma db/db.sql seul
+        connexion = sqlite3.connect(chemin_bd)
+        with open(base_de_donnees.CHEMMIN_SQL, encoding="utf-8") as f:
+            connexion.executescript(f.read())
+        connexion.close()
+
+    dossier = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    depart = time.time() + 1
+    processus = [
+        subprocess.Popen(
+            [sys.executable, "-c", MIGRATION, chemin_bd, str(depart)],
+            cwd=dossier, stderr=subprocess.PIPE, text=True)
+        for _ in range(NB_PROCESSUS)
+    ]
+    erreurs = [p.communicate(timeout=120)[1] for p in processus]
+
+    assert [p.returncode for p in processus] == [0] * NB_PROCESSUS, erreurs
+    connexion = base_de_donnees.ouvrir_connexion(chemin_bd)
+    try:
+        assert connexion.execute("PRAGMA user_version").fetchone()[0] == \
+            len(base_de_donnees.MIGRATIONS)
+        colonnes = [
+            ligne[1] for ligne in connexion.execute(
+                "PRAGMA table_info(sessions)")
+        ]
+        assert colonnes.count("vu_le") == 1
+    finally:
+        connexion.close()
+
+
+def test_index_plein_texte_des_etablissements_retire(connexion):
+    tables = {nom for nom, in connexion.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    assert "etablissements" in tables
+    assert not {nom for nom in tables if nom.startswith("etablissements_fts")}
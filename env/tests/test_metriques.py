@@ -0,0 +1,160 @@
+import sqlite3
+
+import pytest
+
+import metriques
+
+
+# A3 : format d'exposition de Prometheus, décorateur des méthodes de
+# Database, journal des appels lents et route /metrics.
+
+
+@pytest.fixture
+def registre(monkeypatch):
+    registre = metriques.Registre()
+    monkeypatch.setattr(metriques, "registre", registre)
+    return registre
+
+
+def test_exporter_histogramme(registre):
+    histogramme = registre.histogramme("duree", route="/a")
+    for valeur in (0.0005, 0.001, 0.003, 20):
+        histogramme.observer(valeur)
+    # Un histogramme sans observation n'est pas exporté
+    registre.histogramme("duree", route="/b")
+
+    lignes = registre.exporter().splitlines()
+
+    assert lignes[0] == "# TYPE duree histogram"
+    assert lignes[1] == 'duree_bucket{route="/a",le="0.001"} 2'
+    assert lignes[2] == 'duree_bucket{route="/a",le="0.0025"} 2'
+    assert lignes[3] == 'duree_bucket{route="/a",le="0.005"} 3'
+    assert lignes[len(metriques.BORNES)] == \
+        'duree_bucket{route="/a",le="10.0"} 3'
+    assert lignes[len(metriques.BORNES) + 1:] == [
+        'duree_bucket{route="/a",le="+Inf"} 4',
+        'duree_sum{route="/a"} 20.0045',
+        'duree_count{route="/a"} 4',
+    ]
+
+
+def test_exporter_compteurs_et_jauges(registre):
+    registre.incrementer("requetes_total", statut=200, route="/a")
+    registre.incrementer("requetes_total", 2, route="/a", statut=200)
+    registre.ajouter(registre.cle("requetes_total", route="/b", statut=404))
+    registre.incrementer("sans_etiquette_total")
+
+    texte = registre.exporter([
+        ("ouvertes", {}, 3),
+        ("lignes", {"type": 'a"b\\c\nd'}, 1),
+        ("lignes", {"type": "autre"}, 2),
+    ])
+
+    assert texte == "\n".join([
+        "# TYPE requetes_total counter",
+        'requetes_total{route="/a",statut="200"} 3',
+        'requetes_total{route="/b",statut="404"} 1',
+        "# TYPE sans_etiquette_total counter",
+        "sans_etiquette_total 1",
+        "# TYPE ouvertes gauge",
+        "ouvertes 3",
+        "# TYPE lignes gauge",
+        'lignes{type="a\\"b\\\\c\\nd"} 1',
+        'lignes{type="autre"} 2',
+    ]) + "\n"
+
+
+def test_mesurer_methode(registre):
+    class Base:
+        connexion = None
+
+        def lister(self, n):
+            return list(range(n))
+
+        def compter(self, n):
+            return n
+
+        def _interne(self):
+            return [1]
+
+    metriques.instrumenter(Base)
+    base = Base()
+    base.lister(3)
+    base.lister(4)
+    base.compter(5)
+    base._interne()
+
+    assert registre.compteurs == {
+        registre.cle("db_lignes_total", methode="lister"): 7}
+    comptes = {
+        etiquettes: sum(histogramme.compteurs)
+        for (_, etiquettes), histogramme in registre.histogrammes.items()
+    }
+    assert comptes == {(("methode", "lister"),): 2,
+                       (("methode", "compter"),): 1}
+
+
+def test_mesures_coupees(registre, monkeypatch):
+    monkeypatch.setattr(metriques, "ACTIVES", False)
+
+    def lister(self):
+        return []
+
+    assert metriques.mesurer_methode(lister) is lister
+    assert registre.histogrammes == {}
+
+
+def test_appel_lent_journalise_avec_son_plan(registre, monkeypatch, capsys):
+    monkeypatch.setattr(metriques, "SEUIL_LENT", 1e-9)
+    connexion = sqlite3.connect(":memory:")
+    connexion.execute("CREATE TABLE t (a INTEGER PRIMARY KEY, b TEXT)")
+    connexion.set_trace_callback(metriques.tracer)
+
+    class Base:
+        def __init__(self):
+            self.connexion = connexion
+
+        def lire(self):
+            return connexion.execute(
+                "SELECT b FROM t WHERE a = 1").fetchall()
+
+    metriques.instrumenter(Base)
+    Base().lire()
+    connexion.close()
+
+    sortie = capsys.readouterr().out
+    assert "Requête lente" in sortie
+    assert "dans lire : SELECT b FROM t WHERE a = 1" in sortie
+    assert "USING INTEGER PRIMARY KEY" in sortie
+
+
+def test_route_metrics(application, connexion, registre, monkeypatch):
+    monkeypatch.setattr(application, "mesures_routes", {})
+    with connexion:
+        connexion.execute("""
+            INSERT INTO executions_ingestion (debut, duree, statut,
+                                              tentatives, inseres)
+            VALUES ('2024-01-02T00:00:00+00:00', 1.5, 'succes', 2, 7)
+        """)
+    client = application.app.test_client()
+    client.get("/")
+    client.get("/inexistante")
+
+    reponse = client.get("/metrics")
+
+    assert reponse.status_code == 200
+    assert reponse.mimetype == "text/plain"
+    assert "version=0.0.4" in reponse.headers["Content-Type"]
+    lignes = reponse.get_data(as_text=True).splitlines()
+    assert 'http_requetes_total{route="/",statut="200"} 1' in lignes
+    assert 'http_requetes_total{route="aucune",statut="404"} 1' in lignes
+    assert 'http_duree_secondes_count{route="/"} 1' in lignes
+    assert any(ligne.startswith("pool_connexions_ouvertes ")
+               for ligne in lignes)
+    assert "cache_reponses_entrees 0" in lignes
+    assert "ingestion_derniere_debut_secondes 1704153600.0" in lignes
+    assert 'ingestion_derniere_lignes{type="inseres"} 7' in lignes
+    assert "ingestion_derniere_succes 1" in lignes
+    # La requête en cours n'est comptée qu'une fois terminée
+    assert not any(ligne.startswith('http_requetes_total{route="/metrics"')
+                   for ligne in lignes)
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+import mots_de_passe
+
+
+@pytest.fixture
+def service():
+    service = mots_de_passe.ServiceMotsDePasse(
+        n=2 ** 4, iterations=1000, travailleurs=1, file_max=0)
+    yield service
+    service.fermer()
+
+
+def test_hacher_puis_verifier(service):
+    password_hash, salt = service.hacher("secret")
+    assert service.verifier("secret", password_hash, salt) == (True, False)
+    assert service.verifier("autre", password_hash, salt) == (False, False)
+
+
+def test_place_gardee_tant_que_le_calcul_tourne(service, monkeypatch):
+    monkeypatch.setattr(mots_de_passe, "DELAI_HACHAGE", 0.1)
+    debut = threading.Event()
+    fin = threading.Event()
+
+    def calcul_lent():
+        debut.set()
+        fin.wait(5)
+        return "fini"
+
+    with pytest.raises(mots_de_passe.ServiceSature):
+        service._calculer(calcul_lent)
+    assert debut.is_set()
+
+    # L'appelant a renoncé, mais le calcul occupe toujours le seul fil
+    with pytest.raises(mots_de_passe.ServiceSature,
+                       match="Trop de hachages"):
+        service._calculer(lambda: "rapide")
+
+    fin.set()
+    service._executeur.submit(lambda: None).result(5)
+    assert service._calculer(lambda: "rapide") == "rapide"
+
+
+def test_limiteur_par_cle():
+    limiteur = mots_de_passe.LimiteurDebit(capacite=2, periode=60)
+    assert limiteur.autoriser("alice")
+    assert limiteur.autoriser("alice")
+    assert not limiteur.autoriser("alice")
+    # Chaque clé a son propre seau
+    assert limiteur.autoriser("bob")
+
+
+def test_limite_par_compte_toutes_adresses(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", "test")
+    import app
+
+    monkeypatch.setattr(app, "limite_ip", mots_de_passe.LimiteurDebit(
+        capacite=100, periode=60))
+    monkeypatch.setattr(app, "limite_utilisateur",
+                        mots_de_passe.LimiteurDebit(capacite=2, periode=60))
+
+    def essai(adresse, nom):
+        with app.app.test_request_context(
+                environ_base={"REMOTE_ADDR": adresse}):
+            return app.trop_d_essais(nom)
+
+    assert not essai("10.0.0.1", "alice")
+    assert not essai("10.0.0.2", "alice")
+    # Changer d'adresse ne redonne pas d'essais sur le même compte
+    assert essai("10.0.0.3", "alice")
+    assert not essai("10.0.0.3", "bob")
+
+
+def test_rehachage_sature_n_empeche_pas_la_connexion(application, service,
+                                                     connexion, monkeypatch):
+    # Hachage à un coût différent du coût courant : à rehacher
+    password_hash, salt = service.hacher("Secret123")
+    with connexion:
+        connexion.execute("""
+            INSERT INTO utilisateurs (username, password_hash, salt,
+                                      nom, prenom)
+            VALUES ('alice', ?, ?, 'Alice', 'Alice')
+        """, (password_hash, salt))
+
+    def sature(mot_de_passe):
+        raise mots_de_passe.ServiceSature("Trop de hachages")
+
+    monkeypatch.setattr(application.service_mdp, "hacher", sature)
+    reponse = application.app.test_client().post("/connexion", data={
+        "nom_utilisateur": "alice", "mot_de_passe": "Secret123"})
+
+    assert reponse.status_code == 302
+    # L'ancien hachage est gardé jusqu'à une prochaine connexion
+    assert connexion.execute(
+        "SELECT password_hash FROM utilisateurs").fetchone()[0] == \
+        password_hash
@@ -0,0 +1,101 @@
+import io
+
+import pytest
+
+import fonctionnalites
+from test_ingestion import contravention, csv_octets
+
+
+def publier(lignes):
+    return fonctionnalites.A1(io.BytesIO(csv_octets(lignes)))
+
+
+@pytest.fixture
+def surveillances(connexion):
+    """
+    Base importée (contraventions 1 à 4, business_id 101 à 104) :
+    alice surveille 101 et 102, bob surveille 102.
+    """
+    rapport = publier([contravention(i) for i in range(1, 5)])
+    assert rapport["inseres"] == 4
+    with connexion:
+        connexion.executemany("""
+            INSERT OR IGNORE INTO utilisateurs (username, password_hash, salt,
+                                      nom, prenom)
+            VALUES (?, '', '', 'Nom', 'Prénom')
+        """, [("alice",), ("bob",)])
+        connexion.executemany("""
+            INSERT INTO surveillances (username, business_id)
+            VALUES (?, ?)
+        """, [("alice", 101), ("alice", 102), ("bob", 102)])
+
+
+def notifications(connexion):
+    return sorted(tuple(ligne) for ligne in connexion.execute("""
+        SELECT username, business_id, id_poursuite, nature
+          FROM notifications
+    """))
+
+
+def test_delta_des_declencheurs(connexion, surveillances):
+    fonctionnalites.suivre_changements(connexion)
+    lignes = [fonctionnalites.convertir_ligne(contravention(i))
+              for i in range(1, 5)]
+    lignes[0] = fonctionnalites.convertir_ligne(
+        contravention(1, "Fermé", "20240220"))
+    with connexion:
+        curseur = connexion.executemany(
+            fonctionnalites.REQUETE_MISE_A_JOUR, lignes)
+        assert curseur.rowcount == 1
+        connexion.execute(fonctionnalites.REQUETE_INSERTION,
+                          fonctionnalites.convertir_ligne(contravention(5)))
+
+    assert sorted(tuple(ligne) for ligne in connexion.execute(
+        "SELECT id_poursuite, nature FROM temp.delta")) == [
+        (1, "statut"), (5, "nouvelle")]
+
+
+def test_importation_notifie_les_surveillants(connexion, surveillances):
+    lignes = [contravention(i) for i in range(1, 5)]
+    # Changement de statut chez 102, nouvelle contravention chez 101 et
+    # chez 105, que personne ne surveille
+    lignes[1] = contravention(2, "Fermé", "20240220")
+    nouvelle = contravention(6)
+    nouvelle["business_id"] = 101
+    lignes += [contravention(5), nouvelle]
+
+    rapport = publier(lignes)
+
+    assert rapport["inseres"] == 2
+    assert rapport["mis_a_jour"] == 1
+    assert rapport["notifications"] == 3
+    assert notifications(connexion) == [
+        ("alice", 101, 6, "nouvelle"),
+        ("alice", 102, 2, "statut"),
+        ("bob", 102, 2, "statut"),
+    ]
+
+    # Fichier republié sans changement : aucune nouvelle notification
+    lignes[0]["description"] = "Republié"
+    assert publier(lignes)["notifications"] == 0
+    assert len(notifications(connexion)) == 3
+
+
+def test_route_notifications(client, connexion, surveillances):
+    lignes = [contravention(i) for i in range(1, 5)]
+    lignes[0] = contravention(1, "Fermé", "20240220")
+    lignes[1] = contravention(2, "Fermé", "20240220")
+    publier(lignes)
+
+    reponse = client.get("/notifications")
+    assert reponse.status_code == 200
+    recues = reponse.get_json()
+    assert [(n["id_poursuite"], n["nature"], n["statut"])
+            for n in recues] == [(2, "statut", "Fermé"),
+                                 (1, "statut", "Fermé")]
+
+    # Seules les notifications plus récentes que 'depuis'
+    depuis = recues[-1]["id_notification"]
+    assert [n["id_poursuite"] for n in client.get(
+        f"/notifications?depuis={depuis}").get_json()] == [2]
+    assert client.get("/notifications?depuis=-1").status_code == 400
@@ -0,0 +1,118 @@
+import pytest
+
+import base_de_donnees
+import exportations
+import fonctionnalites
+
+
+# Contraventions de 5 jours, plusieurs par jour : les pages coupent des
+# dates égales et ne se départagent que par id_poursuite
+NB_CONTRAVENTIONS = 23
+
+
+@pytest.fixture
+def db(connexion):
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            (i, 100 + i % 3, f"2024010{1 + i % 5}", "Description", "1 rue",
+             "20240301", f"Restaurant {i % 3}", 100, "Propriétaire",
+             "Montréal", "Ouvert", "20240110", "Restaurant")
+            for i in range(1, NB_CONTRAVENTIONS + 1)
+        ])
+    db = base_de_donnees.Database()
+    yield db
+    db.deconnecter()
+
+
+def cles(lignes):
+    return [(ligne["date"], ligne["id_poursuite"]) for ligne in lignes]
+
+
+def pages(obtenir_curseur, limite):
+    """
+    Parcourt toutes les pages d'un curseur de contraventions, en
+    reprenant après la dernière ligne de chaque page.
+    """
+    resultat, apres = [], None
+    while True:
+        page = obtenir_curseur(limite, apres).fetchall()
+        resultat.append(cles(page))
+        if len(page) < limite:
+            return resultat
+        apres = exportations.decoder_curseur(
+            exportations.encoder_curseur(page[-1]))
+
+
+def test_curseur_aller_retour():
+    ligne = {"date": 20240105, "id_poursuite": 42}
+    assert exportations.decoder_curseur(
+        exportations.encoder_curseur(ligne)) == (20240105, 42)
+
+
+@pytest.mark.parametrize("curseur", [
+    "pas du base64!", "bm9u", "WzEsMiwzXQ==", "WyJhIiwgImIiXQ=="])
+def test_curseur_invalide(curseur):
+    with pytest.raises(ValueError, match="curseur"):
+        exportations.decoder_curseur(curseur)
+
+
+@pytest.mark.parametrize("limite", ["0", "-1", "abc", "1001"])
+def test_limite_invalide(limite):
+    with pytest.raises(ValueError, match="limite"):
+        exportations.lire_pagination(limite, None)
+
+
+def test_lire_pagination():
+    assert exportations.lire_pagination(None, None) == (None, None)
+    curseur = exportations.encoder_curseur(
+        {"date": "20240105", "id_poursuite": 3})
+    assert exportations.lire_pagination("10", curseur) == \
+        (10, ("20240105", 3))
+
+
+@pytest.mark.parametrize("limite", [1, 4, 5, NB_CONTRAVENTIONS])
+def test_pages_par_dates(db, limite):
+    toutes = cles(db.curseur_contraventions_par_dates(
+        "20240101", "20241231").fetchall())
+    assert len(toutes) == NB_CONTRAVENTIONS
+    assert toutes == sorted(toutes, reverse=True)
+
+    resultat = pages(
+        lambda limite, apres: db.curseur_contraventions_par_dates(
+            "20240101", "20241231", limite, apres), limite)
+    assert all(len(page) == limite for page in resultat[:-1])
+    assert [cle for page in resultat for cle in page] == toutes
+
+
+def test_pages_par_etablissement(db):
+    toutes = cles(db.curseur_contraventions(
+        etablissement="restaurant 1").fetchall())
+    resultat = pages(
+        lambda limite, apres: db.curseur_contraventions(
+            etablissement="restaurant 1", limite=limite, apres=apres), 3)
+    assert [cle for page in resultat for cle in page] == toutes
+
+
+def test_route_paginee(client, db):
+    url = "/contrevenants?du=2024-01-01&au=2024-12-31"
+    toutes = client.get(url).get_json()
+
+    lues, curseur = [], None
+    while True:
+        reponse = client.get(
+            url + "&limite=5" + (f"&curseur={curseur}" if curseur else ""))
+        assert reponse.status_code == 200
+        lues += reponse.get_json()
+        curseur = reponse.headers.get("X-Curseur-Suivant")
+        if curseur is None:
+            break
+    assert lues == toutes
+    assert len(lues) == NB_CONTRAVENTIONS
+
+
+@pytest.mark.parametrize("parametres", ["&limite=0", "&curseur=xyz"])
+def test_route_pagination_invalide(client, db, parametres):
+    reponse = client.get(
+        "/infractions?etablissement=restaurant" + parametres)
+    assert reponse.status_code == 400
+    assert "erreur" in reponse.get_json()
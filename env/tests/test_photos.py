@@ -0,0 +1,172 @@
+import io
+import os
+
+import pytest
+
+import base_de_donnees
+import photos
+
+
+# Magasin de photos adressé par empreinte : enregistrement par morceaux,
+# déduplication, refus, miniatures, puis les routes /televerser-photo et
+# /photo/<nom_utilisateur>.
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+JPEG = b"\xff\xd8\xff\xe0" + b"\x01" * 100
+
+
+@pytest.fixture
+def dossier(tmp_path, monkeypatch):
+    dossier = str(tmp_path / "photos")
+    monkeypatch.setattr(photos, "DOSSIER_PHOTOS", dossier)
+    return dossier
+
+
+def fichiers(dossier):
+    return sorted(
+        os.path.relpath(os.path.join(racine, nom), dossier)
+        for racine, _, noms in os.walk(dossier) for nom in noms
+    )
+
+
+def test_enregistrer_par_empreinte(dossier):
+    empreinte = photos.enregistrer(io.BytesIO(PNG))
+
+    chemin = photos.chemin_photo(empreinte)
+    assert chemin == os.path.join(dossier, empreinte[:2], empreinte)
+    with open(chemin, "rb") as f:
+        assert f.read() == PNG
+    assert photos.type_photo(chemin) == "image/png"
+
+
+def test_photo_identique_non_dupliquee(dossier):
+    premiere = photos.enregistrer(io.BytesIO(JPEG))
+    seconde = photos.enregistrer(io.BytesIO(JPEG))
+
+    assert premiere == seconde
+    assert fichiers(dossier) == [os.path.join(premiere[:2], premiere)]
+
+
+@pytest.mark.parametrize("contenu, kwargs, message", [
+    (b"GIF89a" + b"\x00" * 10, {}, "Format"),
+    (b"", {}, "vide"),
+    (PNG, {"taille_max": len(PNG) - 1}, "volumineuse"),
+])
+def test_photo_refusee_sans_fichier_restant(dossier, contenu, kwargs,
+                                            message):
+    with pytest.raises(ValueError, match=message):
+        photos.enregistrer(io.BytesIO(contenu), **kwargs)
+    assert fichiers(dossier) == []
+
+
+def test_photo_copiee_par_morceaux(dossier, monkeypatch):
+    monkeypatch.setattr(photos, "TAILLE_MORCEAU", 16)
+    # Le format n'est vérifié que sur le premier morceau
+    contenu = PNG + b"GIF89a" * 20
+    empreinte = photos.enregistrer(io.BytesIO(contenu))
+    with open(photos.chemin_photo(empreinte), "rb") as f:
+        assert f.read() == contenu
+
+
+def test_sans_pillow_aucune_miniature(dossier, monkeypatch):
+    monkeypatch.setattr(photos, "Image", None)
+    empreinte = photos.enregistrer(io.BytesIO(PNG))
+    assert fichiers(dossier) == [os.path.join(empreinte[:2], empreinte)]
+
+
+def test_miniatures(dossier):
+    Image = pytest.importorskip("PIL.Image")
+    image = io.BytesIO()
+    Image.new("RGB", (640, 320), "red").save(image, "PNG")
+    image.seek(0)
+
+    empreinte = photos.enregistrer(image)
+
+    for cote in photos.MINIATURES:
+        with Image.open(photos.chemin_photo(empreinte, cote)) as miniature:
+            assert miniature.format == "JPEG"
+            assert miniature.size == (cote, cote // 2)
+
+
+def test_migration_des_photos_en_base(connexion, dossier):
+    with connexion:
+        connexion.execute("""
+            INSERT INTO utilisateurs (username, password_hash, salt, nom,
+                                      prenom, photo_profil)
+            VALUES ('alice', '', '', 'Alice', 'Alice', ?)
+        """, (b"ancien format",))
+        base_de_donnees._migration_photos(connexion)
+
+    empreinte, ancienne = connexion.execute(
+        "SELECT photo, photo_profil FROM utilisateurs").fetchone()
+    assert ancienne is None
+    chemin = photos.chemin_photo(empreinte)
+    # Format non reconnu : servi comme l'ancienne colonne (JPEG)
+    assert photos.type_photo(chemin) == "image/jpeg"
+
+
+def televerser(client, contenu, nom="photo.png"):
+    return client.post("/televerser-photo", data={
+        "photo": (io.BytesIO(contenu), nom)})
+
+
+def photo_en_base(connexion):
+    return connexion.execute(
+        "SELECT photo FROM utilisateurs WHERE username = 'alice'"
+    ).fetchone()[0]
+
+
+def test_televerser_puis_afficher(client, connexion, dossier):
+    reponse = televerser(client, PNG)
+    assert "Photo de profil téléversée" in reponse.get_data(as_text=True)
+    empreinte = photo_en_base(connexion)
+    assert empreinte == photos.enregistrer(io.BytesIO(PNG))
+
+    reponse = client.get("/photo/alice")
+    assert reponse.status_code == 200
+    assert reponse.mimetype == "image/png"
+    assert reponse.get_data() == PNG
+    assert reponse.headers["ETag"] == f'"{empreinte}"'
+    assert reponse.cache_control.max_age == 0
+
+    reponse = client.get("/photo/alice",
+                         headers={"If-None-Match": f'"{empreinte}"'})
+    assert reponse.status_code == 304
+
+    # URL propre à cette photo : mise en cache longue
+    reponse = client.get(f"/photo/alice?v={empreinte}")
+    assert reponse.cache_control.max_age == 365 * 24 * 3600
+    assert reponse.cache_control.immutable
+
+
+@pytest.mark.parametrize("contenu, nom, message", [
+    (PNG, "photo.gif", "Fichier non autorisé"),
+    (b"GIF89a", "photo.png", "image non accepté"),
+])
+def test_televersement_refuse(client, connexion, dossier, contenu, nom,
+                              message):
+    reponse = televerser(client, contenu, nom)
+    assert message in reponse.get_data(as_text=True)
+    assert photo_en_base(connexion) is None
+    assert client.get("/photo/alice").status_code == 404
+
+
+def test_miniature_servie_si_presente(client, dossier):
+    televerser(client, PNG)
+    empreinte = photos.enregistrer(io.BytesIO(PNG))
+
+    # Pas de miniature : la photo d'origine est servie
+    assert client.get("/photo/alice?taille=64").get_data() == PNG
+
+    with open(photos.chemin_photo(empreinte, 64), "wb") as f:
+        f.write(JPEG)
+    reponse = client.get("/photo/alice?taille=64")
+    assert reponse.mimetype == "image/jpeg"
+    assert reponse.get_data() == JPEG
+    # Côté hors de MINIATURES : ignoré
+    assert client.get("/photo/alice?taille=65").get_data() == PNG
+
+
+def test_photo_absente(client, dossier):
+    assert client.get("/photo/inconnu").status_code == 404
+    assert client.get("/photo/alice").status_code == 404
@@ -0,0 +1,91 @@
+import re
+
+import pytest
+
+import base_de_donnees
+
+
+# Parcours complet de la table contraventions, sans index. Un parcours
+# d'index (« SCAN contraventions USING INDEX ... ») lit les lignes dans
+# l'ordre demandé et s'arrête à la limite : il est accepté.
+PARCOURS_COMPLET = re.compile(
+    r"\bSCAN (?:main\.)?contraventions\b(?! USING)")
+
+# Requêtes de lecture de Database, avec des paramètres représentatifs.
+# curseur_analytique n'y figure pas : il lit volontairement toute la
+# table pour construire les colonnes d'analytique.py.
+LECTURES = {
+    "version_donnees": lambda db: db.version_donnees(),
+    "lister_etablissements": lambda db: db.lister_etablissements(),
+    "contraventions_etablissement": lambda db: db.curseur_contraventions(
+        etablissement="resto", limite=20).fetchall(),
+    "contraventions_proprietaire_rue": lambda db: db.curseur_contraventions(
+        proprietaire="tremblay", rue="saint-denis").fetchall(),
+    "contraventions_page_suivante": lambda db: db.curseur_contraventions(
+        etablissement="resto", limite=20,
+        apres=("20240101", 5)).fetchall(),
+    "contraventions_sans_critere": lambda db: db.curseur_contraventions(
+        limite=20, apres=("20240101", 5)).fetchall(),
+    "contraventions_par_dates": lambda db:
+        db.curseur_contraventions_par_dates(
+            "20240101", "20241231").fetchall(),
+    "contraventions_par_dates_page": lambda db:
+        db.curseur_contraventions_par_dates(
+            "20240101", "20241231", 20, ("20240601", 3)).fetchall(),
+    "lister_etablissements_classes": lambda db:
+        db.lister_etablissements_classes(),
+    "statistiques_infractions": lambda db: db.statistiques_infractions(),
+    "pire_etablissement": lambda db: db.pire_etablissement(),
+    "historique_ingestions": lambda db: db.historique_ingestions(),
+    "obtenir_utilisateur": lambda db: db.obtenir_utilisateur("alice"),
+    "obtenir_session": lambda db: db.obtenir_session("session"),
+    "etablissements_par_ids": lambda db:
+        db.etablissements_par_ids([1, 2, 3]),
+    "etablissements_surveilles": lambda db:
+        db.etablissements_surveilles("alice"),
+    "surveillants": lambda db: db.surveillants([1, 2, 3]),
+    "notifications_utilisateur": lambda db:
+        db.notifications_utilisateur("alice", depuis=10),
+}
+
+
+def requetes_executees(db, lecture):
+    """
+    Exécute une lecture et renvoie ses requêtes SELECT, les paramètres
+    remplacés par leurs valeurs.
+    """
+    requetes = []
+    db.connexion.set_trace_callback(requetes.append)
+    try:
+        lecture(db)
+    finally:
+        db.connexion.set_trace_callback(None)
+    return [
+        requete for requete in requetes
+        if requete.lstrip().upper().startswith("SELECT")
+    ]
+
+
+@pytest.mark.parametrize("nom", LECTURES)
+def test_lecture_sans_parcours_des_contraventions(connexion, nom):
+    db = base_de_donnees.Database()
+    try:
+        requetes = requetes_executees(db, LECTURES[nom])
+        assert requetes
+        for requete in requetes:
+            plan = [
+                ligne[3] for ligne in db.connexion.execute(
+                    "EXPLAIN QUERY PLAN " + requete)
+            ]
+            parcours = [
+                etape for etape in plan if PARCOURS_COMPLET.search(etape)]
+            assert not parcours, (requete, plan)
+    finally:
+        db.deconnecter()
+
+
+def test_le_motif_detecte_un_parcours_complet(connexion):
+    plan = connexion.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM contraventions"
+        " WHERE description = 'x'").fetchall()
+    assert any(PARCOURS_COMPLET.search(ligne[3]) for ligne in plan)
@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+
+import pytest
+
+import base_de_donnees
+
+
+@pytest.fixture
+def pool(chemin_bd):
+    pool = base_de_donnees.PoolConnexions(taille=2)
+    yield pool
+    pool.fermer()
+
+
+def test_connexions_reutilisees(pool):
+    connexion = pool.acquerir()
+    pool.liberer(connexion)
+    assert pool.acquerir() is connexion
+    assert pool.ouvertes == 1
+
+
+def test_premiere_connexion_migree_et_configuree(pool):
+    connexion = pool.acquerir()
+    try:
+        assert connexion.execute("PRAGMA user_version").fetchone()[0] == \
+            len(base_de_donnees.MIGRATIONS)
+        assert connexion.execute(
+            "PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert connexion.execute(
+            "PRAGMA busy_timeout").fetchone()[0] == 5000
+    finally:
+        pool.liberer(connexion)
+
+
+def test_pool_borne(pool):
+    premiere, seconde = pool.acquerir(), pool.acquerir()
+    assert pool.ouvertes == 2
+    with pytest.raises(sqlite3.OperationalError, match="Aucune connexion"):
+        pool.acquerir(delai=0.05)
+
+    # Une connexion rendue est confiée à la requête qui attend
+    obtenue = []
+    attente = threading.Thread(
+        target=lambda: obtenue.append(pool.acquerir(delai=5)))
+    attente.start()
+    pool.liberer(seconde)
+    attente.join(5)
+    assert obtenue == [seconde]
+    assert pool.ouvertes == 2
+    pool.liberer(premiere)
+    pool.liberer(seconde)
+
+
+def test_liberer_annule_la_transaction(pool):
+    connexion = pool.acquerir()
+    connexion.execute("""
+        INSERT INTO metadonnees (cle, valeur) VALUES ('essai', '1')
+    """)
+    assert connexion.in_transaction
+    pool.liberer(connexion)
+
+    connexion = pool.acquerir()
+    assert not connexion.in_transaction
+    assert connexion.execute(
+        "SELECT COUNT(*) FROM metadonnees WHERE cle = 'essai'"
+    ).fetchone()[0] == 0
+    pool.liberer(connexion)
+
+
+def test_database_rend_sa_connexion(pool):
+    db = base_de_donnees.Database(pool)
+    connexion = db.get_connexion()
+    db.deconnecter()
+    assert pool.acquerir() is connexion
+    pool.liberer(connexion)
+
+
+def test_lecture_seule(pool, chemin_bd):
+    # Schéma créé par le pool en écriture
+    pool.liberer(pool.acquerir())
+    lecture = base_de_donnees.PoolConnexions(
+        chemin=chemin_bd, lecture_seule=True)
+    connexion = lecture.acquerir()
+    try:
+        assert connexion.execute(
+            "SELECT COUNT(*) FROM contraventions").fetchone()[0] == 0
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            connexion.execute("""
+                INSERT INTO metadonnees (cle, valeur) VALUES ('essai', '1')
+            """)
+    finally:
+        lecture.liberer(connexion)
+        lecture.fermer()
+
+
+def test_fermer(pool):
+    connexions = [pool.acquerir(), pool.acquerir()]
+    for connexion in connexions:
+        pool.liberer(connexion)
+    pool.fermer()
+    assert pool.ouvertes == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        connexions[0].execute("SELECT 1")
@@ -0,0 +1,152 @@
+import types
+
+import pytest
+
+import base_de_donnees
+import magasin_sessions
+
+
+# Sessions : expiration par inactivité et par durée maximale, révocation
+# (déconnexion, purge) vue par le niveau en mémoire, puis la route
+# /deconnexion.
+
+DEBUT = 1_700_000_000
+
+# Durées courtes : l'horloge du magasin est avancée par les tests
+DUREE_INACTIVITE = 600
+DUREE_MAX = 3600
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = types.SimpleNamespace(maintenant=DEBUT)
+    monkeypatch.setattr(magasin_sessions, "time", types.SimpleNamespace(
+        time=lambda: horloge.maintenant))
+    return horloge
+
+
+@pytest.fixture
+def magasin(connexion, horloge):
+    pool = base_de_donnees.PoolConnexions()
+    magasin = magasin_sessions.MagasinSessions(
+        pool, duree_inactivite=DUREE_INACTIVITE, duree_max=DUREE_MAX)
+    yield magasin
+    magasin.arreter()
+    pool.fermer()
+
+
+def en_base(connexion):
+    return {
+        tuple(ligne) for ligne in connexion.execute(
+            "SELECT id_session, username, vu_le FROM sessions")
+    }
+
+
+def test_creer_puis_valider(magasin, connexion):
+    assert magasin.creer("s1", "alice")
+    assert magasin.valider("s1", "alice")
+    assert en_base(connexion) == {("s1", "alice", DEBUT)}
+
+
+def test_session_inconnue_ou_d_un_autre_compte(magasin, connexion):
+    assert not magasin.valider(None, "alice")
+    assert not magasin.valider("inconnue", "alice")
+
+    magasin.creer("s1", "alice")
+    # Un cookie modifié pour un autre compte révoque la session
+    assert not magasin.valider("s1", "bob")
+    assert not magasin.valider("s1", "alice")
+    assert en_base(connexion) == set()
+
+
+def test_expiration_par_inactivite(magasin, horloge, connexion):
+    magasin.creer("s1", "alice")
+    horloge.maintenant += DUREE_INACTIVITE
+    assert magasin.valider("s1", "alice")
+
+    # L'activité repousse l'échéance
+    horloge.maintenant += DUREE_INACTIVITE
+    assert magasin.valider("s1", "alice")
+
+    horloge.maintenant += DUREE_INACTIVITE + 1
+    assert not magasin.valider("s1", "alice")
+    assert en_base(connexion) == set()
+
+
+def test_expiration_par_duree_maximale(magasin, horloge):
+    magasin.creer("s1", "alice")
+    # Session active sans interruption, mais plus vieille que DUREE_MAX
+    while horloge.maintenant - DEBUT <= DUREE_MAX:
+        assert magasin.valider("s1", "alice")
+        horloge.maintenant += DUREE_INACTIVITE // 2
+    assert not magasin.valider("s1", "alice")
+
+
+def test_revocation_par_un_autre_processus(magasin, horloge, connexion):
+    magasin.creer("s1", "alice")
+    autre = magasin_sessions.MagasinSessions(magasin.pool)
+    autre.supprimer("s1")
+
+    # Servie par la mémoire jusqu'à la prochaine vérification
+    assert magasin.valider("s1", "alice")
+    horloge.maintenant += magasin_sessions.DELAI_VERIFICATION
+    assert not magasin.valider("s1", "alice")
+
+
+def test_supprimer(magasin, connexion):
+    magasin.creer("s1", "alice")
+    magasin.creer("s2", "alice")
+    magasin.supprimer("s1")
+
+    assert not magasin.valider("s1", "alice")
+    assert magasin.valider("s2", "alice")
+    assert en_base(connexion) == {("s2", "alice", DEBUT)}
+
+
+def test_purger_ecrit_les_activites_et_supprime_les_inactives(
+        magasin, horloge, connexion):
+    magasin.creer("active", "alice")
+    magasin.creer("inactive", "bob")
+    horloge.maintenant += DUREE_INACTIVITE // 2
+    # L'activité reste en mémoire jusqu'à la purge
+    assert magasin.valider("active", "alice")
+    assert ("active", "alice", DEBUT) in en_base(connexion)
+
+    horloge.maintenant += DUREE_INACTIVITE // 2 + 1
+    assert magasin.purger() == 1
+
+    vu_le = DEBUT + DUREE_INACTIVITE // 2
+    assert en_base(connexion) == {("active", "alice", vu_le)}
+    assert "inactive" not in magasin._memoire
+
+
+def test_niveau_memoire_borne(connexion, horloge):
+    pool = base_de_donnees.PoolConnexions()
+    magasin = magasin_sessions.MagasinSessions(pool, taille_memoire=2)
+    try:
+        for identifiant in ("s1", "s2", "s3"):
+            magasin.creer(identifiant, "alice")
+        assert list(magasin._memoire) == ["s2", "s3"]
+        # La session sortie de la mémoire est relue dans la base
+        assert magasin.valider("s1", "alice")
+        assert list(magasin._memoire) == ["s3", "s1"]
+    finally:
+        magasin.arreter()
+        pool.fermer()
+
+
+def test_deconnexion_revoque_la_session(client, connexion):
+    assert client.get("/profil").status_code == 200
+
+    reponse = client.get("/deconnexion")
+
+    assert reponse.status_code == 302
+    assert connexion.execute(
+        "SELECT COUNT(*) FROM sessions").fetchone()[0] == 0
+    # Un cookie rejoué après la déconnexion n'ouvre plus de session
+    with client.session_transaction() as session:
+        session["utilisateur"] = "alice"
+        session["id_session"] = "session-alice"
+    reponse = client.get("/profil")
+    assert reponse.status_code == 302
+    assert "/connexion" in reponse.headers["Location"]
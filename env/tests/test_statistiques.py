@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import base_de_donnees
+import fonctionnalites
+
+
+# Agrégats d'un établissement calculés directement sur contraventions,
+# pour comparaison avec stats_etablissements
+REQUETE_ATTENDUE = """
+    SELECT etablissement, COUNT(*), SUM(montant), MIN(date), MAX(date)
+      FROM contraventions
+     GROUP BY etablissement
+     ORDER BY etablissement
+"""
+
+
+def contravention(i, etablissement, date="20240105", montant=100,
+                  categorie="Restaurant"):
+    return (i, 100 + i, date, "Description", "1 rue", "20240301",
+            etablissement, montant, "Propriétaire", "Montréal", "Ouvert",
+            "20240110", categorie)
+
+
+@pytest.fixture
+def donnees(connexion):
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            contravention(1, "Chez Ali", "20240101", 100),
+            contravention(2, "Chez Ali", "20240301", 200, "Épicerie"),
+            contravention(3, "Chez Ali", "20240201", 300),
+            contravention(4, "Pizza Roma", "20240115", 50),
+            contravention(5, "Bistro", "20240120", 75),
+            contravention(6, "Bistro", "20240121", 25),
+        ])
+        base_de_donnees.reconstruire_statistiques(connexion)
+
+
+def statistiques(connexion):
+    return [tuple(ligne) for ligne in connexion.execute("""
+        SELECT etablissement, nb, montant_total, premiere_date,
+               derniere_date
+          FROM stats_etablissements
+         ORDER BY etablissement
+    """)]
+
+
+def test_statistiques_precalculees(connexion, donnees):
+    assert statistiques(connexion) == [
+        tuple(ligne) for ligne in connexion.execute(REQUETE_ATTENDUE)]
+    categories = connexion.execute("""
+        SELECT categories FROM stats_etablissements
+         WHERE etablissement = 'Chez Ali'
+    """).fetchone()[0]
+    assert json.loads(categories) == {"Restaurant": 2, "Épicerie": 1}
+
+
+def test_recalcul_limite_au_delta(connexion, donnees):
+    fonctionnalites.suivre_changements(connexion)
+    with connexion:
+        # Une ligne modifiée à la main hors delta n'est pas recalculée
+        connexion.execute("""
+            UPDATE stats_etablissements SET nb = 99
+             WHERE etablissement = 'Pizza Roma'
+        """)
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            contravention(7, "Bistro", "20240301", 10),
+            contravention(8, "Nouveau", "20240302", 20),
+        ])
+        base_de_donnees.reconstruire_statistiques(connexion, delta=True)
+
+    lignes = {ligne[0]: ligne for ligne in statistiques(connexion)}
+    # Colonnes DATE : affinité numérique
+    assert lignes["Bistro"] == ("Bistro", 3, 110, 20240120, 20240301)
+    assert lignes["Nouveau"] == ("Nouveau", 1, 20, 20240302, 20240302)
+    assert lignes["Pizza Roma"][1] == 99
+
+
+def test_routes_des_statistiques(client, donnees):
+    assert client.get("/statistiques").get_json() == [
+        {"etablissement": "Chez Ali", "nb": 3},
+        {"etablissement": "Bistro", "nb": 2},
+        {"etablissement": "Pizza Roma", "nb": 1},
+    ]
+    assert client.get("/pire-etablissement").get_json() == {
+        "etablissement": "Chez Ali", "nb": 3}
+
+    racine = ET.fromstring(client.get("/statistiques/xml").data)
+    assert [(e.text, e.get("nb")) for e in racine] == [
+        ("Chez Ali", "3"), ("Bistro", "2"), ("Pizza Roma", "1")]
+
+    lignes = list(csv.reader(io.StringIO(
+        client.get("/statistiques/csv").data.decode("utf-8-sig")),
+        delimiter=";"))
+    assert lignes[1:] == [["Chez Ali", "3"], ["Bistro", "2"],
+                          ["Pizza Roma", "1"]]
+
+
+def test_pire_etablissement_sans_donnees(client):
+    assert client.get("/pire-etablissement").status_code == 404
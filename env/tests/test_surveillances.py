@@ -0,0 +1,81 @@
+import pytest
+
+import base_de_donnees
+import fonctionnalites
+
+
+@pytest.fixture
+def etablissements(connexion):
+    with connexion:
+        connexion.executemany(fonctionnalites.REQUETE_INSERTION, [
+            (i, 100 + i, "20240105", "Description", "1 rue", "20240301",
+             f"Restaurant {i}", 500, "Propriétaire", "Montréal", "Ouvert",
+             "20240110", "Restaurant")
+            for i in range(1, 6)
+        ])
+        base_de_donnees.reconstruire_etablissements(connexion)
+
+
+def surveilles(connexion, nom_utilisateur="alice"):
+    return [ligne[0] for ligne in connexion.execute("""
+        SELECT business_id FROM surveillances
+         WHERE username = ? ORDER BY business_id
+    """, (nom_utilisateur,))]
+
+
+def test_identifiants_valides():
+    assert base_de_donnees.identifiants_valides(
+        [1, "2", " 3 ", "x", "-4", "5.0", "", None]) == [1, 2, 3]
+
+
+def test_ajouter_puis_retirer(client, connexion, etablissements):
+    reponse = client.post("/api/surveillances",
+                          json={"business_ids": [101, 102, 103]})
+    assert reponse.status_code == 200
+    assert reponse.get_json() == {"business_ids": [101, 102, 103]}
+
+    # Les établissements déjà surveillés sont ignorés
+    reponse = client.post("/api/surveillances",
+                          json={"business_ids": [103, 104]})
+    assert reponse.get_json() == {"business_ids": [101, 102, 103, 104]}
+
+    reponse = client.delete("/api/surveillances",
+                            json={"business_ids": [101, 103, 105]})
+    assert reponse.status_code == 200
+    assert reponse.get_json() == {"business_ids": [102, 104]}
+    assert surveilles(connexion) == [102, 104]
+
+
+@pytest.mark.parametrize("corps", [
+    None,
+    {},
+    {"business_ids": []},
+    {"business_ids": ["101"]},
+    {"business_ids": [-1]},
+    {"business_ids": [1.5]},
+    {"business_ids": [101], "autre": 1},
+])
+def test_identifiants_invalides_refuses(client, connexion, corps):
+    reponse = client.post("/api/surveillances", json=corps)
+    assert reponse.status_code == 400
+    assert surveilles(connexion) == []
+
+
+def test_connexion_requise(application):
+    reponse = application.app.test_client().post(
+        "/api/surveillances", json={"business_ids": [101]})
+    assert reponse.status_code == 302
+
+
+def test_methodes_en_lot_ignorent_les_identifiants_invalides(
+        client, connexion):
+    db = base_de_donnees.Database()
+    try:
+        assert db.ajouter_surveillances("alice", [101, "x", "102", None])
+        assert surveilles(connexion) == [101, 102]
+        assert db.retirer_surveillances("alice", ["101", "abc"])
+        assert surveilles(connexion) == [102]
+        assert [tuple(ligne) for ligne in db.surveillants(["102", "y"])] == \
+            [(102, "alice")]
+    finally:
+        db.deconnecter()
@@ -0,0 +1,141 @@
+import pytest
+
+import base_de_donnees
+import fonctionnalites
+import travailleur_ingestion
+
+
+# A3 : verrou entre processus, recul exponentiel entre les tentatives
+# et historique des exécutions.
+
+RAPPORT = {"inchange": False, "octets": 10, "inseres": 2, "mis_a_jour": 1,
+           "rejetes": 0, "notifications": 3}
+
+
+@pytest.fixture
+def travailleur(connexion, tmp_path, monkeypatch):
+    """
+    Travailleur dont le verrou est dans un dossier temporaire et dont les
+    attentes sont notées au lieu d'être faites.
+    """
+    chemin = str(tmp_path / "ingestion.lock")
+    verrou = travailleur_ingestion.verrou_ingestion
+    monkeypatch.setattr(travailleur_ingestion, "verrou_ingestion",
+                        lambda: verrou(chemin))
+    attentes = []
+    monkeypatch.setattr(travailleur_ingestion.time, "sleep", attentes.append)
+    monkeypatch.setattr(travailleur_ingestion.random, "uniform",
+                        lambda debut, fin: fin)
+    return chemin, verrou, attentes
+
+
+def programmer_a1(monkeypatch, *resultats):
+    """
+    Remplace A1 par une suite de résultats : rapport, message d'erreur
+    ou exception levée.
+    """
+    appels = []
+
+    def a1(source=None):
+        resultat = resultats[len(appels)]
+        appels.append(source)
+        if isinstance(resultat, Exception):
+            raise resultat
+        return resultat
+
+    monkeypatch.setattr(fonctionnalites, "A1", a1)
+    return appels
+
+
+def historique(connexion):
+    return [
+        (ligne["statut"], ligne["tentatives"], ligne["inseres"],
+         ligne["erreur"])
+        for ligne in connexion.execute("""
+            SELECT * FROM executions_ingestion ORDER BY id_execution
+        """)
+    ]
+
+
+def test_verrou_exclusif(tmp_path):
+    chemin = str(tmp_path / "ingestion.lock")
+    with travailleur_ingestion.verrou_ingestion(chemin) as obtenu:
+        assert obtenu
+        with travailleur_ingestion.verrou_ingestion(chemin) as second:
+            assert not second
+    # Libéré à la sortie
+    with travailleur_ingestion.verrou_ingestion(chemin) as obtenu:
+        assert obtenu
+
+
+def test_attente_exponentielle_plafonnee(monkeypatch):
+    monkeypatch.setattr(travailleur_ingestion.random, "uniform",
+                        lambda debut, fin: (debut, fin))
+    base = travailleur_ingestion.ATTENTE_BASE
+    assert travailleur_ingestion.attente(1) == (0, base)
+    assert travailleur_ingestion.attente(2) == (0, 2 * base)
+    assert travailleur_ingestion.attente(3) == (0, 4 * base)
+    assert travailleur_ingestion.attente(20) == \
+        (0, travailleur_ingestion.ATTENTE_MAX)
+
+
+def test_succes_apres_echecs(travailleur, connexion, monkeypatch):
+    _, _, attentes = travailleur
+    appels = programmer_a1(monkeypatch, "Erreur réseau",
+                           OSError("disque plein"), RAPPORT)
+
+    assert travailleur_ingestion.executer_ingestion("source") == RAPPORT
+
+    assert appels == ["source"] * 3
+    base = travailleur_ingestion.ATTENTE_BASE
+    assert attentes == [base, 2 * base]
+    assert historique(connexion) == [("succes", 3, 2, None)]
+
+
+def test_importation_inchangee(travailleur, connexion, monkeypatch):
+    programmer_a1(monkeypatch, dict(RAPPORT, inchange=True, inseres=0))
+    travailleur_ingestion.executer_ingestion()
+    assert historique(connexion) == [("inchange", 1, 0, None)]
+
+
+def test_echec_de_toutes_les_tentatives(travailleur, connexion,
+                                        monkeypatch):
+    _, _, attentes = travailleur
+    tentatives = travailleur_ingestion.TENTATIVES
+    programmer_a1(monkeypatch, *["Erreur HTTP 500"] * tentatives)
+
+    assert travailleur_ingestion.executer_ingestion() is None
+
+    # Pas d'attente après la dernière tentative
+    assert len(attentes) == tentatives - 1
+    assert historique(connexion) == [
+        ("echec", tentatives, 0, "Erreur HTTP 500")]
+
+
+def test_verrou_detenu_ailleurs(travailleur, connexion, monkeypatch):
+    chemin, verrou, _ = travailleur
+    appels = programmer_a1(monkeypatch, RAPPORT)
+
+    with verrou(chemin) as obtenu:
+        assert obtenu
+        assert travailleur_ingestion.executer_ingestion() is None
+
+    assert appels == []
+    assert historique(connexion) == []
+    # Le verrou libéré, l'importation suivante a lieu
+    assert travailleur_ingestion.executer_ingestion() == RAPPORT
+
+
+def test_historique_lu_par_l_application(travailleur, connexion,
+                                         monkeypatch):
+    programmer_a1(monkeypatch, "Erreur réseau", RAPPORT)
+    travailleur_ingestion.executer_ingestion()
+
+    db = base_de_donnees.Database()
+    try:
+        derniere, = db.historique_ingestions(5)
+    finally:
+        db.deconnecter()
+    assert derniere["statut"] == "succes"
+    assert derniere["tentatives"] == 2
+    assert derniere["notifications"] == 3
@@ -0,0 +1,155 @@
+import base_de_donnees
+import fonctionnalites
+import fcntl
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+
+# A3 – Processus dédié aux importations quotidiennes (A1), à lancer une
+# seule fois à côté du serveur web :  python travailleur_ingestion.py
+
+CHEMIN_VERROU = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "db", "ingestion.lock"
+)
+
+# Nombre maximal de tentatives d'une importation
+TENTATIVES = 5
+
+# Attente de base et attente maximale entre deux tentatives (secondes)
+ATTENTE_BASE = 30
+ATTENTE_MAX = 30 * 60
+
+
+@contextmanager
+def verrou_ingestion(chemin=CHEMIN_VERROU):
+    """
+    Verrou de fichier (flock) qui garantit qu'un seul processus importe
+    à la fois; il est libéré par le système si le processus meurt.
+
+    Args:
+        chemin (str): Fichier de verrou.
+
+    Yields:
+        bool: True si le verrou est obtenu, False s'il est déjà détenu.
+    """
+    with open(chemin, "a") as fichier:
+        try:
+            fcntl.flock(fichier, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fichier, fcntl.LOCK_UN)
+
+
+def attente(tentative):
+    """
+    Attente avant une nouvelle tentative : recul exponentiel plafonné,
+    tiré au hasard entre 0 et ce plafond (« full jitter »).
+
+    Args:
+        tentative (int): Numéro de la tentative échouée (1, 2, ...).
+
+    Returns:
+        float: Durée d'attente en secondes.
+    """
+    return random.uniform(
+        0, min(ATTENTE_MAX, ATTENTE_BASE * 2 ** (tentative - 1)))
+
+
+def enregistrer_execution(debut, duree, statut, tentatives, rapport,
+                          erreur=None):
+    """
+    Ajoute une ligne à l'historique executions_ingestion.
+
+    Args:
+        debut (str): Horodatage ISO 8601 (UTC) du début de l'exécution.
+        duree (float): Durée totale en secondes, attentes comprises.
+        statut (str): 'succes', 'inchange' ou 'echec'.
+        tentatives (int): Nombre de tentatives faites.
+        rapport (dict): Dernier rapport de A1 (vide en cas d'échec).
+        erreur (str, optional): Dernière erreur rencontrée.
+    """
+    connexion = base_de_donnees.ouvrir_connexion()
+    try:
+        base_de_donnees.migrer_schema(connexion)
+        with connexion:
+            connexion.execute("""
+                INSERT INTO executions_ingestion (
+                    debut, duree, statut, tentatives, octets, inseres,
+                    mis_a_jour, rejetes, notifications, erreur
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                debut, duree, statut, tentatives,
+                rapport.get("octets", 0), rapport.get("inseres", 0),
+                rapport.get("mis_a_jour", 0), rapport.get("rejetes", 0),
+                rapport.get("notifications", 0), erreur
+            ))
+    finally:
+        connexion.close()
+
+
+def executer_ingestion(source=None):
+    """
+    Lance l'importation A1 si aucun autre processus ne l'exécute, en la
+    réessayant avec un recul exponentiel en cas d'échec, puis consigne
+    l'exécution dans l'historique.
+
+    Args:
+        source (str, optional): Source passée à A1 (URL officielle par
+            défaut).
+
+    Returns:
+        dict: Dernier rapport de A1, ou None si l'importation n'a pas eu
+        lieu (verrou détenu ailleurs ou échec de toutes les tentatives).
+    """
+    with verrou_ingestion() as obtenu:
+        if not obtenu:
+            print("Importation déjà en cours dans un autre processus.")
+            return None
+
+        debut = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        chrono = time.monotonic()
+        erreur = None
+
+        for tentative in range(1, TENTATIVES + 1):
+            try:
+                rapport = fonctionnalites.A1(source)
+                if isinstance(rapport, dict):
+                    statut = "inchange" if rapport["inchange"] else "succes"
+                    enregistrer_execution(
+                        debut, time.monotonic() - chrono, statut,
+                        tentative, rapport)
+                    print("Mise à jour de la base de données réussie.",
+                          rapport)
+                    return rapport
+                erreur = rapport
+            except Exception as e:
+                erreur = str(e)
+
+            print(f"Tentative {tentative} échouée : {erreur}")
+            if tentative < TENTATIVES:
+                time.sleep(attente(tentative))
+
+        enregistrer_execution(debut, time.monotonic() - chrono, "echec",
+                              TENTATIVES, {}, erreur)
+        return None
+
+
+if __name__ == '__main__':
+    """
+    Planifie l'importation chaque jour à minuit.
+    """
+    planificateur = BlockingScheduler()
+    planificateur.add_job(executer_ingestion, "cron", hour=0, minute=0)
+    print("Travailleur d'importation démarré. Prochaine exécution à 00h00.")
+    try:
+        planificateur.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass